@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import StoreOwneres,Sales,Product
+from .models import StoreOwneres,Sales,Product,BackgroundJob
 
 # Register your models here.
 admin.site.register(StoreOwneres)
 admin.site.register(Product)
 admin.site.register(Sales)
+admin.site.register(BackgroundJob)
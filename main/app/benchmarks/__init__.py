@@ -0,0 +1,21 @@
+from .ingestion import benchmark_ingestion_backends
+from .analytics import benchmark_insights, benchmark_revenue_metrics, benchmark_velocity
+from .recommendations import benchmark_recommendations
+from .forecasting import benchmark_forecast_models
+from .suite import benchmark_suite
+from .formats import benchmark_upload_formats
+from .purge import benchmark_purge
+from .concurrency import benchmark_concurrency
+
+BENCHMARKS = {
+    'ingestion': benchmark_ingestion_backends,
+    'insights': benchmark_insights,
+    'revenue_metrics': benchmark_revenue_metrics,
+    'velocity': benchmark_velocity,
+    'recommendations': benchmark_recommendations,
+    'forecast_models': benchmark_forecast_models,
+    'suite': benchmark_suite,
+    'upload_formats': benchmark_upload_formats,
+    'purge': benchmark_purge,
+    'concurrency': benchmark_concurrency,
+}
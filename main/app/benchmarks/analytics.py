@@ -0,0 +1,95 @@
+from ..services.analytics import get_sales_insights
+from ..services.forecasting import get_revenue_forecast_metrics, get_product_velocity
+from .utils import create_benchmark_store, rolled_back, seed_store_sales, count_queries, Timer
+
+
+def benchmark_insights(rows=1_000_000, products=500, repeat=5, **options):
+    """Query count and latency of get_sales_insights, uncached and cached."""
+    with rolled_back():
+        store = create_benchmark_store()
+        seed_store_sales(store, rows, products=products)
+
+        uncached = []
+        for _ in range(repeat):
+            with count_queries() as queries, Timer() as timer:
+                get_sales_insights.__wrapped__(store)
+            uncached.append(timer.elapsed)
+
+        # First call fills the cache, the timed one is a hit
+        get_sales_insights(store)
+        with count_queries() as cached_queries, Timer() as cached:
+            get_sales_insights(store)
+
+    return [{
+        "benchmark": "insights",
+        "rows": rows,
+        "products": products,
+        "queries": len(queries.captured_queries),
+        "best_seconds": round(min(uncached), 4),
+        "mean_seconds": round(sum(uncached) / len(uncached), 4),
+        "cached_queries": len(cached_queries.captured_queries),
+        "cached_seconds": round(cached.elapsed, 5),
+    }]
+
+
+def benchmark_revenue_metrics(rows=1_000_000, products=500, stores=10, repeat=5, **options):
+    """
+    Latency of get_revenue_forecast_metrics for one tenant while `stores`
+    tenants share the tables. Store scoping keeps it flat as tenants grow.
+    """
+    with rolled_back():
+        tenants = [create_benchmark_store() for _ in range(stores)]
+        for seed, tenant in enumerate(tenants):
+            seed_store_sales(tenant, rows // stores, products=products, seed=seed)
+
+        store = tenants[0]
+        timings = []
+        for _ in range(repeat):
+            with count_queries() as queries, Timer() as timer:
+                data = get_revenue_forecast_metrics.__wrapped__(store)
+            timings.append(timer.elapsed)
+
+    return [{
+        "benchmark": "revenue_metrics",
+        "rows": rows,
+        "stores": stores,
+        "rows_per_store": rows // stores,
+        "queries": len(queries.captured_queries),
+        "daily_points": len(data["daily_revenue"]),
+        "best_seconds": round(min(timings), 4),
+        "mean_seconds": round(sum(timings) / len(timings), 4),
+    }]
+
+
+def benchmark_velocity(rows=1_000_000, products=500, window=30, repeat=5, **options):
+    """
+    Latency of get_product_velocity as the store's history grows from one
+    quarter to three years at a constant sales rate, with a fixed window.
+    """
+    results = []
+
+    for days in (90, 365, 1095):
+        history_rows = rows * days // 1095
+
+        with rolled_back():
+            store = create_benchmark_store()
+            seed_store_sales(store, history_rows, products=products, days=days)
+
+            timings = []
+            for _ in range(repeat):
+                with count_queries() as queries, Timer() as timer:
+                    data = get_product_velocity.__wrapped__(store, window=window)
+                timings.append(timer.elapsed)
+
+        results.append({
+            "benchmark": "velocity",
+            "history_days": days,
+            "rows": history_rows,
+            "window_days": window,
+            "products": data["total_products"],
+            "queries": len(queries.captured_queries),
+            "best_seconds": round(min(timings), 4),
+            "mean_seconds": round(sum(timings) / len(timings), 4),
+        })
+
+    return results
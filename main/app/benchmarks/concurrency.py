@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+from ..services.analytics import get_sales_insights
+from ..services.cache import bump_data_version
+from ..services.forecasting import get_revenue_forecast_metrics
+from ..services.inventory import get_low_stock_alerts
+from ..services.purge import purge_store_data
+from .utils import create_benchmark_store, seed_store_sales, Timer
+
+DASHBOARD_URLS = ('/get_insights/', '/forecast_demand/', '/low_stock_alert/')
+COMBINED_URLS = ('/dashboard_data/',)
+
+
+# The synchronous dashboard views as they were before the async rewrite,
+# served as this module's URLconf so the WSGI case runs the real sync path
+@login_required
+def sync_get_insights(request):
+    return JsonResponse(get_sales_insights(request.user.storeowneres, n=5))
+
+
+@login_required
+def sync_forecast_demand(request):
+    return JsonResponse(get_revenue_forecast_metrics(request.user.storeowneres))
+
+
+@login_required
+def sync_low_stock_alert(request):
+    return JsonResponse({"stockAlert": get_low_stock_alerts(request.user.storeowneres)})
+
+
+urlpatterns = [
+    path('get_insights/', sync_get_insights),
+    path('forecast_demand/', sync_forecast_demand),
+    path('low_stock_alert/', sync_low_stock_alert),
+]
+
+
+def latency_summary(latencies, elapsed, requests_per_load):
+    latencies = np.array(latencies)
+    return {
+        "loads": len(latencies),
+        "seconds": round(elapsed, 3),
+        "loads_per_sec": round(len(latencies) / elapsed, 1),
+        "requests_per_sec": round(len(latencies) * requests_per_load / elapsed, 1),
+        "p50_seconds": round(float(np.percentile(latencies, 50)), 4),
+        "p99_seconds": round(float(np.percentile(latencies, 99)), 4),
+    }
+
+
+def session_cookies(store):
+    # Log in once, every simulated browser reuses the session
+    client = Client()
+    client.force_login(store.user)
+    return client.cookies
+
+
+def run_wsgi(store, urls, concurrency, loads, cold):
+    """
+    Synchronous handler and sync views on a pool of `concurrency` worker
+    threads, like a threaded WSGI server. Every dashboard load fires its
+    requests at once and waits for all of them, as the browser does.
+    """
+    cookies = session_cookies(store)
+    local = threading.local()
+
+    def get(url):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+            local.client.cookies.update(cookies)
+
+        response = local.client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+
+    latencies = []
+    with override_settings(ROOT_URLCONF=__name__), \
+            ThreadPoolExecutor(max_workers=concurrency) as server, \
+            ThreadPoolExecutor(max_workers=concurrency) as browsers:
+
+        def load():
+            if cold:
+                bump_data_version(store)
+            started = time.perf_counter()
+            wait([server.submit(get, url) for url in urls])
+            latencies.append(time.perf_counter() - started)
+
+        with Timer() as timer:
+            wait([browsers.submit(load) for _ in range(loads)])
+
+    return latencies, timer.elapsed
+
+
+def run_asgi(store, urls, concurrency, loads, cold):
+    """The ASGI handler on one event loop, with `concurrency` loads in flight."""
+    cookies = session_cookies(store)
+
+    async def main():
+        client = AsyncClient()
+        client.cookies.update(cookies)
+        limit = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def get(url):
+            response = await client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+
+        async def load():
+            async with limit:
+                if cold:
+                    await sync_to_async(bump_data_version)(store)
+                started = time.perf_counter()
+                await asyncio.gather(*(get(url) for url in urls))
+                latencies.append(time.perf_counter() - started)
+
+        with Timer() as timer:
+            await asyncio.gather(*(load() for _ in range(loads)))
+
+        return latencies, timer.elapsed
+
+    return asyncio.run(main())
+
+
+def benchmark_concurrency(rows=100_000, products=500, concurrency=16, loads=200, **options):
+    """
+    Dashboard loads per second and p50/p99 load latency, in process (no
+    HTTP server): the three dashboard endpoints as sync views under the
+    WSGI-style handler and as async views under ASGI, and the combined
+    dashboard_data endpoint under ASGI. 'cold' bumps the store's data version before each
+    load, so every service misses the analytics cache.
+    """
+    store = create_benchmark_store('concurrency')
+    seed_store_sales(store, rows, products=products)
+    results = []
+
+    cases = (
+        ('wsgi', 'separate', run_wsgi, DASHBOARD_URLS),
+        ('asgi', 'separate', run_asgi, DASHBOARD_URLS),
+        ('asgi', 'dashboard_data', run_asgi, COMBINED_URLS),
+    )
+
+    try:
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for cache in ('warm', 'cold'):
+                for handler, endpoints, run, urls in cases:
+                    # One untimed load fills the cache for the warm runs
+                    run(store, urls, 1, 1, cold=False)
+                    latencies, elapsed = run(store, urls, concurrency, loads, cold=cache == 'cold')
+
+                    results.append({
+                        "benchmark": "concurrency",
+                        "handler": handler,
+                        "endpoints": endpoints,
+                        "cache": cache,
+                        "rows": rows,
+                        "concurrency": concurrency,
+                        **latency_summary(latencies, elapsed, len(urls)),
+                    })
+    finally:
+        purge_store_data(store)
+        store.user.delete()
+
+    return results
@@ -0,0 +1,46 @@
+import numpy as np
+
+from ..services.forecast_models import FORECAST_MODELS
+from ..services.forecasting_engine import forecast_matrix
+from .utils import Timer
+
+
+def seasonal_matrix(products, days=365, seed=42):
+    # Weekly seasonal demand with a per-product scale, trend and noise
+    rng = np.random.default_rng(seed)
+    weekly = np.array([0.8, 0.8, 0.9, 1.0, 1.2, 1.6, 1.7])
+
+    scale = rng.uniform(2, 50, size=(products, 1))
+    trend = rng.normal(0, 0.01, size=(products, 1))
+    day = np.arange(days)[None, :]
+
+    matrix = scale * weekly[day % 7] * (1 + trend * day / 7) + rng.normal(0, 1, size=(products, days))
+    lengths = rng.integers(days // 2, days + 1, size=products)
+    matrix[day >= lengths[:, None]] = 0
+
+    return np.maximum(matrix, 0).round(), lengths
+
+
+def benchmark_forecast_models(products=500, days=365, repeat=3, **options):
+    """Throughput (products/sec) and holdout error of every registered model."""
+    matrix, lengths = seasonal_matrix(products, days)
+    results = []
+
+    for name, model in FORECAST_MODELS.items():
+        timings = []
+        for _ in range(repeat):
+            with Timer() as timer:
+                metrics = forecast_matrix(matrix, lengths, model=model)
+            timings.append(timer.elapsed)
+
+        results.append({
+            "benchmark": "forecast_models",
+            "model": name,
+            "products": products,
+            "days": days,
+            "best_seconds": round(min(timings), 4),
+            "products_per_second": round(products / min(timings)),
+            "mean_mae": round(float(metrics["mae"].mean()), 3),
+        })
+
+    return results
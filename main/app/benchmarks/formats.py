@@ -0,0 +1,82 @@
+import os
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from django.conf import settings
+from django.core.files import File
+from ..services.ingestion import iter_upload_chunks, clean_sales_chunk
+from .synthetic import generate_sales_frame
+from .utils import Timer
+
+XLSX_MAX_ROWS = 100_000
+
+
+def write_format(frame, path, extension):
+    if extension == 'csv':
+        frame.to_csv(path, index=False)
+    elif extension == 'xlsx':
+        frame.to_excel(path, index=False, engine='openpyxl')
+    else:
+        # Columnar exports carry real date values rather than text
+        frame = frame.assign(Date=pd.to_datetime(frame['Date']))
+        if extension == 'parquet':
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_feather(path)
+
+
+def parse_file(path, chunksize):
+    # Everything process_sales_upload does before touching the database
+    rows = 0
+    with open(path, 'rb') as fh:
+        for chunk in iter_upload_chunks(File(fh, name=os.path.basename(path)), chunksize):
+            rows += len(clean_sales_chunk(chunk))
+    return rows
+
+
+def benchmark_upload_formats(rows=1_000_000, products=500, chunksize=None, **options):
+    """
+    Parse and clean time, and peak Python memory, for the same data as CSV,
+    XLSX (up to XLSX_MAX_ROWS rows), Parquet and Feather. Memory is measured
+    with tracemalloc, which sees pandas/NumPy buffers but not Arrow's own pool.
+    """
+    if chunksize is None:
+        chunksize = getattr(settings, 'SALES_UPLOAD_CHUNK_SIZE', None)
+
+    frame = generate_sales_frame(rows, products=products)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in ('csv', 'xlsx', 'parquet', 'feather'):
+            if extension == 'xlsx' and rows > XLSX_MAX_ROWS:
+                continue
+
+            path = os.path.join(tmp, f"benchmark.{extension}")
+            write_format(frame, path, extension)
+
+            with Timer() as timer:
+                parsed = parse_file(path, chunksize)
+
+            # Separate pass, tracemalloc would distort the timing
+            tracemalloc.start()
+            try:
+                parse_file(path, chunksize)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+            results.append({
+                "benchmark": "upload_formats",
+                "format": extension,
+                "rows": rows,
+                "chunksize": chunksize,
+                "file_bytes": os.path.getsize(path),
+                "parsed_rows": parsed,
+                "seconds": round(timer.elapsed, 3),
+                "rows_per_sec": round(rows / timer.elapsed, 1) if timer.elapsed else None,
+                "peak_python_bytes": peak,
+            })
+
+    return results
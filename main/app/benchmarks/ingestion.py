@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from django.core.files import File
+from ..services.ingestion import process_sales_upload
+from ..services.sales_loader import BACKEND_BULK_CREATE, BACKEND_COPY, resolve_backend
+from .synthetic import write_sales_file
+from .utils import create_benchmark_store, rolled_back, Timer
+
+
+def benchmark_ingestion_backends(rows=1_000_000, products=500, chunksize=None, **options):
+    """Rows/sec of process_sales_upload for the bulk_create and COPY backends."""
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_sales_file(os.path.join(tmp, 'benchmark.csv'), rows, products=products)
+
+        for backend in (BACKEND_BULK_CREATE, BACKEND_COPY):
+            with rolled_back():
+                store = create_benchmark_store()
+
+                with open(path, 'rb') as fh, Timer() as timer:
+                    data, status = process_sales_upload(
+                        File(fh, name='benchmark.csv'), store,
+                        chunksize=chunksize, backend=backend
+                    )
+
+            # A rejected upload would otherwise be reported with a throughput
+            if status != 200:
+                raise RuntimeError(f"Upload failed: {data}")
+
+            results.append({
+                "benchmark": "ingestion",
+                "backend": backend,
+                "effective_backend": resolve_backend(backend),
+                "rows": rows,
+                "records_inserted": data["records_inserted"],
+                "seconds": round(timer.elapsed, 3),
+                "rows_per_sec": round(rows / timer.elapsed, 1) if timer.elapsed else None,
+            })
+
+    return results
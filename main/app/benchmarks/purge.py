@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+
+from django.db import connection
+from ..models import Product
+from ..services.ingestion import clean_sales_chunk
+from ..services.purge import PURGE_BATCH_SIZE, PURGE_MODELS, purge_store_data
+from ..services.sales_loader import insert_sales
+from .synthetic import generate_sales_frame
+from .utils import create_benchmark_store, Timer
+
+SEED_CHUNK_ROWS = 500_000
+
+
+def seed_sales_rows(store, rows, products):
+    # Straight into Sales, the full upload path would dominate the setup time
+    created = Product.objects.bulk_create([
+        Product(store=store, ProductID=f"P{i}", ProductName=f"Product {i}", Category="Food",
+                Quantity=100000, CurrentStock=100000, UnitPrice=10)
+        for i in range(products)
+    ])
+    product_map = {product.ProductID: product.pk for product in created}
+
+    for start in range(0, rows, SEED_CHUNK_ROWS):
+        frame = generate_sales_frame(min(SEED_CHUNK_ROWS, rows - start), products=products, seed=start)
+        insert_sales(clean_sales_chunk(frame), product_map, store)
+
+
+def collector_delete(store, spans):
+    # The previous signout path, scoped to one store; each delete() is one transaction
+    for model in PURGE_MODELS:
+        with Timer() as timer:
+            model.objects.filter(store=store).delete()
+        spans.append(timer.elapsed)
+
+
+class DeleteTimer:
+    # execute_wrapper recording the slowest DELETE statement
+    def __init__(self):
+        self.statements = 0
+        self.longest = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if sql.lstrip().upper().startswith('DELETE'):
+                self.statements += 1
+                self.longest = max(self.longest, time.perf_counter() - started)
+
+
+def benchmark_purge(rows=1_000_000, products=500, batch_size=PURGE_BATCH_SIZE, **options):
+    """
+    Purge a store with `rows` sales through Django's delete() collector and
+    through the batched purge_store_data(). lock_seconds is the longest
+    single transaction: a whole model for the collector, one batch for the
+    purge. Peak Python memory is traced in the same run, which inflates
+    both timings somewhat.
+    """
+    results = []
+
+    for method, purge in (
+        ('collector', collector_delete),
+        ('batched', lambda store, spans: purge_store_data(store, batch_size=batch_size)),
+    ):
+        store = create_benchmark_store('purge')
+        seed_sales_rows(store, rows, products)
+
+        timer_wrapper = DeleteTimer()
+        spans = []
+        tracemalloc.start()
+        try:
+            with connection.execute_wrapper(timer_wrapper), Timer() as timer:
+                purge(store, spans)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results.append({
+            "benchmark": "purge",
+            "method": method,
+            "rows": rows,
+            "batch_size": batch_size if method == 'batched' else None,
+            "seconds": round(timer.elapsed, 3),
+            "delete_statements": timer_wrapper.statements,
+            "longest_delete_seconds": round(timer_wrapper.longest, 4),
+            # Every purge batch is a transaction of a single DELETE
+            "lock_seconds": round(max(spans, default=timer_wrapper.longest), 4),
+            "peak_python_bytes": peak,
+        })
+
+        store.user.delete()
+
+    return results
@@ -0,0 +1,47 @@
+from ..models import Product, StockRecommendation
+from ..services.stock_recommendation_engine import generate_stock_recommendations
+from .utils import create_benchmark_store, rolled_back, count_queries, Timer
+
+
+def benchmark_recommendations(products=10_000, repeat=3, **options):
+    """
+    Write time of generate_stock_recommendations for `products` SKUs, with
+    the old one-INSERT-per-product loop as the baseline.
+    """
+    with rolled_back():
+        store = create_benchmark_store()
+        created = Product.objects.bulk_create([
+            Product(store=store, ProductID=f"P{i}", ProductName=f"Product {i}", Category="Food",
+                    Quantity=1000, CurrentStock=i % 200, UnitPrice=10)
+            for i in range(products)
+        ])
+        forecast = {
+            f"P{i}": {"forecast_7_days": float(i % 150), "confidence": 75.0}
+            for i in range(products)
+        }
+
+        timings = []
+        for _ in range(repeat):
+            with count_queries() as queries, Timer() as timer:
+                generate_stock_recommendations(forecast, store)
+            timings.append(timer.elapsed)
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT')]
+
+        StockRecommendation.objects.filter(store=store).delete()
+        with Timer() as baseline:
+            for product in Product.objects.filter(store=store):
+                StockRecommendation.objects.create(
+                    store=store, ProductID=product, CurrentStock=product.CurrentStock,
+                    ForecastSevendays=1.0, RecommendedOrder=1.0, RiskLevel="safe", Confidence=75.0
+                )
+
+    return [{
+        "benchmark": "recommendations",
+        "products": len(created),
+        "queries": len(queries.captured_queries),
+        "insert_statements": len(inserts),
+        "best_seconds": round(min(timings), 4),
+        "mean_seconds": round(sum(timings) / len(timings), 4),
+        "per_row_create_seconds": round(baseline.elapsed, 4),
+    }]
@@ -0,0 +1,99 @@
+import os
+import tempfile
+
+from django.core.cache import caches
+from django.core.files import File
+from django.test import Client, override_settings
+from ..services.analytics import get_sales_insights
+from ..services.cache import CACHE_ALIAS
+from ..services.forecasting import get_revenue_forecast_metrics, get_product_velocity
+from ..services.forecasting_engine import generate_demand_forecast
+from ..services.ingestion import process_sales_upload
+from ..services.inventory import get_low_stock_alerts
+from ..services.stock_recommendation_engine import run_inventory_engine
+from .synthetic import write_sales_file
+from .utils import create_benchmark_store, rolled_back, count_queries, Timer
+
+SUITE_SIZES = (10_000, 1_000_000, 10_000_000)
+
+
+def uncached(func):
+    return getattr(func, '__wrapped__', func)
+
+
+SERVICES = {
+    'get_sales_insights': lambda store: uncached(get_sales_insights)(store),
+    'get_revenue_forecast_metrics': lambda store: uncached(get_revenue_forecast_metrics)(store),
+    'get_product_velocity': lambda store: uncached(get_product_velocity)(store),
+    'get_low_stock_alerts': lambda store: uncached(get_low_stock_alerts)(store),
+    'generate_demand_forecast': generate_demand_forecast,
+    'run_inventory_engine': lambda store: run_inventory_engine(store, force=True),
+}
+
+ENDPOINTS = (
+    '/get_insights/',
+    '/forecast_demand/',
+    '/product_velocity/',
+    '/low_stock_alert/',
+    '/demand_forecast/',
+    '/recommendations/',
+)
+
+
+def timed(result, func, *args):
+    with count_queries() as queries, Timer() as timer:
+        value = func(*args)
+
+    result.update(seconds=round(timer.elapsed, 4), queries=len(queries.captured_queries))
+    return result, value
+
+
+def run_suite_size(rows, products, path):
+    results = []
+
+    with rolled_back():
+        store = create_benchmark_store()
+
+        with open(path, 'rb') as fh:
+            upload, (data, status) = timed(
+                {"stage": "upload", "name": "process_sales_upload"},
+                process_sales_upload, File(fh, name=os.path.basename(path)), store
+            )
+        if status != 200:
+            raise RuntimeError(f"Upload failed: {data}")
+        upload["rows_per_sec"] = round(rows / upload["seconds"], 1) if upload["seconds"] else None
+        results.append(upload)
+
+        for name, service in SERVICES.items():
+            results.append(timed({"stage": "service", "name": name}, service, store)[0])
+
+        client = Client()
+        client.force_login(store.user)
+
+        # Endpoints are timed cold (empty analytics cache), then warm. Services
+        # stay on this connection, pool threads could not see the rolled back data
+        caches[CACHE_ALIAS].clear()
+        with override_settings(ALLOWED_HOSTS=['testserver'], ASYNC_SERVICE_THREADS=0):
+            for url in ENDPOINTS:
+                for state in ('cold', 'warm'):
+                    result, response = timed({"stage": "endpoint", "name": url, "cache": state}, client.get, url)
+                    result.update(status=response.status_code, bytes=len(response.content))
+                    results.append(result)
+
+    return [{"benchmark": "suite", "rows": rows, "products": products, **result} for result in results]
+
+
+def benchmark_suite(sizes=SUITE_SIZES, products=500, days=365, file_format='csv', **options):
+    """
+    Upload, every analytics service and every JSON endpoint, timed on a
+    fresh store per dataset size. Each size runs in a rolled back transaction.
+    """
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f"suite-{rows}.{file_format}")
+            write_sales_file(path, rows, products=products, days=days)
+            results.extend(run_suite_size(rows, products, path))
+
+    return results
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from ..services.ingestion import REQUIRED_COLUMNS
+
+# Relative demand Monday..Sunday, scaled by `seasonality`
+WEEKLY_PROFILE = np.array([-0.3, -0.3, -0.2, 0.0, 0.2, 0.6, 0.8])
+CATEGORIES = np.array(['Food', 'Dairy', 'Hygiene', 'Snacks', 'Beverages'])
+
+
+def generate_sales_frame(rows, products=500, days=365, start='2024-01-01', seed=42,
+                         seasonality=0.5, noise=0.3):
+    """
+    Deterministic sales rows in the upload schema. Sale days are drawn more
+    often, and with larger quantities, on busy weekdays per WEEKLY_PROFILE
+    times `seasonality` (0 = flat); `noise` is the relative spread of each
+    row's quantity around its product's base demand.
+    """
+    rng = np.random.default_rng(seed)
+
+    product_index = rng.integers(0, products, size=rows)
+    unit_prices = np.round(rng.uniform(5, 500, size=products), 2)
+    base_demand = rng.uniform(1, 15, size=products)
+
+    calendar = pd.date_range(start, periods=days, freq='D')
+    weekday_factor = 1 + seasonality * WEEKLY_PROFILE[calendar.weekday]
+    day_index = rng.choice(days, size=rows, p=weekday_factor / weekday_factor.sum())
+
+    expected = base_demand[product_index] * weekday_factor[day_index]
+    quantity = np.maximum(1, np.round(expected * (1 + noise * rng.standard_normal(rows)))).astype(int)
+
+    frame = pd.DataFrame({
+        'ProductID': np.char.add('P', product_index.astype(str)),
+        'ProductName': np.char.add('Product ', product_index.astype(str)),
+        'Category': CATEGORIES[product_index % len(CATEGORIES)],
+        'Date': calendar[day_index].strftime('%Y-%m-%d'),
+        'Quantity': 100000,
+        'QuantitySold': quantity,
+        'UnitPrice': unit_prices[product_index],
+        'PriceAtSale': unit_prices[product_index],
+    })
+
+    return frame[REQUIRED_COLUMNS]
+
+
+def generate_store_frames(stores, rows, seed=42, **kwargs):
+    # One independent frame per store, each with its own seed
+    for store in range(stores):
+        yield store, generate_sales_frame(rows, seed=seed + store, **kwargs)
+
+
+def write_sales_file(path, rows, **kwargs):
+    """Write a generated frame as .csv or .xlsx, picked from the extension."""
+    frame = generate_sales_frame(rows, **kwargs)
+
+    if str(path).lower().endswith('.xlsx'):
+        frame.to_excel(path, index=False, engine='openpyxl')
+    else:
+        frame.to_csv(path, index=False)
+
+    return path
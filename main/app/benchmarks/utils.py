@@ -0,0 +1,120 @@
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from ..models import StoreOwneres
+
+
+def create_benchmark_store(prefix='bench'):
+    user = User.objects.create_user(username=f"{prefix}-{uuid.uuid4().hex[:12]}")
+    return StoreOwneres.objects.create(
+        user=user, storename=user.username, ownername='Benchmark', city='Benchmark'
+    )
+
+
+@contextmanager
+def rolled_back():
+    # Everything written inside is discarded so benchmarks leave no data behind
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+        return False
+
+
+def seed_store_sales(store, rows, products=500, days=365, seed=42):
+    # Load synthetic sales through the real ingestion path
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from ..services.ingestion import process_sales_upload
+    from .synthetic import generate_sales_frame
+
+    frame = generate_sales_frame(rows, products=products, days=days, seed=seed)
+    upload = SimpleUploadedFile(f"seed-{seed}.csv", frame.to_csv(index=False).encode())
+    data, status = process_sales_upload(upload, store)
+
+    if status != 200:
+        raise RuntimeError(f"Seeding failed: {data}")
+
+    return data["records_inserted"]
+
+
+@contextmanager
+def count_queries():
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        yield context
+
+
+TIMING_FIELDS = ('seconds', 'best_seconds', 'mean_seconds')
+METRIC_FIELDS = TIMING_FIELDS + (
+    'queries', 'cached_queries', 'cached_seconds', 'rows_per_sec', 'products_per_second',
+    'per_row_create_seconds', 'bytes', 'records_inserted', 'mean_mae', 'status',
+    'insert_statements', 'daily_points', 'file_bytes', 'parsed_rows', 'peak_python_bytes',
+    'delete_statements', 'longest_delete_seconds', 'lock_seconds',
+    'loads', 'loads_per_sec', 'requests_per_sec', 'p50_seconds', 'p99_seconds',
+)
+
+
+def environment_info():
+    import platform
+    import subprocess
+    import django
+    from django.db import connection
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+        "recorded_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def result_key(result):
+    # Everything that is not a measurement identifies the benchmark case
+    return tuple(sorted((k, str(v)) for k, v in result.items() if k not in METRIC_FIELDS))
+
+
+def compare_results(results, baseline):
+    """Time ratio (current / baseline) for every case present in both runs."""
+    previous = {result_key(result): result for result in baseline}
+    comparison = []
+
+    for result in results:
+        before = previous.get(result_key(result))
+        if before is None:
+            continue
+
+        field = next((f for f in TIMING_FIELDS if f in result and before.get(f)), None)
+        if field is None:
+            continue
+
+        comparison.append({
+            **{k: v for k, v in result.items() if k not in METRIC_FIELDS},
+            "field": field,
+            "baseline": before[field],
+            "current": result[field],
+            "ratio": round(result[field] / before[field], 3),
+        })
+
+    return comparison
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from ...models import StoreOwneres
+from ...services.forecast_models import FORECAST_MODELS
+from ...services.forecasting_engine import FORECAST_DAYS
+from ...services.backtesting import (
+    BACKTEST_ORIGINS, backtest_store, backtest_matrix, summarize_backtest
+)
+
+
+class Command(BaseCommand):
+    help = "Rolling-origin backtest of the forecast models, storing per-product accuracy"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="StoreOwneres id (default: all stores)")
+        parser.add_argument('--models', nargs='+', choices=sorted(FORECAST_MODELS),
+                            help="Models to evaluate (default: all)")
+        parser.add_argument('--horizon', type=int, default=FORECAST_DAYS)
+        parser.add_argument('--origins', type=int, default=BACKTEST_ORIGINS)
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes per model")
+        parser.add_argument('--synthetic', type=int, metavar='PRODUCTS',
+                            help="Backtest a generated seasonal dataset instead of stored sales")
+        parser.add_argument('--days', type=int, default=365, help="History length for --synthetic")
+        parser.add_argument('--no-save', action='store_true', help="Report only, do not store metrics")
+        parser.add_argument('--output', help="Write the summary to this JSON file")
+
+    def handle(self, *args, **options):
+        if options['horizon'] < 1 or options['origins'] < 1:
+            raise CommandError("--horizon and --origins must be positive")
+
+        params = dict(
+            models=options['models'],
+            horizon=options['horizon'],
+            origins=options['origins'],
+            n_jobs=options['workers'],
+        )
+        report = []
+
+        if options['synthetic']:
+            from ...benchmarks.forecasting import seasonal_matrix
+
+            matrix, lengths = seasonal_matrix(options['synthetic'], options['days'])
+            results = backtest_matrix(matrix, lengths, **params)
+            report.extend({"store": "synthetic", **row} for row in summarize_backtest(results))
+        else:
+            stores = StoreOwneres.objects.all()
+            if options['store']:
+                stores = stores.filter(pk=options['store'])
+
+            for store in stores:
+                results = backtest_store(store, save=not options['no_save'], **params)
+                report.extend({"store": store.pk, **row} for row in summarize_backtest(results))
+
+        for row in report:
+            self.stdout.write(json.dumps(row))
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand
+from ...benchmarks.synthetic import write_sales_file
+
+
+class Command(BaseCommand):
+    help = "Write deterministic synthetic sales files in the upload schema, one per store"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help="Rows per store")
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--stores', type=int, default=1)
+        parser.add_argument('--start', default='2024-01-01')
+        parser.add_argument('--seasonality', type=float, default=0.5, help="Weekly swing, 0 for flat demand")
+        parser.add_argument('--noise', type=float, default=0.3, help="Relative quantity noise")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--output-dir', default='.')
+
+    def handle(self, *args, **options):
+        os.makedirs(options['output_dir'], exist_ok=True)
+
+        for store in range(options['stores']):
+            path = os.path.join(options['output_dir'], f"sales_store{store + 1}.{options['format']}")
+            write_sales_file(
+                path, options['rows'],
+                products=options['products'],
+                days=options['days'],
+                start=options['start'],
+                seed=options['seed'] + store,
+                seasonality=options['seasonality'],
+                noise=options['noise'],
+            )
+            self.stdout.write(f"Wrote {options['rows']} rows to {path}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from ...models import StoreOwneres
+from ...services.rollup import rebuild_daily_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyProductSales rollup from the raw Sales table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="StoreOwneres id (default: all stores)")
+
+    def handle(self, *args, **options):
+        if options['store']:
+            store = StoreOwneres.objects.get(pk=options['store'])
+            count = rebuild_daily_rollup(store)
+        else:
+            count = rebuild_daily_rollup()
+
+        self.stdout.write(f"Rebuilt {count} daily rollup rows")
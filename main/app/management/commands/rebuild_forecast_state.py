@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+from ...models import StoreOwneres
+from ...services.forecast_state import rebuild_forecast_state, check_forecast_state
+
+
+class Command(BaseCommand):
+    help = "Rebuild the incremental forecast state from Sales, or check it against a batch fit"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="StoreOwneres id (default: all stores)")
+        parser.add_argument('--check', action='store_true', help="Only report inconsistencies")
+
+    def handle(self, *args, **options):
+        stores = StoreOwneres.objects.all()
+        if options['store']:
+            stores = stores.filter(pk=options['store'])
+
+        failed = False
+
+        for store in stores:
+            if options['check']:
+                mismatches = check_forecast_state(store)
+                failed = failed or bool(mismatches)
+                self.stdout.write(f"{store}: {len(mismatches)} mismatches")
+                for mismatch in mismatches[:20]:
+                    self.stdout.write("  " + json.dumps(mismatch, default=str))
+            else:
+                count = rebuild_forecast_state(store)
+                self.stdout.write(f"{store}: rebuilt {count} product states")
+
+        if failed:
+            raise SystemExit(1)
@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+from ...models import StoreOwneres
+from ...services.stock import reconcile_stock, find_stock_drift
+
+
+class Command(BaseCommand):
+    help = "Recompute Product.CurrentStock from the sales rollup, or report where it has drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--store', type=int, help="StoreOwneres id (default: all stores)")
+        parser.add_argument('--check', action='store_true', help="Only report drifted products")
+
+    def handle(self, *args, **options):
+        store = None
+        if options['store']:
+            store = StoreOwneres.objects.get(pk=options['store'])
+
+        if options['check']:
+            drift = find_stock_drift(store)
+            self.stdout.write(f"{len(drift)} products with drifted stock")
+            for product in drift[:20]:
+                self.stdout.write("  " + json.dumps(product))
+            if drift:
+                raise SystemExit(1)
+        else:
+            count = reconcile_stock(store)
+            self.stdout.write(f"Reconciled stock for {count} products")
@@ -0,0 +1,67 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from ...benchmarks import BENCHMARKS
+from ...benchmarks.utils import environment_info, compare_results
+
+
+class Command(BaseCommand):
+    help = "Run a performance benchmark against the configured database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS))
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--stores', type=int, default=10)
+        parser.add_argument('--chunksize', type=int, default=None)
+        parser.add_argument('--sizes', type=int, nargs='+', help="Dataset sizes for the suite benchmark")
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'xlsx'], default='csv',
+                            help="Upload file format for the suite benchmark")
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help="Dashboard loads in flight for the concurrency benchmark")
+        parser.add_argument('--loads', type=int, default=200,
+                            help="Dashboard loads per case for the concurrency benchmark")
+        parser.add_argument('--output', help="Write results to this JSON file")
+        parser.add_argument('--compare', help="Earlier --output file to compare timings against")
+        parser.add_argument('--max-ratio', type=float, default=None,
+                            help="With --compare, fail when any case is slower than this ratio")
+
+    def handle(self, *args, **options):
+        benchmark = BENCHMARKS.get(options['name'])
+        if benchmark is None:
+            raise CommandError(f"Unknown benchmark {options['name']}")
+
+        extra = {'sizes': options['sizes']} if options['sizes'] else {}
+        results = benchmark(
+            rows=options['rows'],
+            products=options['products'],
+            stores=options['stores'],
+            chunksize=options['chunksize'],
+            file_format=options['file_format'],
+            concurrency=options['concurrency'],
+            loads=options['loads'],
+            **extra
+        )
+
+        for result in results:
+            self.stdout.write(json.dumps(result, default=str))
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump({"environment": environment_info(), "results": results}, fh, indent=2, default=str)
+
+        if options['compare']:
+            with open(options['compare']) as fh:
+                baseline = json.load(fh)
+
+            # Older files hold the bare result list
+            if isinstance(baseline, dict):
+                baseline = baseline["results"]
+
+            comparison = compare_results(results, baseline)
+            for row in comparison:
+                self.stdout.write(json.dumps({"compare": row}, default=str))
+
+            slower = [row for row in comparison if options['max_ratio'] and row["ratio"] > options['max_ratio']]
+            if slower:
+                raise CommandError(f"{len(slower)} cases slower than {options['max_ratio']}x the baseline")
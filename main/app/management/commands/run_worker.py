@@ -0,0 +1,39 @@
+import time
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ...services.jobs import claim_next_job, run_job, default_worker_id
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs (uploads, inventory engine)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+        parser.add_argument('--worker-id', default=None)
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        self.stdout.write(f"Worker {worker_id} started")
+
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job(worker_id)
+
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f"Running {job}")
+                job = run_job(job)
+                self.stdout.write(f"Finished {job}")
+
+        except KeyboardInterrupt:
+            self.stdout.write(f"Worker {worker_id} stopped")
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:50
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('JobType', models.CharField(max_length=50)),
+                ('Status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('Progress', models.FloatField(default=0)),
+                ('Message', models.CharField(blank=True, max_length=255)),
+                ('Payload', models.JSONField(blank=True, default=dict)),
+                ('Result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('WorkerID', models.CharField(blank=True, max_length=100)),
+                ('CreatedAt', models.DateTimeField(auto_now_add=True)),
+                ('StartedAt', models.DateTimeField(blank=True, null=True)),
+                ('FinishedAt', models.DateTimeField(blank=True, null=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.storeowneres')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['Status', 'CreatedAt'], name='app_backgro_Status_94cb3b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('FirstDate', models.DateField()),
+                ('LastDate', models.DateField()),
+                ('SaleDays', models.IntegerField(default=0)),
+                ('Count', models.IntegerField(default=0)),
+                ('SumX', models.FloatField(default=0)),
+                ('SumY', models.FloatField(default=0)),
+                ('SumXX', models.FloatField(default=0)),
+                ('SumXY', models.FloatField(default=0)),
+                ('SumYY', models.FloatField(default=0)),
+                ('ErrorCount', models.IntegerField(default=0)),
+                ('SumAbsError', models.FloatField(default=0)),
+                ('SumSqError', models.FloatField(default=0)),
+                ('UpdatedAt', models.DateTimeField(auto_now=True)),
+                ('ProductID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.storeowneres')),
+            ],
+            options={
+                'unique_together': {('store', 'ProductID')},
+            },
+        ),
+    ]
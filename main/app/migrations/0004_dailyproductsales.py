@@ -0,0 +1,59 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum, F
+
+
+def populate_rollup(apps, schema_editor):
+    Sales = apps.get_model('app', 'Sales')
+    DailyProductSales = apps.get_model('app', 'DailyProductSales')
+
+    rows = (
+        Sales.objects
+        .values('store', 'ProductID', 'Date')
+        .annotate(
+            quantity=Sum('QuantitySold'),
+            revenue=Sum(F('QuantitySold') * F('PriceAtSale'))
+        )
+        .order_by()
+    )
+
+    DailyProductSales.objects.bulk_create(
+        [
+            DailyProductSales(
+                store_id=row['store'],
+                ProductID_id=row['ProductID'],
+                Date=row['Date'],
+                QuantitySold=row['quantity'],
+                Revenue=row['revenue']
+            )
+            for row in rows
+        ],
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_forecaststate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Date', models.DateField()),
+                ('QuantitySold', models.BigIntegerField(default=0)),
+                ('Revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('ProductID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.storeowneres')),
+            ],
+            options={
+                'unique_together': {('store', 'ProductID', 'Date')},
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_dailyproductsales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dailyproductsales',
+            index=models.Index(fields=['store', 'Date'], name='app_dailypr_store_i_9848be_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(fields=['store', 'Date'], name='app_sales_store_i_dd5bed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(fields=['store', 'ProductID', 'Date'], name='app_sales_store_i_fb3ae5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockrecommendation',
+            index=models.Index(fields=['store', 'GeneratedAt'], name='app_stockre_store_i_06ff00_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_store_access_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeowneres',
+            name='DataVersion',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from django.db.models import Sum, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_current_stock(apps, schema_editor):
+    Product = apps.get_model('app', 'Product')
+    DailyProductSales = apps.get_model('app', 'DailyProductSales')
+
+    sold = (
+        DailyProductSales.objects
+        .filter(ProductID=OuterRef('pk'))
+        .values('ProductID')
+        .annotate(total=Sum('QuantitySold'))
+        .values('total')
+    )
+    Product.objects.update(CurrentStock=F('Quantity') - Coalesce(Subquery(sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_storeowneres_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='CurrentStock',
+            field=models.IntegerField(blank=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_current_stock, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['store', 'CurrentStock'], name='app_product_store_i_c330a5_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_product_currentstock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('DataVersion', models.PositiveIntegerField()),
+                ('TotalProducts', models.PositiveIntegerField(default=0)),
+                ('GeneratedAt', models.DateTimeField(auto_now_add=True)),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.storeowneres')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='stockrecommendation',
+            name='Run',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='app.recommendationrun'),
+        ),
+        migrations.AddIndex(
+            model_name='recommendationrun',
+            index=models.Index(fields=['store', '-GeneratedAt'], name='app_recomme_store_i_1bad8c_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_recommendationrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='ForecastModel',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='storeowneres',
+            name='ForecastModel',
+            field=models.CharField(blank=True, default='', max_length=30),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_forecastmodel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForecastAccuracy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ModelName', models.CharField(max_length=30)),
+                ('Horizon', models.PositiveIntegerField()),
+                ('Origins', models.PositiveIntegerField()),
+                ('MAE', models.FloatField()),
+                ('RMSE', models.FloatField()),
+                ('MAPE', models.FloatField(blank=True, null=True)),
+                ('Confidence', models.FloatField()),
+                ('EvaluatedAt', models.DateTimeField(auto_now=True)),
+                ('ProductID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.product')),
+                ('store', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.storeowneres')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['store', 'ModelName'], name='app_forecas_store_i_7cc2ca_idx')],
+                'unique_together': {('ProductID', 'ModelName')},
+            },
+        ),
+    ]
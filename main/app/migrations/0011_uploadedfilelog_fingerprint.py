@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_forecastaccuracy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedfilelog',
+            name='Fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='uploadedfilelog',
+            index=models.Index(fields=['store', 'Fingerprint'], name='app_uploade_store_i_fc528c_idx'),
+        ),
+    ]
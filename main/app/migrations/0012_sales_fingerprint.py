@@ -0,0 +1,22 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_uploadedfilelog_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sales',
+            name='Fingerprint',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(fields=['store', 'Fingerprint'], name='app_sales_store_i_d846b8_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_sales_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='Attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='HeartbeatAt',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_backgroundjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forecastaccuracy',
+            name='DataVersion',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def backfill_sales_fingerprints(apps, schema_editor):
+    from ..services.sales_loader import backfill_fingerprints
+
+    StoreOwneres = apps.get_model('app', 'StoreOwneres')
+    Sales = apps.get_model('app', 'Sales')
+
+    for store in StoreOwneres.objects.all():
+        backfill_fingerprints(store, sales_model=Sales)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0014_forecastaccuracy_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_sales_fingerprints, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 
 
 class StoreOwneres(models.Model):
@@ -7,6 +8,10 @@ class StoreOwneres(models.Model):
     storename = models.CharField(max_length=100)
     ownername = models.CharField(max_length=100)
     city = models.CharField(max_length=100)
+    # Bumped whenever the store's sales data changes, keys cached analytics
+    DataVersion = models.PositiveIntegerField(default=0)
+    # Name from forecast_models.FORECAST_MODELS; blank uses settings.FORECAST_MODEL
+    ForecastModel = models.CharField(max_length=30, blank=True, default='')
 
     def __str__(self):
         return self.storename
@@ -18,14 +23,26 @@ class Product(models.Model):
     ProductName = models.CharField(max_length=200)
     Category = models.CharField(max_length=100)
     Quantity = models.IntegerField()
+    # On-hand stock: opening Quantity minus everything sold, kept up to date by ingestion
+    CurrentStock = models.IntegerField(blank=True)
     UnitPrice = models.DecimalField(max_digits=10, decimal_places=2)
+    # Overrides the store's forecast model for this product when set
+    ForecastModel = models.CharField(max_length=30, blank=True, default='')
 
     class Meta:
         unique_together = ('store', 'ProductID')
+        indexes = [
+            models.Index(fields=['store', 'CurrentStock']),
+        ]
 
     def __str__(self):
         return f"{self.ProductName} ({self.store.storename})"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.CurrentStock is None:
+            self.CurrentStock = self.Quantity
+        super().save(*args, **kwargs)
+
 
 class Sales(models.Model):
     store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
@@ -33,6 +50,33 @@ class Sales(models.Model):
     Date = models.DateField()
     QuantitySold = models.IntegerField()
     PriceAtSale = models.DecimalField(max_digits=10, decimal_places=2)
+    # Row fingerprint used to skip rows re-sent by overlapping exports
+    Fingerprint = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', 'Date']),
+            models.Index(fields=['store', 'ProductID', 'Date']),
+            models.Index(fields=['store', 'Fingerprint']),
+        ]
+
+    def __str__(self):
+        return f"{self.ProductID.ProductName} - {self.Date}"
+
+
+class DailyProductSales(models.Model):
+    # Per store, product and day rollup of Sales, maintained by ingestion
+    store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
+    ProductID = models.ForeignKey(Product, on_delete=models.CASCADE)
+    Date = models.DateField()
+    QuantitySold = models.BigIntegerField(default=0)
+    Revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('store', 'ProductID', 'Date')
+        indexes = [
+            models.Index(fields=['store', 'Date']),
+        ]
 
     def __str__(self):
         return f"{self.ProductID.ProductName} - {self.Date}"
@@ -41,17 +85,39 @@ class Sales(models.Model):
 class UploadedFileLog(models.Model):
     store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
     FileHash = models.CharField(max_length=255)
+    # Sampled content fingerprint, screens re-uploads before a full hash
+    Fingerprint = models.CharField(max_length=64, blank=True)
     UploadedAt = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('store', 'FileHash')
+        indexes = [
+            models.Index(fields=['store', 'Fingerprint']),
+        ]
 
     def __str__(self):
         return f"{self.store.storename} - {self.FileHash}"
 
 
+class RecommendationRun(models.Model):
+    # One inventory engine run, tagged with the store data version it was computed from
+    store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
+    DataVersion = models.PositiveIntegerField()
+    TotalProducts = models.PositiveIntegerField(default=0)
+    GeneratedAt = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', '-GeneratedAt']),
+        ]
+
+    def __str__(self):
+        return f"{self.store.storename} v{self.DataVersion} ({self.GeneratedAt})"
+
+
 class StockRecommendation(models.Model):
     store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
+    Run = models.ForeignKey(RecommendationRun, on_delete=models.CASCADE, null=True, blank=True)
     ProductID = models.ForeignKey(Product, on_delete=models.CASCADE)
     CurrentStock = models.IntegerField()
     ForecastSevendays = models.FloatField()
@@ -60,5 +126,98 @@ class StockRecommendation(models.Model):
     Confidence = models.FloatField(null=True, blank=True)
     GeneratedAt = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['store', 'GeneratedAt']),
+        ]
+
+    def __str__(self):
+        return f"{self.ProductID.ProductName} - {self.RiskLevel}"
+
+class BackgroundJob(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
+    JobType = models.CharField(max_length=50)
+    Status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    Progress = models.FloatField(default=0)
+    Message = models.CharField(max_length=255, blank=True)
+    Payload = models.JSONField(default=dict, blank=True)
+    Result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    WorkerID = models.CharField(max_length=100, blank=True)
+    CreatedAt = models.DateTimeField(auto_now_add=True)
+    StartedAt = models.DateTimeField(null=True, blank=True)
+    # Set on claim and on every progress update, see requeue_stale_jobs()
+    HeartbeatAt = models.DateTimeField(null=True, blank=True)
+    Attempts = models.PositiveIntegerField(default=0)
+    FinishedAt = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['Status', 'CreatedAt']),
+        ]
+
+    def __str__(self):
+        return f"{self.JobType} #{self.pk} ({self.Status})"
+
+
+class ForecastState(models.Model):
+    # Running least-squares sums of daily QuantitySold on day index,
+    # day 0 being FirstDate and days without sales counted as zero
+    store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
+    ProductID = models.ForeignKey(Product, on_delete=models.CASCADE)
+    FirstDate = models.DateField()
+    LastDate = models.DateField()
+    SaleDays = models.IntegerField(default=0)
+    Count = models.IntegerField(default=0)
+    SumX = models.FloatField(default=0)
+    SumY = models.FloatField(default=0)
+    SumXX = models.FloatField(default=0)
+    SumXY = models.FloatField(default=0)
+    SumYY = models.FloatField(default=0)
+    # One-step-ahead residuals, accumulated as new days are appended
+    ErrorCount = models.IntegerField(default=0)
+    SumAbsError = models.FloatField(default=0)
+    SumSqError = models.FloatField(default=0)
+    UpdatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('store', 'ProductID')
+
+    def __str__(self):
+        return f"{self.ProductID.ProductName} state ({self.LastDate})"
+
+
+class ForecastAccuracy(models.Model):
+    # Rolling-origin backtest results per product and model, written by backtest_forecasts
+    store = models.ForeignKey(StoreOwneres, on_delete=models.CASCADE)
+    ProductID = models.ForeignKey(Product, on_delete=models.CASCADE)
+    ModelName = models.CharField(max_length=30)
+    Horizon = models.PositiveIntegerField()
+    Origins = models.PositiveIntegerField()
+    MAE = models.FloatField()
+    RMSE = models.FloatField()
+    MAPE = models.FloatField(null=True, blank=True)
+    Confidence = models.FloatField()
+    # Store data version the backtest read; results from older data are ignored
+    DataVersion = models.PositiveIntegerField(default=0)
+    EvaluatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('ProductID', 'ModelName')
+        indexes = [
+            models.Index(fields=['store', 'ModelName']),
+        ]
+
     def __str__(self):
-        return f"{self.ProductID.ProductName} - {self.RiskLevel}"
\ No newline at end of file
+        return f"{self.ProductID.ProductName} - {self.ModelName} (MAE {self.MAE:.2f})"
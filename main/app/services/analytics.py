@@ -1,48 +1,36 @@
-from django.db.models import Sum, F, FloatField, ExpressionWrapper
-from ..models import Sales
+import heapq
 
-def get_sales_insights(store):
+from django.db.models import Sum, FloatField
+from django.db.models.functions import Cast
+from ..models import DailyProductSales
+from .cache import store_cached
+from .instrumentation import instrumented
 
-    # Revenue expression
-    revenue_expression = ExpressionWrapper(
-        F('QuantitySold') * F('PriceAtSale'),
-        output_field=FloatField()
-    )
+TOP_N = 5
+
+
+@store_cached('sales_insights')
+@instrumented()
+def get_sales_insights(store, n=TOP_N):
 
-    # Group by product
-    base_qs = (
-        Sales.objects
+    # Per product totals in a single grouped read of the rollup
+    product_totals = list(
+        DailyProductSales.objects
         .filter(store=store)
         .values('ProductID__ProductName')
         .annotate(
             total_sold=Sum('QuantitySold'),
-            product_revenue=Sum(revenue_expression)
+            product_revenue=Cast(Sum('Revenue'), FloatField())
         )
+        .order_by()
     )
 
-    # Top 5 best selling
-    top_products = list(
-        base_qs.order_by('-total_sold')[:5]
-    )
-
-    # Bottom 5 least selling
-    least_products = list(
-        base_qs.order_by('total_sold')[:5]
-    )
-
-    # Total sold items for this store
-    total_sold_products = (
-        Sales.objects
-        .filter(store=store)
-        .aggregate(total=Sum('QuantitySold'))['total'] or 0
-    )
+    # Top/bottom N and store totals are derived in memory
+    top_products = heapq.nlargest(n, product_totals, key=lambda row: row['total_sold'])
+    least_products = heapq.nsmallest(n, product_totals, key=lambda row: row['total_sold'])
 
-    # Total revenue for this store
-    total_revenue = (
-        Sales.objects
-        .filter(store=store)
-        .aggregate(total=Sum(revenue_expression))['total'] or 0
-    )
+    total_sold_products = sum(row['total_sold'] for row in product_totals)
+    total_revenue = sum(row['product_revenue'] or 0 for row in product_totals)
 
     return {
         "top_products": top_products,
@@ -50,4 +38,3 @@ def get_sales_insights(store):
         "total_sold_products": total_sold_products,
         "total_revenue": round(total_revenue, 2),
     }
-
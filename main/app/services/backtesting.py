@@ -0,0 +1,192 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.db import transaction
+from ..models import ForecastAccuracy
+from .cache import get_data_version
+from .forecast_models import FORECAST_MODELS, get_forecast_model
+from .forecasting_engine import FORECAST_DAYS, load_daily_matrix
+from .instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_ORIGINS = 4
+BACKTEST_STEP_DAYS = 7
+MINIMUM_TRAIN_DAYS = 7
+
+
+def backtest_errors(model_name, matrix, lengths, horizon=FORECAST_DAYS,
+                    origins=BACKTEST_ORIGINS, step=BACKTEST_STEP_DAYS):
+    """
+    Rolling-origin evaluation of one model over every row of the matrix.
+    Origins sit `step` days apart, the last one `horizon` days before each
+    row's end; at each the model is fitted on the days before the origin
+    and scored on the `horizon` days after it. Returns per-row error sums.
+    """
+    model = get_forecast_model(model_name)
+    days = np.arange(matrix.shape[1])
+    n = len(matrix)
+
+    sums = {key: np.zeros(n) for key in ('abs', 'sq', 'pct', 'points', 'pct_points', 'origins')}
+
+    for origin in range(origins):
+        cut = lengths - horizon - origin * step
+        usable = cut >= MINIMUM_TRAIN_DAYS
+        if not usable.any():
+            break
+
+        train_lengths = np.where(usable, cut, MINIMUM_TRAIN_DAYS)
+        train = np.where(days[None, :] < train_lengths[:, None], matrix, 0)
+        predictions = model(train, train_lengths, horizon)
+
+        index = np.minimum(train_lengths[:, None] + np.arange(horizon)[None, :], matrix.shape[1] - 1)
+        actual = np.take_along_axis(matrix, index, axis=1)
+        errors = np.where(usable[:, None], np.maximum(predictions, 0) - actual, 0)
+
+        nonzero = usable[:, None] & (actual > 0)
+        pct = np.divide(np.abs(errors), actual, out=np.zeros_like(errors), where=nonzero)
+
+        sums['abs'] += np.abs(errors).sum(axis=1)
+        sums['sq'] += (errors ** 2).sum(axis=1)
+        sums['pct'] += pct.sum(axis=1)
+        sums['points'] += usable * horizon
+        sums['pct_points'] += nonzero.sum(axis=1)
+        sums['origins'] += usable
+
+    return sums
+
+
+def summarize_errors(sums, matrix, lengths):
+    points = np.maximum(sums['points'], 1)
+
+    mae = sums['abs'] / points
+    rmse = np.sqrt(sums['sq'] / points)
+    mape = np.where(
+        sums['pct_points'] > 0,
+        sums['pct'] / np.maximum(sums['pct_points'], 1) * 100,
+        np.nan
+    )
+
+    # Same scale-free confidence as the request-time holdout
+    mean_sales = matrix.sum(axis=1) / np.maximum(lengths, 1)
+    confidence = np.maximum(0, 1 - rmse / (mean_sales + 1))
+
+    return {
+        "mae": mae, "rmse": rmse, "mape": mape,
+        "confidence": confidence, "origins": sums['origins'].astype(int),
+    }
+
+
+def backtest_matrix(matrix, lengths, models=None, horizon=FORECAST_DAYS,
+                    origins=BACKTEST_ORIGINS, n_jobs=1):
+    """
+    Backtest each model over all rows, spreading row blocks over `n_jobs`
+    worker processes. Returns {model: (per-row metrics, wall seconds)}.
+    """
+    models = models or list(FORECAST_MODELS)
+    results = {}
+
+    blocks = np.array_split(np.arange(len(matrix)), max(1, min(n_jobs, len(matrix))))
+    pool = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+
+    try:
+        for name in models:
+            started = time.perf_counter()
+
+            if pool is None:
+                parts = [backtest_errors(name, matrix, lengths, horizon, origins)]
+                blocks_used = [np.arange(len(matrix))]
+            else:
+                futures = [
+                    pool.submit(backtest_errors, name, matrix[block], lengths[block], horizon, origins)
+                    for block in blocks
+                ]
+                parts = [future.result() for future in futures]
+                blocks_used = blocks
+
+            sums = {key: np.zeros(len(matrix)) for key in parts[0]}
+            for block, part in zip(blocks_used, parts):
+                for key, values in part.items():
+                    sums[key][block] = values
+
+            results[name] = (summarize_errors(sums, matrix, lengths), time.perf_counter() - started)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return results
+
+
+def save_accuracy(store, product_pks, model_name, metrics, horizon, data_version):
+    rows = [
+        ForecastAccuracy(
+            store=store,
+            ProductID_id=pk,
+            ModelName=model_name,
+            Horizon=horizon,
+            Origins=origins,
+            MAE=float(mae),
+            RMSE=float(rmse),
+            MAPE=None if np.isnan(mape) else float(mape),
+            Confidence=float(confidence),
+            DataVersion=data_version
+        )
+        for pk, mae, rmse, mape, confidence, origins in zip(
+            product_pks.tolist(), metrics["mae"], metrics["rmse"], metrics["mape"],
+            metrics["confidence"], metrics["origins"].tolist()
+        )
+        if origins
+    ]
+
+    with transaction.atomic():
+        ForecastAccuracy.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['ProductID', 'ModelName'],
+            update_fields=['Horizon', 'Origins', 'MAE', 'RMSE', 'MAPE', 'Confidence', 'DataVersion', 'EvaluatedAt']
+        )
+
+    return len(rows)
+
+
+@instrumented()
+def backtest_store(store, models=None, horizon=FORECAST_DAYS, origins=BACKTEST_ORIGINS,
+                   n_jobs=1, save=True):
+    """Backtest a store's products and optionally store the per-product metrics."""
+    # Tag the results with the version the backtest reads, not one bumped mid-run
+    data_version = get_data_version(store)
+    product_pks, matrix, lengths = load_daily_matrix(store)
+    if not len(product_pks):
+        return {}
+
+    results = backtest_matrix(matrix, lengths, models, horizon, origins, n_jobs)
+
+    if save:
+        for name, (metrics, _) in results.items():
+            saved = save_accuracy(store, product_pks, name, metrics, horizon, data_version)
+            logger.info("Stored %s backtest metrics for %s products of store %s", name, saved, store.pk)
+
+    return results
+
+
+def summarize_backtest(results):
+    # One line per model: error averaged over the products that had an origin
+    summary = []
+    for name, (metrics, seconds) in results.items():
+        evaluated = metrics["origins"] > 0
+        mape = metrics["mape"][evaluated]
+        mape = mape[~np.isnan(mape)]
+
+        summary.append({
+            "model": name,
+            "products": int(evaluated.sum()),
+            "mae": round(float(metrics["mae"][evaluated].mean()), 3) if evaluated.any() else None,
+            "rmse": round(float(metrics["rmse"][evaluated].mean()), 3) if evaluated.any() else None,
+            "mape": round(float(mape.mean()), 2) if len(mape) else None,
+            "seconds": round(seconds, 4),
+        })
+
+    return summary
+
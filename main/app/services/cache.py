@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from ..models import StoreOwneres
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = 'analytics'
+_MISSING = object()
+
+# Process-local hit/miss counters per cached function
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+_stats_lock = threading.Lock()
+
+
+def get_data_version(store):
+    return (
+        StoreOwneres.objects
+        .filter(pk=store.pk)
+        .values_list('DataVersion', flat=True)
+        .first()
+    ) or 0
+
+
+def bump_data_version(store=None):
+    # Every cached result keyed on the old version becomes unreachable
+    stores = StoreOwneres.objects.all()
+    if store is not None:
+        stores = stores.filter(pk=store.pk)
+    stores.update(DataVersion=F('DataVersion') + 1)
+
+
+def make_cache_key(name, store, version, args, kwargs):
+    arguments = repr((args, sorted(kwargs.items()))).encode()
+    digest = hashlib.md5(arguments, usedforsecurity=False).hexdigest()
+    return f"store:{store.pk}:v{version}:{name}:{digest}"
+
+
+def _record(name, hit):
+    with _stats_lock:
+        _stats[name]["hits" if hit else "misses"] += 1
+
+
+def store_cached(name, timeout=None):
+    """
+    Cache a service function whose first argument is the store, keyed by
+    the store's current DataVersion so uploads and deletes invalidate it.
+    """
+    def decorator(func):
+
+        @wraps(func)
+        def wrapper(store, *args, **kwargs):
+            cache = caches[CACHE_ALIAS]
+            version = get_data_version(store)
+            key = make_cache_key(name, store, version, args, kwargs)
+
+            result = cache.get(key, _MISSING)
+            if result is not _MISSING:
+                _record(name, hit=True)
+                return result
+
+            _record(name, hit=False)
+            result = func(store, *args, **kwargs)
+
+            cache.set(
+                key, result,
+                timeout if timeout is not None else getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 3600)
+            )
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def get_cache_stats():
+    with _stats_lock:
+        functions = {name: dict(counts) for name, counts in _stats.items()}
+
+    hits = sum(counts["hits"] for counts in functions.values())
+    misses = sum(counts["misses"] for counts in functions.values())
+
+    return {
+        "backend": getattr(settings, 'ANALYTICS_CACHE_BACKEND', 'locmem'),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+        "functions": functions,
+    }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def service_executor():
+    # One bounded pool per process, so concurrent requests cannot open unbounded DB connections
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'ASYNC_SERVICE_THREADS', 8),
+                thread_name_prefix='service'
+            )
+    return _executor
+
+
+def _call_service(func, args, kwargs):
+    # Pool threads live outside the request cycle, so they recycle their own connections
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_service(func, *args, **kwargs):
+    """
+    Await a synchronous service on the shared service pool. Unlike the
+    default thread-sensitive sync_to_async, calls from one request can run
+    side by side, each on its own database connection. With
+    ASYNC_SERVICE_THREADS = 0 services run one at a time on the request's
+    connection, which tests need to see their uncommitted data.
+    """
+    if not getattr(settings, 'ASYNC_SERVICE_THREADS', 8):
+        return await sync_to_async(func)(*args, **kwargs)
+
+    return await sync_to_async(
+        _call_service, thread_sensitive=False, executor=service_executor()
+    )(func, args, kwargs)
@@ -0,0 +1,69 @@
+import numpy as np
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: keep the first and last points and, per
+    bucket, the point forming the largest triangle with the previous kept
+    point and the next bucket's average. Preserves the visual shape of a
+    series with far fewer points.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    selected = [0]
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+
+        next_start = stop
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:stop] - y[previous]) -
+            (x[previous] - x[start:stop]) * (avg_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected.append(previous)
+
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def minmax_indices(y, threshold):
+    # Keep the minimum and maximum of each bucket, in time order
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+
+    selected = set()
+    for bucket in np.array_split(np.arange(n), max(threshold // 2, 1)):
+        if len(bucket):
+            selected.add(int(bucket[y[bucket].argmin()]))
+            selected.add(int(bucket[y[bucket].argmax()]))
+
+    return np.array(sorted(selected))
+
+
+def downsample_rows(rows, value_key, max_points, method='lttb'):
+    """Reduce a list of series rows to about `max_points`, keeping their order."""
+    if not max_points or len(rows) <= max_points:
+        return rows
+
+    values = [row[value_key] or 0 for row in rows]
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+
+    return [rows[i] for i in pick(values, max_points)]
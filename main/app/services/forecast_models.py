@@ -0,0 +1,126 @@
+"""
+Forecasting models. Every model takes (values, lengths, steps): a product x day
+matrix where row i holds lengths[i] observed days, and returns a
+(products, steps) array of predictions for the days after each row's range.
+Models work on all rows at once with NumPy, so one call covers a whole store.
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SEASON_LENGTH = 7
+MOVING_AVERAGE_WINDOW = 7
+
+# Smoothing factors for level, trend and weekly season
+HW_ALPHA = 0.3
+HW_BETA = 0.05
+HW_GAMMA = 0.2
+
+
+def linear_trend(values, lengths, steps):
+    """
+    Closed-form least squares of value on day index, fitted for every row
+    at once over its first lengths[i] days. Returns predictions for the
+    `steps` days that follow each row's fitted range.
+    """
+    days = np.arange(values.shape[1])
+    mask = days[None, :] < lengths[:, None]
+    n = np.maximum(lengths, 1)
+
+    mean_x = (lengths - 1) / 2
+    mean_y = np.where(mask, values, 0).sum(axis=1) / n
+
+    dx = np.where(mask, days[None, :] - mean_x[:, None], 0)
+    sxx = (dx ** 2).sum(axis=1)
+    sxy = (dx * values).sum(axis=1)
+
+    slope = np.divide(sxy, sxx, out=np.zeros_like(sxy), where=sxx > 0)
+    intercept = mean_y - slope * mean_x
+
+    future_days = lengths[:, None] + np.arange(steps)[None, :]
+    return intercept[:, None] + slope[:, None] * future_days
+
+
+def moving_average(values, lengths, steps, window=MOVING_AVERAGE_WINDOW):
+    """Flat forecast at the mean of each row's last `window` observed days."""
+    offsets = np.arange(window)
+    index = lengths[:, None] - window + offsets[None, :]
+    valid = index >= 0
+
+    recent = np.take_along_axis(values, np.maximum(index, 0), axis=1)
+    mean = np.where(valid, recent, 0).sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+
+    return np.repeat(mean[:, None], steps, axis=1)
+
+
+def holt_winters_weekly(values, lengths, steps, alpha=HW_ALPHA, beta=HW_BETA, gamma=HW_GAMMA):
+    """
+    Additive Holt-Winters with a 7 day season. The recursion steps through
+    the days once, updating every product that still has data on that day,
+    so the cost is one vector operation per day rather than per product.
+    """
+    rows = np.arange(len(values))
+    if values.shape[1] < SEASON_LENGTH:
+        values = np.pad(values, ((0, 0), (0, SEASON_LENGTH - values.shape[1])))
+    season_days = np.arange(SEASON_LENGTH)
+
+    # Initial level and season from the first week, trend from the first two
+    first_week = season_days[None, :] < lengths[:, None]
+    level = np.where(first_week, values[:, :SEASON_LENGTH], 0).sum(axis=1) / np.maximum(first_week.sum(axis=1), 1)
+    season = np.where(first_week, values[:, :SEASON_LENGTH] - level[:, None], 0)
+
+    trend = np.zeros(len(values))
+    if values.shape[1] >= 2 * SEASON_LENGTH:
+        second_week = values[:, SEASON_LENGTH:2 * SEASON_LENGTH].mean(axis=1)
+        trend = np.where(lengths >= 2 * SEASON_LENGTH, (second_week - level) / SEASON_LENGTH, 0)
+
+    for day in range(SEASON_LENGTH, int(lengths.max(initial=0))):
+        active = day < lengths
+        y = values[:, day]
+        slot = day % SEASON_LENGTH
+
+        new_level = alpha * (y - season[:, slot]) + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        new_season = gamma * (y - new_level) + (1 - gamma) * season[:, slot]
+
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        season[:, slot] = np.where(active, new_season, season[:, slot])
+
+    horizon = np.arange(1, steps + 1)
+    slots = (lengths[:, None] + horizon[None, :] - 1) % SEASON_LENGTH
+
+    return level[:, None] + trend[:, None] * horizon[None, :] + season[rows[:, None], slots]
+
+
+FORECAST_MODELS = {
+    'linear': linear_trend,
+    'moving_average': moving_average,
+    'holt_winters': holt_winters_weekly,
+}
+
+DEFAULT_FORECAST_MODEL = 'linear'
+
+
+def get_forecast_model(name):
+    if name not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model {name!r}, choose from {', '.join(FORECAST_MODELS)}")
+    return FORECAST_MODELS[name]
+
+
+def resolve_model_name(*choices):
+    """
+    First configured model name among `choices` (product, then store), then
+    settings.FORECAST_MODEL. Unknown names are logged and skipped.
+    """
+    for name in (*choices, getattr(settings, 'FORECAST_MODEL', DEFAULT_FORECAST_MODEL)):
+        if not name:
+            continue
+        if name in FORECAST_MODELS:
+            return name
+        logger.warning("Ignoring unknown forecast model %r", name)
+
+    return DEFAULT_FORECAST_MODEL
@@ -0,0 +1,315 @@
+import logging
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from ..models import DailyProductSales, ForecastState
+from .cache import bump_data_version
+from .forecasting_engine import FORECAST_DAYS, MINIMUM_DATA_POINTS, load_daily_matrix, linear_trend
+
+logger = logging.getLogger(__name__)
+
+STATE_FIELDS = [
+    'FirstDate', 'LastDate', 'SaleDays', 'Count', 'SumX', 'SumY', 'SumXX',
+    'SumXY', 'SumYY', 'ErrorCount', 'SumAbsError', 'SumSqError'
+]
+SUM_FIELDS = ['Count', 'SumX', 'SumY', 'SumXX', 'SumXY', 'SumYY']
+
+# The running sums only support a least-squares trend
+INCREMENTAL_MODEL = 'linear'
+
+
+def fit_from_sums(n, sx, sy, sxx, sxy):
+    # Ordinary least squares of y on x from the running sums (works on arrays)
+    n, sx, sy, sxx, sxy = (np.asarray(v, dtype=float) for v in (n, sx, sy, sxx, sxy))
+
+    denominator = n * sxx - sx * sx
+    slope = np.divide(n * sxy - sx * sy, denominator,
+                      out=np.zeros_like(denominator), where=denominator > 0)
+    intercept = np.divide(sy - slope * sx, n, out=np.zeros_like(n), where=n > 0)
+
+    return slope, intercept
+
+
+def empty_state(store, product_pk, first_date):
+    return ForecastState(
+        store=store,
+        ProductID_id=product_pk,
+        FirstDate=first_date,
+        LastDate=first_date - timedelta(days=1)
+    )
+
+
+def append_days(state, x, y):
+    """
+    Add consecutive days past the end of the state's range. Each day is
+    first scored against the fit of the days before it, which keeps the
+    residual stats honest without refitting the history.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    def before(values):
+        # Running total of the days preceding each appended day
+        return np.concatenate(([0.0], np.cumsum(values)[:-1]))
+
+    n = state.Count + np.arange(len(x))
+    slope, intercept = fit_from_sums(
+        n,
+        state.SumX + before(x),
+        state.SumY + before(y),
+        state.SumXX + before(x * x),
+        state.SumXY + before(x * y)
+    )
+
+    scored = n >= 2
+    errors = (y - (intercept + slope * x))[scored]
+
+    state.ErrorCount += int(scored.sum())
+    state.SumAbsError += float(np.abs(errors).sum())
+    state.SumSqError += float((errors ** 2).sum())
+
+    state.Count += len(x)
+    state.SumX += float(x.sum())
+    state.SumY += float(y.sum())
+    state.SumXX += float((x * x).sum())
+    state.SumXY += float((x * y).sum())
+    state.SumYY += float((y * y).sum())
+    state.SaleDays += int((y > 0).sum())
+    state.LastDate = state.FirstDate + timedelta(days=state.Count - 1)
+
+
+def shift_start(state, first_date):
+    # Sales before FirstDate move every existing day index up by k and add
+    # k leading days, which start out as zeros
+    k = (state.FirstDate - first_date).days
+
+    state.SumXX += 2 * k * state.SumX + k * k * state.Count
+    state.SumXY += k * state.SumY
+    state.SumX += k * state.Count
+
+    leading = np.arange(k, dtype=float)
+    state.Count += k
+    state.SumX += float(leading.sum())
+    state.SumXX += float((leading ** 2).sum())
+    state.FirstDate = first_date
+
+
+def build_states(store, product_pks=None):
+    # Fresh states for the store's products (all, or `product_pks`), computed from the full history
+    rows = DailyProductSales.objects.filter(store=store)
+    if product_pks is not None:
+        rows = rows.filter(ProductID__in=product_pks)
+    rows = rows.values_list('ProductID', 'Date', 'QuantitySold').order_by('ProductID', 'Date')
+    df = pd.DataFrame(list(rows), columns=['ProductID', 'Date', 'total_sold'])
+
+    states = []
+    for product_pk, group in df.groupby('ProductID'):
+        dates = pd.to_datetime(group['Date'])
+        first_date = dates.min().date()
+        x = (dates - dates.min()).dt.days.to_numpy()
+
+        y = np.zeros(x.max() + 1)
+        y[x] = group['total_sold'].to_numpy(dtype=float)
+
+        state = empty_state(store, product_pk, first_date)
+        append_days(state, np.arange(len(y)), y)
+        states.append(state)
+
+    return states
+
+
+def rebuild_forecast_state(store):
+    states = build_states(store)
+
+    with transaction.atomic():
+        ForecastState.objects.filter(store=store).delete()
+        ForecastState.objects.bulk_create(states, batch_size=1000)
+
+    bump_data_version(store)
+
+    return len(states)
+
+
+def update_forecast_state(store, daily):
+    """
+    Fold a committed upload into the running state. `daily` holds the
+    uploaded QuantitySold per product_pk and Date.
+    """
+    if daily.empty:
+        return 0
+
+    daily = daily.groupby(['product_pk', 'Date'], as_index=False)['QuantitySold'].sum()
+    daily['Date'] = pd.to_datetime(daily['Date'])
+    product_pks = daily['product_pk'].unique().tolist()
+
+    # One transaction with the states locked, so a failure applies nothing and
+    # concurrent updates for the store cannot overwrite each other's sums
+    with transaction.atomic():
+        states = {
+            state.ProductID_id: state
+            for state in ForecastState.objects.select_for_update().filter(store=store, ProductID__in=product_pks)
+        }
+
+        # Products without a state yet (new, or from before the state existed) are
+        # built from their whole rollup history, which already includes this upload
+        missing = [pk for pk in product_pks if pk not in states]
+        created = build_states(store, missing) if missing else []
+        # A concurrent update may have built the same state from the same rollup
+        ForecastState.objects.bulk_create(created, batch_size=1000, ignore_conflicts=True)
+
+        daily = daily[daily['product_pk'].isin(states)]
+        if daily.empty:
+            return len(created)
+
+        # Day totals after the upload, needed to update sums of y squared
+        current = pd.DataFrame(
+            list(
+                DailyProductSales.objects
+                .filter(
+                    store=store,
+                    ProductID__in=list(states),
+                    Date__range=(daily['Date'].min().date(), daily['Date'].max().date())
+                )
+                .values_list('ProductID', 'Date', 'QuantitySold')
+            ),
+            columns=['ProductID', 'Date', 'total_sold']
+        )
+        current['Date'] = pd.to_datetime(current['Date'])
+        daily = daily.merge(
+            current, left_on=['product_pk', 'Date'], right_on=['ProductID', 'Date'], how='left'
+        )
+        daily['total_sold'] = daily['total_sold'].fillna(daily['QuantitySold'])
+
+        updated = []
+
+        for product_pk, group in daily.groupby('product_pk'):
+            first_date = group['Date'].min().date()
+            state = states[product_pk]
+
+            updated.append(state)
+            if first_date < state.FirstDate:
+                shift_start(state, first_date)
+
+            x = (group['Date'] - pd.Timestamp(state.FirstDate)).dt.days.to_numpy()
+            delta = group['QuantitySold'].to_numpy(dtype=float)
+            y_new = group['total_sold'].to_numpy(dtype=float)
+            y_old = y_new - delta
+
+            # Days already inside the fitted range change their y in place
+            inside = x < state.Count
+            state.SumY += float(delta[inside].sum())
+            state.SumXY += float((x[inside] * delta[inside]).sum())
+            state.SumYY += float((y_new[inside] ** 2 - y_old[inside] ** 2).sum())
+            state.SaleDays += int(((y_old[inside] <= 0) & (y_new[inside] > 0)).sum())
+
+            # Days past the end are appended in order, gaps as zero days
+            if (~inside).any():
+                new_x = np.arange(state.Count, x.max() + 1)
+                new_y = np.zeros(len(new_x))
+                new_y[x[~inside] - state.Count] = y_new[~inside]
+                append_days(state, new_x, new_y)
+
+        ForecastState.objects.bulk_update(updated, STATE_FIELDS, batch_size=1000)
+
+        return len(created) + len(updated)
+
+
+def schedule_forecast_state_update(store, daily):
+    # Runs once the upload transaction has committed; a failure here only
+    # leaves the state stale until the next rebuild
+    def run():
+        try:
+            update_forecast_state(store, daily)
+        except Exception:
+            logger.exception("Forecast state update failed for store %s", store.pk)
+
+    transaction.on_commit(run)
+
+
+def get_incremental_forecast(store):
+    """Forecast dict in generate_demand_forecast's shape, read from the stored sums."""
+    rows = list(
+        ForecastState.objects
+        .filter(store=store, SaleDays__gte=MINIMUM_DATA_POINTS)
+        .values('ProductID__ProductID', 'ProductID__ProductName', *SUM_FIELDS,
+                'ErrorCount', 'SumAbsError', 'SumSqError')
+    )
+
+    if not rows:
+        return {}
+
+    df = pd.DataFrame(rows)
+    n = df['Count'].to_numpy(dtype=float)
+    slope, intercept = fit_from_sums(n, df['SumX'], df['SumY'], df['SumXX'], df['SumXY'])
+
+    future_x = n[:, None] + np.arange(FORECAST_DAYS)[None, :]
+    forecast = np.maximum(intercept[:, None] + slope[:, None] * future_x, 0).sum(axis=1)
+
+    error_count = np.maximum(df['ErrorCount'].to_numpy(dtype=float), 1)
+    mae = df['SumAbsError'].to_numpy() / error_count
+    rmse = np.sqrt(df['SumSqError'].to_numpy() / error_count)
+    confidence = np.maximum(0, 1 - rmse / (df['SumY'].to_numpy() / n + 1))
+
+    return {
+        row['ProductID__ProductID']: {
+            "product_name": row['ProductID__ProductName'],
+            "model": INCREMENTAL_MODEL,
+            "forecast_7_days": round(float(forecast[i]), 2),
+            "confidence": round(float(confidence[i]), 2),
+            "mae": round(float(mae[i]), 2),
+            "rmse": round(float(rmse[i]), 2),
+            "accuracy_source": "incremental"
+        }
+        for i, row in enumerate(rows)
+    }
+
+
+def check_forecast_state(store, tolerance=1e-6):
+    """
+    Compare the stored state against a rebuild from the daily rollup and its forecast
+    against a batch least-squares fit of the full history. Returns a list
+    of mismatches, empty when the state is consistent.
+    """
+    mismatches = []
+
+    stored = {s.ProductID_id: s for s in ForecastState.objects.filter(store=store)}
+    fresh = {s.ProductID_id: s for s in build_states(store)}
+
+    for product_pk in stored.keys() | fresh.keys():
+        a, b = stored.get(product_pk), fresh.get(product_pk)
+        if a is None or b is None:
+            mismatches.append({"product": product_pk, "field": "missing" if a is None else "stale"})
+            continue
+
+        for field in SUM_FIELDS + ['SaleDays', 'FirstDate', 'LastDate']:
+            expected, actual = getattr(b, field), getattr(a, field)
+            if isinstance(expected, float):
+                equal = np.isclose(actual, expected, rtol=tolerance, atol=tolerance)
+            else:
+                equal = actual == expected
+            if not equal:
+                mismatches.append({
+                    "product": product_pk, "field": field,
+                    "stored": actual, "expected": expected
+                })
+
+    # Batch fit over each product's full range must agree with the sums
+    product_pks, matrix, lengths = load_daily_matrix(store)
+    if len(product_pks):
+        batch = np.maximum(linear_trend(matrix, lengths, FORECAST_DAYS), 0).sum(axis=1)
+        for product_pk, expected in zip(product_pks.tolist(), batch):
+            state = stored.get(product_pk)
+            if state is None:
+                continue
+            slope, intercept = fit_from_sums(state.Count, state.SumX, state.SumY, state.SumXX, state.SumXY)
+            future_x = state.Count + np.arange(FORECAST_DAYS)
+            actual = float(np.maximum(intercept + slope * future_x, 0).sum())
+            if not np.isclose(actual, expected, rtol=1e-4, atol=1e-4):
+                mismatches.append({
+                    "product": product_pk, "field": "forecast_7_days",
+                    "stored": actual, "expected": float(expected)
+                })
+
+    return mismatches
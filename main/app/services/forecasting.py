@@ -1,47 +1,140 @@
-from django.db.models import Sum, F, Count, FloatField, Case, When, Value
-from django.db.models.functions import TruncWeek, TruncDate
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Sum, Max, Min
 from datetime import timedelta
-from ..models import Sales
+import numpy as np
+from ..models import DailyProductSales, Product
+from .cache import store_cached
+from .downsampling import downsample_rows
+from .instrumentation import instrumented
 import logging
 logger = logging.getLogger(__name__)
 
-def get_revenue_forecast_metrics(store):
+TOP_CONTRIBUTORS = 5
+
+
+def growth_series(values):
+    """
+    Period over period growth for a revenue series in one vectorized pass.
+    Returns (growth_percent, trend) lists aligned with `values`; the first
+    period and periods following a zero have no growth percent.
+    """
+    values = np.asarray(values, dtype=float)
+    previous = np.concatenate(([np.nan], values[:-1]))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.round((values - previous) / previous * 100, 2)
+
+    diff = values - previous
+    trend = np.where(diff > 0, 'upwards', np.where(diff < 0, 'downwards', 'neutral'))
+
+    growth = [float(p) if np.isfinite(p) else None for p in percent]
+    return growth, trend.tolist()
+
+
+def week_start(day):
+    # Weeks start on Monday, like TruncWeek
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def bucket_revenue(daily_revenue, period_start):
+    # Sum the daily series into periods, keeping Decimal revenue exact
+    buckets = {}
+    for row in daily_revenue:
+        period = period_start(row['Date'])
+        buckets[period] = buckets.get(period, 0) + (row['daily_revenue'] or 0)
+    return sorted(buckets.items())
+
+
+def add_growth(rows, value_key, prefix):
+    growth, trend = growth_series([row[value_key] or 0 for row in rows])
+    for row, percent, label in zip(rows, growth, trend):
+        row[f'{prefix}_growth_percent'] = percent
+        row[f'{prefix}_growth_trend'] = label
+
+
+def series_with_growth(rows, value_key, prefix, max_points, method):
+    # Growth is measured after downsampling, between the points actually charted
+    rows = downsample_rows(rows, value_key, max_points, method)
+    add_growth(rows, value_key, prefix)
+    return rows
+
+
+@store_cached('revenue_forecast_metrics')
+@instrumented()
+def get_revenue_forecast_metrics(store, top_n=TOP_CONTRIBUTORS, start=None, end=None,
+                                 granularity='day', max_points=None, downsample='lttb'):
+    """
+    Revenue series and contribution for the store, optionally restricted to
+    [start, end]. `granularity` picks the series returned (daily, weekly or
+    monthly; weekly is always included for best/worst week) and
+    `max_points` downsamples the returned series so the payload stays bounded,
+    REVENUE_MAX_POINTS when not given.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    if max_points is None:
+        max_points = getattr(settings, 'REVENUE_MAX_POINTS', None)
+
+    sales = DailyProductSales.objects.filter(store=store)
+    if start:
+        sales = sales.filter(Date__gte=start)
+    if end:
+        sales = sales.filter(Date__lte=end)
+
     # -------- DAILY REVENUE --------
     daily_revenue = list(
-        Sales.objects.filter(store=store)
+        sales
         .values('Date')
-        .annotate(daily_revenue=Sum(F('QuantitySold') * F('PriceAtSale')))
+        .annotate(daily_revenue=Sum('Revenue'))
         .order_by('Date')
     )
 
     total_revenue = sum(row['daily_revenue'] or 0 for row in daily_revenue)
 
-    prev = None
-    for row in daily_revenue:
-        curr = row['daily_revenue'] or 0
+    # -------- WEEKLY REVENUE --------
+    weekly_revenue = [
+        {'week': week, 'weekly_revenue': revenue}
+        for week, revenue in bucket_revenue(daily_revenue, week_start)
+    ]
 
-        if prev and prev != 0:
-            row['daily_growth_percent'] = round(((curr - prev) / prev) * 100, 2)
-        else:
-            row['daily_growth_percent'] = None
-
-        if prev is None:
-            row['daily_growth_percent'] = 'neutral'
-        elif curr > prev:
-            row['daily_growth_percent'] = 'upwards'
-        elif curr < prev:
-            row['daily_growth_percent'] = 'downwards'
-        else:
-            row['daily_growth_percent'] = 'neutral'
+    best_week = max(weekly_revenue, key=lambda x: x['weekly_revenue'], default=None)
+    worst_week = min(weekly_revenue, key=lambda x: x['weekly_revenue'], default=None)
 
-        prev = curr
+    for row in weekly_revenue:
+        start_day = row['week']
+        end_day = start_day + timedelta(days=6)
+        row['week_name'] = f"{start_day.strftime('%d %b')} - {end_day.strftime('%d %b')}"
+
+    series = {
+        "weekly_revenue": series_with_growth(weekly_revenue, 'weekly_revenue', 'weekly', max_points, downsample)
+    }
+
+    if granularity == 'day':
+        series["daily_revenue"] = series_with_growth(daily_revenue, 'daily_revenue', 'daily', max_points, downsample)
+
+    elif granularity == 'month':
+        monthly_revenue = [
+            {'month': month, 'monthly_revenue': revenue, 'month_name': month.strftime('%b %Y')}
+            for month, revenue in bucket_revenue(daily_revenue, month_start)
+        ]
+        series["monthly_revenue"] = series_with_growth(
+            monthly_revenue, 'monthly_revenue', 'monthly', max_points, downsample
+        )
 
     # -------- PRODUCT REVENUE CONTRIBUTION --------
-    product_revenue = list(
-        Sales.objects
+    product_revenue = (
+        sales
         .values('ProductID__ProductName')
-        .annotate(product_revenue=Sum(F('QuantitySold') * F('PriceAtSale')))
-        .order_by('-product_revenue')
+        .annotate(product_revenue=Sum('Revenue'))
+        .order_by('-product_revenue')[:top_n]
     )
 
     revenue_contribution = []
@@ -53,49 +146,10 @@ def get_revenue_forecast_metrics(store):
             'revenue_contribution_percent': round(percent, 2)
         })
 
-    revenue_contribution = revenue_contribution[:5]
-
-    # -------- WEEKLY REVENUE --------
-    weekly_revenue = list(
-        Sales.objects
-        .annotate(week=TruncWeek('Date'))
-        .values('week')
-        .annotate(weekly_revenue=Sum(F('QuantitySold') * F('PriceAtSale')))
-        .order_by('week')
-    )
-
-    best_week = max(weekly_revenue, key=lambda x: x['weekly_revenue'], default=None)
-    worst_week = min(weekly_revenue, key=lambda x: x['weekly_revenue'], default=None)
-
-    prev = None
-    for row in weekly_revenue:
-        curr = row['weekly_revenue'] or 0
-        start = row['week']
-        end = start + timedelta(days=6)
-        row['week_name'] = f"{start.strftime('%d %b')} - {end.strftime('%d %b')}"
-
-        if prev and prev != 0:
-            row['weekly_growth_percent'] = round(((curr - prev) / prev) * 100, 2)
-        else:
-            row['weekly_growth_percent'] = None
-
-        if prev is None:
-            row['weekly_growth_trend'] = 'neutral'
-        elif curr > prev:
-            row['weekly_growth_trend'] = 'upwards'
-        elif curr < prev:
-            row['weekly_growth_trend'] = 'downwards'
-        else:
-            row['weekly_growth_trend'] = 'neutral'
-
-        prev = curr
-
-
-
     logger.info("Forecast demand endpoint triggered")
     return {
-        "daily_revenue": daily_revenue,
-        "weekly_revenue": weekly_revenue,
+        **series,
+        "granularity": granularity,
         "best_week": best_week,
         "worst_week": worst_week,
         "total_revenue": total_revenue,
@@ -105,33 +159,85 @@ def get_revenue_forecast_metrics(store):
 
 
 
-   # -------- PRODUCT VELOCITY --------
-def get_product_velocity():
-    velocity = (
-        Sales.objects
-        .annotate(day=TruncDate('Date'))
-        .values('ProductID__ProductName', 'ProductID__Quantity')
-        .annotate(
-            total_sold=Sum('QuantitySold'),
-            active_days=Count('day', distinct=True)
+# -------- PRODUCT VELOCITY --------
+VELOCITY_WINDOWS = (7, 30, 90)
+VELOCITY_PAGE_SIZE = 100
+
+
+@store_cached('product_velocity')
+@instrumented()
+def get_product_velocity(store, window=30, page=1, page_size=VELOCITY_PAGE_SIZE, as_of=None):
+    """
+    Average daily sales over the last `window` days (ending at `as_of`, by
+    default the store's latest sale date) and the estimated days until each
+    product runs out, soonest first. Products that sold nothing in the
+    window are left out. Averages span the whole window unless the product's
+    first ever sale falls inside it. Only the window's rollup rows, one
+    index probe per product for earlier sales and the stock ledger are read,
+    so cost follows the window rather than the whole history.
+    """
+    if window not in VELOCITY_WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(map(str, VELOCITY_WINDOWS))}")
+
+    if as_of is None:
+        as_of = (
+            DailyProductSales.objects
+            .filter(store=store)
+            .aggregate(last=Max('Date'))['last']
         )
-        .annotate(
-            avg_daily_sales=Case(
-                When(active_days__gt=0, then=F('total_sold') * 1.0 / F('active_days')),
-                default=Value(0),
-                output_field=FloatField()
-            ),
-            current_stock=F('ProductID__Quantity') - F('total_sold')
-        )
-     
-        .annotate(
-            estimated_stock_out_days=Case(
-                When(avg_daily_sales__gt=0, then=F('current_stock') * 1.0 / F('avg_daily_sales')),
-                default=None,
-                output_field=FloatField()
-            )
-        )
-        .order_by('estimated_stock_out_days')
+
+    empty = {"velocity": [], "window_days": window, "as_of": as_of,
+             "page": page, "page_size": page_size, "total_products": 0}
+    if as_of is None:
+        return empty
+
+    window_start = as_of - timedelta(days=window - 1)
+
+    in_window = (
+        DailyProductSales.objects
+        .filter(store=store, Date__range=(window_start, as_of))
+        .values('ProductID')
+        .annotate(window_sold=Sum('QuantitySold'), first_day=Min('Date'))
+    )
+    sold = {row['ProductID']: row for row in in_window}
+    if not sold:
+        return empty
+
+    earlier_sales = DailyProductSales.objects.filter(
+        store=store, ProductID=OuterRef('pk'), Date__lt=window_start
     )
+    products = (
+        Product.objects
+        .filter(store=store, pk__in=sold)
+        .annotate(sold_before_window=Exists(earlier_sales))
+        .values('pk', 'ProductID', 'ProductName', 'CurrentStock', 'sold_before_window')
+    )
+
+    velocity = []
+    for product in products:
+        row = sold[product['pk']]
+        # Only a product whose first ever sale falls inside the window is averaged over fewer days
+        if product['sold_before_window']:
+            days = window
+        else:
+            days = (as_of - row['first_day']).days + 1
+        avg_daily_sales = row['window_sold'] / days
+        current_stock = product['CurrentStock']
+
+        velocity.append({
+            "ProductID": product['ProductID'],
+            "ProductName": product['ProductName'],
+            "window_sold": row['window_sold'],
+            "avg_daily_sales": round(avg_daily_sales, 2),
+            "current_stock": current_stock,
+            "estimated_stock_out_days": round(current_stock / avg_daily_sales, 1) if avg_daily_sales else None,
+        })
 
-    return {"velocity":velocity}
\ No newline at end of file
+    velocity.sort(key=lambda x: (x['estimated_stock_out_days'] is None, x['estimated_stock_out_days']))
+
+    offset = (page - 1) * page_size
+    return {
+        **empty,
+        "velocity": velocity[offset:offset + page_size],
+        "total_products": len(velocity),
+    }
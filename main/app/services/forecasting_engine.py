@@ -2,103 +2,174 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from django.db.models import Sum
-from ..models import Sales, Product
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from ..models import DailyProductSales, Product, ForecastAccuracy
+from .cache import get_data_version
+from .forecast_models import get_forecast_model, linear_trend, resolve_model_name
+from .instrumentation import instrumented
 
 
 FORECAST_DAYS = 7
 MINIMUM_DATA_POINTS = 10
+TRAIN_SPLIT = 0.8
 
 
-def generate_demand_forecast(store):
-
-    forecast_results = {}
-
-    # 🔥 Get distinct products for this store
-    product_ids = (
-        Sales.objects
+def load_daily_matrix(store):
+    """
+    Pull every product's daily totals from the rollup in one query and pivot them
+    into a dense product x day matrix. Row i holds product_ids[i], starting
+    at that product's first sale date and zero-filled up to lengths[i].
+    """
+    rows = (
+        DailyProductSales.objects
         .filter(store=store)
-        .values_list('ProductID', flat=True)
-        .distinct()
+        .values_list('ProductID', 'Date', 'QuantitySold')
     )
 
-    for product_id in product_ids:
+    df = pd.DataFrame(list(rows), columns=['ProductID', 'Date', 'total_sold'])
 
-        # 🔥 Always filter by store + product
-        base_qs = (
-            Sales.objects
-            .filter(store=store, ProductID=product_id)
-            .values('Date')
-            .annotate(total_sold=Sum('QuantitySold'))
-            .order_by('Date')
-        )
+    # Products need enough distinct sale days to be forecast at all
+    df = df[df.groupby('ProductID')['Date'].transform('size') >= MINIMUM_DATA_POINTS]
 
-        df = pd.DataFrame(list(base_qs))
+    if df.empty:
+        return np.array([], dtype=int), np.zeros((0, 0)), np.array([], dtype=int)
 
-        if df.empty or len(df) < MINIMUM_DATA_POINTS:
-            continue
+    df['Date'] = pd.to_datetime(df['Date'])
+    first_dates = df.groupby('ProductID')['Date'].transform('min')
+    day_index = (df['Date'] - first_dates).dt.days.to_numpy()
 
-        df['Date'] = pd.to_datetime(df['Date'])
+    product_ids, row_index = np.unique(df['ProductID'].to_numpy(), return_inverse=True)
 
-        daily_sales = (
-            df.set_index('Date')['total_sold']
-        )
+    lengths = np.zeros(len(product_ids), dtype=int)
+    np.maximum.at(lengths, row_index, day_index + 1)
 
-        # Fill missing dates
-        full_range = pd.date_range(
-            start=daily_sales.index.min(),
-            end=daily_sales.index.max()
-        )
+    matrix = np.zeros((len(product_ids), lengths.max()))
+    matrix[row_index, day_index] = df['total_sold'].to_numpy(dtype=float)
 
-        daily_sales = daily_sales.reindex(full_range, fill_value=0)
+    return product_ids, matrix, lengths
 
-        daily_sales = daily_sales.reset_index()
-        daily_sales.columns = ['Date', 'QuantitySold']
-        daily_sales['DayIndex'] = range(len(daily_sales))
 
-        # Train Test Split
-        split_index = int(len(daily_sales) * 0.8)
+def run_model(model, values, lengths, steps, n_jobs=1):
+    # Vectorized models handle all rows in one call; slower models can be
+    # spread over a process pool by splitting the product rows into blocks
+    if n_jobs <= 1 or len(values) < 2 * n_jobs:
+        return model(values, lengths, steps)
 
-        X = daily_sales['DayIndex'].values.reshape(-1, 1)
-        y = daily_sales['QuantitySold'].values
+    blocks = np.array_split(np.arange(len(values)), n_jobs)
 
-        X_train = X[:split_index]
-        y_train = y[:split_index]
-        X_test = X[split_index:]
-        y_test = y[split_index:]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = [
+            pool.submit(model, values[block], lengths[block], steps)
+            for block in blocks
+        ]
+        return np.vstack([future.result() for future in futures])
 
-        model = LinearRegression()
-        model.fit(X_train, y_train)
 
-        y_pred = model.predict(X_test)
+def forecast_matrix(matrix, lengths, model=linear_trend, n_jobs=1):
+    """
+    Holdout evaluation and 7 day forecast for every row of the matrix.
+    Each row is fitted on its first 80% of days, scored on the rest, and
+    the same fit is projected past the last observed day.
+    """
+    train_lengths = (lengths * TRAIN_SPLIT).astype(int)
+    test_lengths = lengths - train_lengths
 
-        mae = mean_absolute_error(y_test, y_pred)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    days = np.arange(matrix.shape[1])
+    train_values = np.where(days[None, :] < train_lengths[:, None], matrix, 0)
 
-        confidence = max(0, 1 - (rmse / (np.mean(y) + 1)))
+    steps = int(test_lengths.max()) + FORECAST_DAYS
+    predictions = run_model(model, train_values, train_lengths, steps, n_jobs)
 
-        last_index = daily_sales['DayIndex'].max()
+    # Holdout errors, aligned so column j is the j-th test day of each row
+    offsets = np.arange(int(test_lengths.max()))
+    test_mask = offsets[None, :] < test_lengths[:, None]
+    test_index = np.minimum(train_lengths[:, None] + offsets[None, :], matrix.shape[1] - 1)
+    y_test = np.take_along_axis(matrix, test_index, axis=1)
+    errors = np.where(test_mask, predictions[:, :len(offsets)] - y_test, 0)
 
-        future_indices = np.array(
-            [[last_index + i] for i in range(1, FORECAST_DAYS + 1)]
-        )
+    mae = np.abs(errors).sum(axis=1) / test_lengths
+    rmse = np.sqrt((errors ** 2).sum(axis=1) / test_lengths)
 
-        future_predictions = model.predict(future_indices)
-        future_predictions = np.maximum(future_predictions, 0)
+    mean_sales = matrix.sum(axis=1) / lengths
+    confidence = np.maximum(0, 1 - rmse / (mean_sales + 1))
 
-        total_forecast = float(np.sum(future_predictions))
+    future_index = test_lengths[:, None] + np.arange(FORECAST_DAYS)[None, :]
+    future = np.maximum(np.take_along_axis(predictions, future_index, axis=1), 0)
 
-        # 🔥 Get actual product object (once)
-        product = Product.objects.get(pk=product_id)
+    return {
+        "forecast_7_days": future.sum(axis=1),
+        "confidence": confidence,
+        "mae": mae,
+        "rmse": rmse,
+    }
+
+
+@instrumented()
+def generate_demand_forecast(store, n_jobs=None, mode=None):
+
+    forecast_results = {}
+
+    if (mode or getattr(settings, 'FORECAST_MODE', 'batch')) == 'incremental':
+        # Imported here, forecast_state builds on this module
+        from .forecast_state import get_incremental_forecast
+        return get_incremental_forecast(store)
+
+    if n_jobs is None:
+        n_jobs = getattr(settings, 'FORECAST_WORKERS', 1)
+
+    product_pks, matrix, lengths = load_daily_matrix(store)
+
+    if not len(product_pks):
+        return forecast_results
+
+    # Product details and per-product model overrides in one query
+    products = {
+        pk: (product_id, name, model)
+        for pk, product_id, name, model in Product.objects
+        .filter(pk__in=product_pks.tolist())
+        .values_list('pk', 'ProductID', 'ProductName', 'ForecastModel')
+    }
+
+    model_names = np.array([
+        resolve_model_name(products[pk][2], store.ForecastModel)
+        for pk in product_pks.tolist()
+    ])
+
+    # Each model runs once over all the products that use it
+    metrics = {}
+    for name in np.unique(model_names):
+        rows = np.flatnonzero(model_names == name)
+        group = forecast_matrix(matrix[rows], lengths[rows], model=get_forecast_model(name), n_jobs=n_jobs)
+        for key, values in group.items():
+            metrics.setdefault(key, np.zeros(len(product_pks)))[rows] = values
+
+    # Backtested accuracy (manage.py backtest_forecasts) beats the single holdout,
+    # as long as it was computed from the store's current data
+    backtested = {
+        (pk, name): (confidence, mae, rmse)
+        for pk, name, confidence, mae, rmse in ForecastAccuracy.objects
+        .filter(store=store, DataVersion=get_data_version(store))
+        .values_list('ProductID', 'ModelName', 'Confidence', 'MAE', 'RMSE')
+    }
+
+    for row, pk in enumerate(product_pks.tolist()):
+        product_id, product_name, _ = products[pk]
+        model_name = str(model_names[row])
+
+        confidence, mae, rmse = backtested.get(
+            (pk, model_name),
+            (metrics["confidence"][row], metrics["mae"][row], metrics["rmse"][row])
+        )
 
-        forecast_results[product.ProductID] = {
-            "product_name": product.ProductName,
-            "forecast_7_days": round(total_forecast, 2),
-            "confidence": round(confidence, 2),
+        forecast_results[product_id] = {
+            "product_name": product_name,
+            "model": model_name,
+            "forecast_7_days": round(float(metrics["forecast_7_days"][row]), 2),
+            "confidence": round(float(confidence), 2),
             "mae": round(float(mae), 2),
-            "rmse": round(float(rmse), 2)
+            "rmse": round(float(rmse), 2),
+            "accuracy_source": "backtest" if (pk, model_name) in backtested else "holdout"
         }
 
-    return forecast_results
\ No newline at end of file
+    return forecast_results
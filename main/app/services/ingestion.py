@@ -1,12 +1,24 @@
+import io
+import os
 import pandas as pd
 import hashlib
 import logging
 
-from django.db import transaction
-from ..models import Product, Sales, UploadedFileLog, StockRecommendation
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from ..models import Product, UploadedFileLog
+from .sales_loader import SALES_BATCH_SIZE, existing_fingerprints, insert_sales, sale_fingerprints
+from .forecast_state import schedule_forecast_state_update
+from .rollup import upsert_daily_rollup
+from .stock import decrement_stock
+from .cache import bump_data_version
+from .instrumentation import instrumented
+from .purge import purge_store_data
 
 logger = logging.getLogger(__name__)
 
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024
+
 
 def generate_file_hash(file):
     hasher = hashlib.sha256()
@@ -16,45 +28,315 @@ def generate_file_hash(file):
     return hasher.hexdigest()
 
 
-logger = logging.getLogger(__name__)
+def sample_fingerprint(file):
+    """
+    Cheap content fingerprint from the size and the first and last
+    FINGERPRINT_SAMPLE_BYTES. Equal fingerprints only mean a duplicate is
+    possible, the full SHA-256 decides.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(str(file.size).encode())
 
+    file.seek(0)
+    hasher.update(file.read(FINGERPRINT_SAMPLE_BYTES))
+    if file.size > FINGERPRINT_SAMPLE_BYTES:
+        file.seek(max(file.size - FINGERPRINT_SAMPLE_BYTES, FINGERPRINT_SAMPLE_BYTES))
+        hasher.update(file.read())
+    file.seek(0)
 
-def process_sales_upload(file, store):
+    return hasher.hexdigest()
 
-    if not file:
-        return {"error": "No file uploaded"}, 400
 
-    file_hash = generate_file_hash(file)
+class HashingReader(io.RawIOBase):
+    """
+    Forward-only view of an upload that feeds every byte the parser reads
+    into `hasher`, so hashing and parsing share a single pass.
+    """
+
+    def __init__(self, file, hasher):
+        self.file = file
+        self.hasher = hasher
+        self.name = file.name
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.file.read(len(buffer))
+        self.hasher.update(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def drain(self):
+        # Hash whatever the parser left unread, e.g. after an early stop
+        for data in iter(lambda: self.file.read(1024 * 1024), b''):
+            self.hasher.update(data)
+        return self.hasher.hexdigest()
+
+
+def find_metadata_mismatch(uploaded_products, existing_products):
+    # Join uploaded metadata against the stored products in one go and
+    # return the first ProductID (in upload order) whose metadata differs
+    merged = uploaded_products.merge(
+        existing_products,
+        on='ProductID',
+        how='inner',
+        suffixes=('', '_db')
+    )
+
+    if merged.empty:
+        return None
+
+    mismatch = (
+        (merged['ProductName'] != merged['ProductName_db']) |
+        (merged['Category'] != merged['Category_db']) |
+        (merged['UnitPrice'].astype(float) != merged['UnitPrice_db'].astype(float))
+    )
+
+    if not mismatch.any():
+        return None
+
+    return merged.loc[mismatch, 'ProductID'].iloc[0]
+
+
+def resolve_products(uploaded_products, store):
+    """
+    Map every uploaded ProductID to a Product pk with a single lookup,
+    bulk creating the products that do not exist yet.
+
+    Returns (product_map, error_product_id).
+    """
+    product_ids = uploaded_products['ProductID'].tolist()
+
+    existing_products = pd.DataFrame(
+        list(
+            Product.objects
+            .filter(store=store, ProductID__in=product_ids)
+            .values('pk', 'ProductID', 'ProductName', 'Category', 'UnitPrice')
+        ),
+        columns=['pk', 'ProductID', 'ProductName', 'Category', 'UnitPrice']
+    )
+
+    mismatched_id = find_metadata_mismatch(uploaded_products, existing_products)
+    if mismatched_id is not None:
+        return None, mismatched_id
+
+    product_map = dict(zip(existing_products['ProductID'], existing_products['pk']))
+
+    missing_products = uploaded_products[
+        ~uploaded_products['ProductID'].isin(product_map)
+    ]
+
+    if not missing_products.empty:
+        created = Product.objects.bulk_create(
+            [
+                Product(
+                    store=store,
+                    ProductID=product_id,
+                    ProductName=name,
+                    Category=category,
+                    Quantity=quantity,
+                    CurrentStock=quantity,
+                    UnitPrice=unit_price
+                )
+                for product_id, name, category, quantity, unit_price in zip(
+                    missing_products['ProductID'].tolist(),
+                    missing_products['ProductName'].tolist(),
+                    missing_products['Category'].tolist(),
+                    missing_products['Quantity'].tolist(),
+                    missing_products['UnitPrice'].tolist()
+                )
+            ],
+            batch_size=SALES_BATCH_SIZE
+        )
+
+        if all(product.pk is not None for product in created):
+            product_map.update({p.ProductID: p.pk for p in created})
+        else:
+            # Backends that cannot return ids from a bulk insert
+            product_map.update(
+                Product.objects
+                .filter(store=store, ProductID__in=missing_products['ProductID'].tolist())
+                .values_list('ProductID', 'pk')
+            )
+
+    return product_map, None
+
+
+REQUIRED_COLUMNS = [
+    'ProductID', 'ProductName', 'Category',
+    'Date', 'Quantity', 'QuantitySold',
+    'UnitPrice', 'PriceAtSale'
+]
+
+
+class UploadError(Exception):
+    # Raised inside the upload transaction to roll it back with a 400 message
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def iter_excel_rows(file, chunksize):
+    # Read-only openpyxl streams rows instead of loading the whole sheet
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise UploadError("File reading failed")
+
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
 
-    # Prevent duplicate file upload per store
-    if UploadedFileLog.objects.filter(store=store, FileHash=file_hash).exists():
-        return {"error": "This file was already uploaded"}, 400
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
 
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.feather', '.arrow')
+
+
+def local_path(file):
+    # Uploads spooled to disk (and job files) can be memory-mapped in place
+    if hasattr(file, 'temporary_file_path'):
+        return file.temporary_file_path()
+
+    path = getattr(getattr(file, 'file', None), 'name', None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return path
+
+    return None
+
+
+def arrow_source(file):
+    """A memory map of the upload when it is on disk, else its bytes in an Arrow buffer."""
     try:
-        filename = file.name.lower()
+        import pyarrow as pa
+    except ImportError:
+        raise UploadError("Parquet and Arrow uploads need the pyarrow package installed")
+
+    path = local_path(file)
+    if path:
+        return pa.memory_map(path, 'r')
+
+    file.seek(0)
+    return pa.BufferReader(file.read())
+
 
-        if filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file)
-        elif filename.endswith('.csv'):
-            df = pd.read_csv(file)
+def iter_parquet_chunks(file, chunksize):
+    import pyarrow.parquet as pq
+
+    # Columns keep their stored types, so numbers and dates are never reparsed from text
+    parquet = pq.ParquetFile(arrow_source(file))
+    columns = [c for c in REQUIRED_COLUMNS if c in parquet.schema_arrow.names]
+
+    if not chunksize:
+        yield parquet.read(columns=columns).to_pandas()
+        return
+
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_arrow_chunks(file, chunksize):
+    import pyarrow as pa
+
+    reader = pa.ipc.open_file(arrow_source(file))
+    columns = [c for c in REQUIRED_COLUMNS if c in reader.schema.names]
+
+    if not chunksize or not reader.num_record_batches:
+        yield reader.read_all().select(columns).to_pandas()
+        return
+
+    # One record batch at a time: uncompressed batches are zero-copy views of
+    # the memory map, compressed ones (pandas writes lz4) are decompressed
+    # batch by batch rather than as a whole table
+    for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index).select(columns)
+        for start in range(0, batch.num_rows, chunksize):
+            yield batch.slice(start, chunksize).to_pandas()
+
+
+def normalize_csv_ids(df):
+    """
+    Integer ids lose their leading zeros, the form pandas parsed them into
+    for all-numeric files ('001' -> '1'); any other id is kept verbatim.
+    Decided per value, so the result never depends on chunk boundaries.
+    """
+    if 'ProductID' in df.columns:
+        product_ids = df['ProductID'].str.strip()
+        integer = product_ids.str.fullmatch(r'[+-]?\d+', na=False)
+        df['ProductID'] = product_ids.where(
+            ~integer, product_ids[integer].map(lambda value: str(int(value)))
+        )
+    return df
+
+
+def iter_upload_chunks(file, chunksize=None):
+    """
+    Yield the upload as DataFrames of at most `chunksize` rows.
+    A falsy chunksize reads the whole file as a single frame.
+    """
+    filename = file.name.lower()
+
+    if filename.endswith('.csv'):
+        # Ids are read as text so pandas cannot guess their type per chunk
+        if chunksize:
+            for chunk in pd.read_csv(file, chunksize=chunksize, dtype={'ProductID': str}):
+                yield normalize_csv_ids(chunk)
         else:
-            return {"error": "Unsupported file type"}, 400
+            yield normalize_csv_ids(pd.read_csv(file, dtype={'ProductID': str}))
+
+    elif filename.endswith('.xlsx') and chunksize:
+        yield from iter_excel_rows(file, chunksize)
+
+    elif filename.endswith(PARQUET_EXTENSIONS):
+        yield from iter_parquet_chunks(file, chunksize)
+
+    elif filename.endswith(ARROW_EXTENSIONS):
+        yield from iter_arrow_chunks(file, chunksize)
 
+    elif filename.endswith(('.xlsx', '.xls')):
+        # Legacy .xls has no streaming reader, so it is read once and sliced
+        df = pd.read_excel(file)
+        step = chunksize or max(len(df), 1)
+        for start in range(0, max(len(df), 1), step):
+            yield df.iloc[start:start + step]
+
+    else:
+        raise UploadError("Unsupported file type")
+
+
+def read_chunks_safely(chunks):
+    try:
+        yield from chunks
+    except UploadError:
+        raise
     except Exception:
-        return {"error": "File reading failed"}, 400
+        raise UploadError("File reading failed")
 
-    required_columns = [
-        'ProductID', 'ProductName', 'Category',
-        'Date', 'Quantity', 'QuantitySold',
-        'UnitPrice', 'PriceAtSale'
-    ]
 
-    if not all(col in df.columns for col in required_columns):
-        return {"error": "Missing required columns"}, 400
+def clean_sales_chunk(df):
 
-    df = df[required_columns].dropna(how='all')
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        raise UploadError("Missing required columns")
 
-    df['ProductID'] = df['ProductID'].astype(str).str.strip()
+    df = df[REQUIRED_COLUMNS].dropna(how='all').copy()
+
+    # Keep missing ids as NaN so they are dropped below instead of becoming 'nan'
+    product_ids = df['ProductID']
+    df['ProductID'] = product_ids.where(
+        product_ids.isna(), product_ids.astype(str).str.strip()
+    )
     df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce')
     df['QuantitySold'] = pd.to_numeric(df['QuantitySold'], errors='coerce')
     df['UnitPrice'] = pd.to_numeric(df['UnitPrice'], errors='coerce')
@@ -66,79 +348,162 @@ def process_sales_upload(file, store):
         'Date', 'QuantitySold', 'PriceAtSale'
     ])
 
-    df = df[(df['QuantitySold'] > 0) & (df['PriceAtSale'] > 0)]
-
-    if df.empty:
-        return {"error": "No valid sales rows found"}, 400
+    return df[(df['QuantitySold'] > 0) & (df['PriceAtSale'] > 0)]
 
-    valid_rows = len(df)
 
-    with transaction.atomic():
+def summarize_daily(df, product_map):
+    # Uploaded quantity and revenue per product and day, as stored in Sales
+    quantity = df['QuantitySold'].astype('int64')
 
-        uploaded_products = (
-            df[['ProductID', 'ProductName', 'Category', 'Quantity', 'UnitPrice']]
-            .drop_duplicates(subset=['ProductID'])
+    return (
+        df.assign(
+            product_pk=df['ProductID'].map(product_map),
+            Date=df['Date'].dt.normalize(),
+            QuantitySold=quantity,
+            Revenue=quantity * df['PriceAtSale'].round(2)
         )
+        .groupby(['product_pk', 'Date'], as_index=False)[['QuantitySold', 'Revenue']]
+        .sum()
+    )
+
+
+def ingest_chunk(df, store, product_map, backend=None):
+    """
+    Resolve the chunk's new products and insert its sales rows.
+    `product_map` is shared across chunks so metadata is only checked
+    the first time a ProductID shows up in the file.
+    """
+    uploaded_products = (
+        df[['ProductID', 'ProductName', 'Category', 'Quantity', 'UnitPrice']]
+        .drop_duplicates(subset=['ProductID'])
+    )
+    uploaded_products = uploaded_products[
+        ~uploaded_products['ProductID'].isin(product_map)
+    ]
 
-        # 🔥 Use get_or_create instead of bulk_create
-        product_map = {}
+    if not uploaded_products.empty:
+        new_products, mismatched_id = resolve_products(uploaded_products, store)
 
-        for _, row in uploaded_products.iterrows():
+        if mismatched_id is not None:
+            raise UploadError(f"Product metadata mismatch for {mismatched_id}")
 
-            product, created = Product.objects.get_or_create(
-                store=store,
-                ProductID=row['ProductID'],
-                defaults={
-                    'ProductName': row['ProductName'],
-                    'Category': row['Category'],
-                    'Quantity': row['Quantity'],
-                    'UnitPrice': row['UnitPrice']
-                }
-            )
+        product_map.update(new_products)
+
+    return insert_sales(df, product_map, store, backend=backend)
 
-            # Validate metadata if product already exists
-            if not created:
-                if (
-                    product.ProductName != row['ProductName'] or
-                    product.Category != row['Category'] or
-                    float(product.UnitPrice) != float(row['UnitPrice'])
-                ):
-                    return {
-                        "error": f"Product metadata mismatch for {row['ProductID']}"
-                    }, 400
-
-            product_map[row['ProductID']] = product
-
-        # Create sales records
-        sales_list = []
-
-        for _, row in df.iterrows():
-            product = product_map.get(row['ProductID'])
-
-            sales_list.append(Sales(
-                store=store,
-                ProductID=product,
-                QuantitySold=row['QuantitySold'],
-                Date=row['Date'],
-                PriceAtSale=row['PriceAtSale']
-            ))
-
-        Sales.objects.bulk_create(sales_list)
-
-        UploadedFileLog.objects.create(
-            store=store,
-            FileHash=file_hash
-        )
+
+def upload_fraction(file):
+    # Approximate progress from the read position, the parsers read ahead
+    try:
+        return min(file.tell() / file.size, 0.99) if file.size else None
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+@instrumented()
+def process_sales_upload(file, store, chunksize=None, backend=None, progress=None, dedupe=None):
+
+    if not file:
+        return {"error": "No file uploaded"}, 400
+
+    fingerprint = sample_fingerprint(file)
+    file_hash = None
+    source = file
+
+    # Prevent duplicate file upload per store. Only a fingerprint match costs
+    # a separate full read, otherwise the hash is taken while parsing. Logs
+    # written before fingerprints existed have none, so while a store has
+    # any of those every upload is hashed up front as before.
+    if UploadedFileLog.objects.filter(store=store, Fingerprint__in=[fingerprint, '']).exists():
+        file_hash = generate_file_hash(file)
+        if UploadedFileLog.objects.filter(store=store, FileHash=file_hash).exists():
+            return {"error": "This file was already uploaded"}, 400
+    elif file.name.lower().endswith('.csv'):
+        source = HashingReader(file, hashlib.sha256())
+    else:
+        # Columnar and Excel readers seek around the file, so these formats
+        # are still read once for the hash and once more for parsing
+        file_hash = generate_file_hash(file)
+
+    if chunksize is None:
+        chunksize = getattr(settings, 'SALES_UPLOAD_CHUNK_SIZE', None)
+    if dedupe is None:
+        dedupe = getattr(settings, 'SALES_ROW_DEDUP', False)
+
+    records_inserted = 0
+    records_skipped = 0
+    product_map = {}
+    row_ordinals = {}
+    daily_totals = []
+
+    try:
+        with transaction.atomic():
+
+            reader = io.BufferedReader(source) if isinstance(source, HashingReader) else source
+            chunks = read_chunks_safely(iter_upload_chunks(reader, chunksize))
+
+            for chunk in chunks:
+                df = clean_sales_chunk(chunk)
+
+                if df.empty:
+                    continue
+
+                df = df.assign(Fingerprint=sale_fingerprints(df, store, row_ordinals))
+
+                if dedupe:
+                    # Rows already stored by an earlier, overlapping export
+                    stored = df['Fingerprint'].isin(existing_fingerprints(store, df['Fingerprint']))
+                    records_skipped += int(stored.sum())
+                    df = df[~stored]
+
+                    if df.empty:
+                        continue
+
+                records_inserted += ingest_chunk(df, store, product_map, backend)
+
+                daily = summarize_daily(df, product_map)
+                upsert_daily_rollup(store, daily)
+                decrement_stock(daily)
+                daily_totals.append(daily)
+
+                if progress:
+                    progress(upload_fraction(file), f"{records_inserted} rows inserted")
+
+            if not records_inserted and not records_skipped:
+                raise UploadError("No valid sales rows found")
+
+            if file_hash is None:
+                file_hash = source.drain()
+
+            # Decided before anything is committed, so a duplicate leaves no rows
+            if UploadedFileLog.objects.filter(store=store, FileHash=file_hash).exists():
+                raise UploadError("This file was already uploaded")
+
+            try:
+                UploadedFileLog.objects.create(
+                    store=store,
+                    FileHash=file_hash,
+                    Fingerprint=fingerprint
+                )
+            except IntegrityError:
+                # A concurrent upload of the same file won the race
+                raise UploadError("This file was already uploaded")
+
+            if records_inserted:
+                bump_data_version(store)
+                schedule_forecast_state_update(store, pd.concat(daily_totals))
+
+    except UploadError as e:
+        return {"error": e.message}, 400
 
     return {
         "message": "File processed successfully",
-        "records_inserted": len(sales_list),
-        "valid_rows": valid_rows
+        "records_inserted": records_inserted,
+        "records_skipped": records_skipped,
+        "valid_rows": records_inserted + records_skipped
     }, 200
 
-def delete_uploaded_data():
-    UploadedFileLog.objects.all().delete()
-    StockRecommendation.objects.all().delete()
-    Sales.objects.all().delete()
-    Product.objects.all().delete()
-    return None
+
+def delete_uploaded_data(store, progress=None):
+    # Only this store's data, in batches, see purge_store_data()
+    return purge_store_data(store, progress=progress)
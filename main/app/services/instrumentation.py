@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'app'
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Process-local aggregates per (kind, name), like the cache hit counters
+_metrics = defaultdict(lambda: {
+    "calls": 0, "seconds": 0.0, "queries": 0, "query_seconds": 0.0,
+    "rows": 0, "slow_queries": 0, "peak_memory": 0,
+    "buckets": [0] * len(DURATION_BUCKETS), "sql_tracked": True,
+})
+_metrics_lock = threading.Lock()
+# Enclosing measurements, per thread and per asyncio task; a tuple so
+# services gathered by one request each extend their own copy
+_scopes = ContextVar('instrumentation_scopes', default=())
+
+
+def instrumentation_enabled():
+    return getattr(settings, 'INSTRUMENTATION_ENABLED', True)
+
+
+class Measurement:
+    def __init__(self, name, track_sql=True):
+        # May be changed inside the block, e.g. once the request's view is known
+        self.name = name
+        self.track_sql = track_sql
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = 0
+        self.slow_queries = 0
+        self.peak_memory = 0
+        # Highest traced memory seen by nested scopes, which reset the peak
+        self.child_peak = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.query_seconds += elapsed
+
+            # Drivers report rowcount for writes, and for reads where they can
+            rowcount = getattr(context.get('cursor'), 'rowcount', -1)
+            if rowcount and rowcount > 0:
+                self.rows += rowcount
+
+            if elapsed * 1000 >= getattr(settings, 'SLOW_QUERY_MS', 200):
+                self.slow_queries += 1
+                # Enclosing scopes see the same query, only the innermost logs it
+                stack = _scopes.get()
+                if stack and stack[-1] is self:
+                    logger.warning("Slow query in %s (%.1f ms): %s", self.name, elapsed * 1000, sql[:500])
+
+
+@contextmanager
+def measure(kind, name, track_sql=True):
+    """
+    Record wall time, SQL queries, rows and (when tracemalloc is tracing)
+    peak memory for the enclosed block under `kind`/`name`. Without
+    `track_sql` no execute_wrapper is installed and only time and memory
+    are recorded.
+    """
+    if not instrumentation_enabled():
+        yield None
+        return
+
+    stack = _scopes.get()
+
+    measurement = Measurement(name, track_sql)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].child_peak = max(stack[-1].child_peak, peak)
+        tracemalloc.reset_peak()
+        baseline = current
+
+    token = _scopes.set(stack + (measurement,))
+    started = time.perf_counter()
+
+    try:
+        if track_sql:
+            with connection.execute_wrapper(measurement):
+                yield measurement
+        else:
+            yield measurement
+    finally:
+        elapsed = time.perf_counter() - started
+        _scopes.reset(token)
+
+        if tracing:
+            peak = max(tracemalloc.get_traced_memory()[1], measurement.child_peak)
+            measurement.peak_memory = max(peak - baseline, 0)
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, peak)
+
+        record(kind, measurement.name, elapsed, measurement)
+
+
+def record(kind, name, seconds, measurement):
+    with _metrics_lock:
+        entry = _metrics[(kind, name)]
+        entry["calls"] += 1
+        entry["seconds"] += seconds
+        entry["queries"] += measurement.queries
+        entry["query_seconds"] += measurement.query_seconds
+        entry["rows"] += measurement.rows
+        entry["slow_queries"] += measurement.slow_queries
+        entry["peak_memory"] = max(entry["peak_memory"], measurement.peak_memory)
+        entry["sql_tracked"] = measurement.track_sql
+
+        bucket = bisect_left(DURATION_BUCKETS, seconds)
+        if bucket < len(DURATION_BUCKETS):
+            entry["buckets"][bucket] += 1
+
+
+def instrumented(name=None):
+    """Measure every call of a service function, see measure()."""
+    def decorator(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure('service', label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_metrics():
+    with _metrics_lock:
+        return {key: {**entry, "buckets": list(entry["buckets"])} for key, entry in _metrics.items()}
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    """All recorded metrics in the Prometheus text exposition format."""
+    metrics = sorted(get_metrics().items())
+    p = METRIC_PREFIX
+    lines = []
+
+    def family(metric, kind, help_text, values):
+        lines.append(f"# HELP {p}_{metric} {help_text}")
+        lines.append(f"# TYPE {p}_{metric} {kind}")
+        lines.extend(values)
+
+    def labels(kind, name, **extra):
+        pairs = {"kind": kind, "name": name, **extra}
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + "}"
+
+    histogram = []
+    for (kind, name), entry in metrics:
+        cumulative = 0
+        for bound, count in zip(DURATION_BUCKETS, entry["buckets"]):
+            cumulative += count
+            histogram.append(f"{p}_duration_seconds_bucket{labels(kind, name, le=bound)} {cumulative}")
+        histogram.append(f"{p}_duration_seconds_bucket{labels(kind, name, le='+Inf')} {entry['calls']}")
+        histogram.append(f"{p}_duration_seconds_sum{labels(kind, name)} {entry['seconds']:.6f}")
+        histogram.append(f"{p}_duration_seconds_count{labels(kind, name)} {entry['calls']}")
+    family("duration_seconds", "histogram", "Wall time per request or service call.", histogram)
+
+    counters = (
+        ("sql_queries_total", "queries", "SQL queries issued."),
+        ("sql_duration_seconds_total", "query_seconds", "Time spent executing SQL."),
+        ("sql_rows_total", "rows", "Rows reported by the database driver."),
+        ("slow_queries_total", "slow_queries", "Queries slower than SLOW_QUERY_MS."),
+    )
+    # Async requests have no SQL series: their queries run on service threads
+    # and are only attributed to the @instrumented service scopes
+    for metric, key, help_text in counters:
+        family(metric, "counter", help_text, [
+            f"{p}_{metric}{labels(kind, name)} {entry[key]}"
+            for (kind, name), entry in metrics if entry["sql_tracked"]
+        ])
+
+    family("peak_memory_bytes", "gauge", "Largest traced memory growth of a single call (needs INSTRUMENTATION_TRACE_MEMORY).", [
+        f"{p}_peak_memory_bytes{labels(kind, name)} {entry['peak_memory']}" for (kind, name), entry in metrics
+    ])
+
+    return "\n".join(lines) + "\n"
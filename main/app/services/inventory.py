@@ -1,32 +1,29 @@
-from ..models import Sales,Product
-from django.db.models import Sum, F
-from django.db.models.functions import Coalesce
+from ..models import Product
+from .cache import store_cached
+from .instrumentation import instrumented
 
 
+@store_cached('low_stock_alerts')
+@instrumented()
 def get_low_stock_alerts(store, threshold=50, critical_threshold=20):
 
+    # Range scan on the (store, CurrentStock) index, no sales aggregation
     products = (
         Product.objects
-        .filter(store=store)
-        .annotate(
-            total_sold=Coalesce(Sum('sales__QuantitySold'), 0)
-        )
-        .annotate(
-            remaining=F('Quantity') - F('total_sold')
-        )
-        .filter(remaining__lt=threshold)
-        .order_by('remaining')
+        .filter(store=store, CurrentStock__lt=threshold)
+        .order_by('CurrentStock')
+        .values('ProductName', 'CurrentStock')
     )
 
     alerts = []
 
     for product in products:
-        remaining = product.remaining
+        remaining = product['CurrentStock']
 
         alerts.append({
-            "product": product.ProductName,
+            "product": product['ProductName'],
             "remaining": remaining,
             "severity": "critical" if remaining < critical_threshold else "warning"
         })
 
-    return alerts
\ No newline at end of file
+    return alerts
@@ -0,0 +1,273 @@
+import os
+import socket
+import logging
+import tempfile
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, connections
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from ..models import BackgroundJob
+from .ingestion import process_sales_upload, delete_uploaded_data
+from .stock_recommendation_engine import run_inventory_engine
+
+logger = logging.getLogger(__name__)
+
+JOB_UPLOAD_SALES = 'upload_sales'
+JOB_INVENTORY_ENGINE = 'inventory_engine'
+JOB_PURGE_STORE_DATA = 'purge_store_data'
+
+
+class JobFailed(Exception):
+    pass
+
+
+def progress_db_alias():
+    # A separate connection makes progress visible before the job's transaction commits
+    return 'jobs' if 'jobs' in settings.DATABASES else 'default'
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_job(store, job_type, payload=None):
+    job = BackgroundJob.objects.create(
+        store=store,
+        JobType=job_type,
+        Payload=payload or {}
+    )
+    logger.info("Queued %s job %s for store %s", job_type, job.pk, store.pk)
+    return job
+
+
+def save_upload_for_job(file):
+    # The request's upload is gone once it returns, keep a copy for the worker
+    os.makedirs(settings.JOB_UPLOAD_DIR, exist_ok=True)
+    _, extension = os.path.splitext(file.name)
+
+    fd, path = tempfile.mkstemp(dir=settings.JOB_UPLOAD_DIR, suffix=extension)
+    with os.fdopen(fd, 'wb') as fh:
+        for chunk in file.chunks():
+            fh.write(chunk)
+
+    return {"path": path, "filename": file.name}
+
+
+def enqueue_upload(file, store):
+    return enqueue_job(store, JOB_UPLOAD_SALES, save_upload_for_job(file))
+
+
+def update_job_progress(job, progress=None, message=''):
+    fields = {'Message': message[:255], 'HeartbeatAt': timezone.now()}
+    if progress is not None:
+        fields['Progress'] = round(progress, 4)
+
+    try:
+        BackgroundJob.objects.using(progress_db_alias()).filter(pk=job.pk).update(**fields)
+    except DatabaseError:
+        # Progress is advisory, never fail the job because of it
+        logger.warning("Could not record progress for job %s", job.pk)
+
+
+def touch_job(job):
+    try:
+        BackgroundJob.objects.using(progress_db_alias()).filter(pk=job.pk).update(HeartbeatAt=timezone.now())
+    except DatabaseError:
+        logger.warning("Could not record a heartbeat for job %s", job.pk)
+
+
+def start_heartbeat(job, interval=None):
+    """
+    Record a heartbeat for `job` every `interval` seconds (JOB_HEARTBEAT_SECONDS)
+    from a background thread, so long steps that report no progress are not
+    taken for a lost worker. Set the returned event to stop it.
+    """
+    interval = interval or getattr(settings, 'JOB_HEARTBEAT_SECONDS', 60)
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                touch_job(job)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=beat, name=f"job-{job.pk}-heartbeat", daemon=True).start()
+    return stopped
+
+
+def discard_job_upload(job):
+    # Only once the job will not run again, a requeued upload still needs its file
+    path = job.Payload.get('path')
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def runnable_jobs():
+    """
+    Queued jobs that are next in line for their store. A store's jobs run one
+    at a time in queue order, so e.g. an upload queued after a purge can
+    never be deleted by it.
+    """
+    same_store = BackgroundJob.objects.filter(store=OuterRef('store'))
+
+    return BackgroundJob.objects.filter(Status=BackgroundJob.STATUS_QUEUED).exclude(
+        Exists(same_store.filter(Status=BackgroundJob.STATUS_RUNNING))
+    ).exclude(
+        Exists(same_store.filter(Status=BackgroundJob.STATUS_QUEUED, pk__lt=OuterRef('pk')))
+    )
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Put running jobs back in the queue once they have gone `timeout` seconds
+    (JOB_STALE_SECONDS) without a heartbeat, e.g. after a worker crash.
+    Jobs that already used JOB_MAX_ATTEMPTS starts are failed instead.
+    """
+    timeout = timeout or getattr(settings, 'JOB_STALE_SECONDS', 3600)
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=timeout)
+
+    stale = BackgroundJob.objects.filter(Status=BackgroundJob.STATUS_RUNNING).filter(
+        Q(HeartbeatAt__lt=cutoff) | Q(HeartbeatAt__isnull=True, StartedAt__lt=cutoff)
+    )
+    max_attempts = getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+    exhausted = list(stale.filter(Attempts__gte=max_attempts))
+    failed = stale.filter(pk__in=[job.pk for job in exhausted]).update(
+        Status=BackgroundJob.STATUS_FAILED,
+        Message="Worker stopped responding",
+        FinishedAt=now
+    )
+    for job in exhausted:
+        discard_job_upload(job)
+
+    requeued = stale.filter(Attempts__lt=max_attempts).update(
+        Status=BackgroundJob.STATUS_QUEUED,
+        WorkerID='',
+        Message="Requeued after the worker stopped responding"
+    )
+
+    if failed or requeued:
+        logger.warning("Requeued %s and failed %s stale jobs", requeued, failed)
+
+    return requeued
+
+
+def claim_next_job(worker_id=None, job_types=None):
+    """
+    Claim the oldest runnable job. The conditional UPDATE only succeeds for
+    one worker, so several workers can poll the same table without a broker.
+    """
+    worker_id = worker_id or default_worker_id()
+    requeue_stale_jobs()
+
+    candidates = runnable_jobs()
+    if job_types:
+        candidates = candidates.filter(JobType__in=job_types)
+
+    for job_id in candidates.order_by('CreatedAt', 'pk').values_list('pk', flat=True)[:10]:
+        # Re-checked in the UPDATE, another worker may have started one of the store's jobs
+        claimed = runnable_jobs().filter(pk=job_id).update(
+            Status=BackgroundJob.STATUS_RUNNING,
+            WorkerID=worker_id,
+            StartedAt=timezone.now(),
+            HeartbeatAt=timezone.now(),
+            Attempts=F('Attempts') + 1
+        )
+        if claimed:
+            return BackgroundJob.objects.select_related('store').get(pk=job_id)
+
+    return None
+
+
+def handle_upload_sales(job, progress):
+    path = job.Payload['path']
+
+    with open(path, 'rb') as fh:
+        data, status = process_sales_upload(
+            File(fh, name=job.Payload.get('filename', os.path.basename(path))),
+            job.store,
+            progress=progress
+        )
+
+    if status != 200:
+        raise JobFailed(data.get('error', "Upload failed"))
+
+    return data
+
+
+def handle_inventory_engine(job, progress):
+    return run_inventory_engine(job.store, progress=progress, force=job.Payload.get('force', False))
+
+
+def handle_purge_store_data(job, progress):
+    return delete_uploaded_data(job.store, progress=progress)
+
+
+JOB_HANDLERS = {
+    JOB_UPLOAD_SALES: handle_upload_sales,
+    JOB_INVENTORY_ENGINE: handle_inventory_engine,
+    JOB_PURGE_STORE_DATA: handle_purge_store_data,
+}
+
+
+def run_job(job):
+    handler = JOB_HANDLERS.get(job.JobType)
+
+    def progress(fraction=None, message=''):
+        update_job_progress(job, fraction, message)
+
+    heartbeat = start_heartbeat(job)
+
+    try:
+        if handler is None:
+            raise JobFailed(f"Unknown job type {job.JobType}")
+
+        result = handler(job, progress)
+        job.Status = BackgroundJob.STATUS_DONE
+        job.Progress = 1
+        job.Message = "Completed"
+        job.Result = result
+
+    except JobFailed as e:
+        job.Status = BackgroundJob.STATUS_FAILED
+        job.Message = str(e)[:255]
+
+    except Exception as e:
+        logger.exception("Job %s failed", job.pk)
+        job.Status = BackgroundJob.STATUS_FAILED
+        job.Message = f"Server error: {e}"[:255]
+
+    finally:
+        heartbeat.set()
+
+    job.FinishedAt = timezone.now()
+
+    # A failed job keeps the last progress the handler reported on the jobs connection
+    fields = ['Status', 'Message', 'Result', 'FinishedAt']
+    if job.Status == BackgroundJob.STATUS_DONE:
+        fields.append('Progress')
+
+    job.save(update_fields=fields)
+    discard_job_upload(job)
+    return job
+
+
+def serialize_job(job):
+    return {
+        "job_id": job.pk,
+        "job_type": job.JobType,
+        "status": job.Status,
+        "progress": job.Progress,
+        "attempts": job.Attempts,
+        "message": job.Message,
+        "result": job.Result,
+        "created_at": job.CreatedAt,
+        "started_at": job.StartedAt,
+        "finished_at": job.FinishedAt,
+    }
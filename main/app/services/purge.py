@@ -0,0 +1,83 @@
+import logging
+
+from django.db import transaction
+from ..models import (
+    Product, Sales, DailyProductSales, UploadedFileLog, RecommendationRun,
+    StockRecommendation, ForecastState, ForecastAccuracy,
+)
+from .cache import bump_data_version
+from .instrumentation import instrumented
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 5000
+
+# Children before parents, so no batch leaves a dangling foreign key
+PURGE_MODELS = (
+    StockRecommendation,
+    RecommendationRun,
+    ForecastAccuracy,
+    ForecastState,
+    DailyProductSales,
+    Sales,
+    UploadedFileLog,
+    Product,
+)
+
+
+def purge_batches(model, store, batch_size=PURGE_BATCH_SIZE):
+    """
+    Delete a store's rows of `model` in pk order, `batch_size` at a time.
+    Each batch is a single DELETE over a pk range in its own transaction,
+    issued with _raw_delete so Django's collector never loads the rows.
+    Yields the number of rows deleted per batch.
+    """
+    pks = model.objects.filter(store=store).order_by('pk').values_list('pk', flat=True)
+    last = None
+
+    while True:
+        batch = list((pks if last is None else pks.filter(pk__gt=last))[:batch_size])
+        if not batch:
+            return
+
+        with transaction.atomic():
+            rows = model.objects.filter(store=store, pk__gte=batch[0], pk__lte=batch[-1])
+            deleted = rows._raw_delete(rows.db)
+
+        last = batch[-1]
+        yield deleted
+
+
+@instrumented()
+def purge_store_data(store, batch_size=PURGE_BATCH_SIZE, progress=None):
+    """
+    Remove everything a store has uploaded or derived from its uploads,
+    leaving other stores untouched. Returns deleted row counts per model.
+    """
+    # Cached results must not outlive the rows, even if the purge stops halfway
+    bump_data_version(store)
+
+    totals = {model: model.objects.filter(store=store).count() for model in PURGE_MODELS}
+    total = sum(totals.values())
+    deleted = {}
+    done = 0
+
+    for model in PURGE_MODELS:
+        name = model._meta.model_name
+        deleted[name] = 0
+
+        if not totals[model]:
+            continue
+
+        for count in purge_batches(model, store, batch_size):
+            deleted[name] += count
+            done += count
+
+            if progress:
+                progress(min(done / total, 0.99), f"{done} of {total} rows deleted")
+
+        bump_data_version(store)
+
+    logger.info("Purged %s rows for store %s", done, store.pk)
+
+    return {"deleted_rows": done, "deleted": deleted}
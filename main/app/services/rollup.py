@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Sum, F
+from ..models import Sales, DailyProductSales
+from .cache import bump_data_version
+
+ROLLUP_BATCH_SIZE = 5000
+
+
+def upsert_sql():
+    quote = connection.ops.quote_name
+    meta = DailyProductSales._meta
+    table = quote(meta.db_table)
+    store, product, day, quantity, revenue = (
+        quote(meta.get_field(name).column)
+        for name in ('store', 'ProductID', 'Date', 'QuantitySold', 'Revenue')
+    )
+
+    # ON CONFLICT upserts are supported by both PostgreSQL and SQLite
+    return (
+        f"INSERT INTO {table} ({store}, {product}, {day}, {quantity}, {revenue}) "
+        f"VALUES (%s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({store}, {product}, {day}) DO UPDATE SET "
+        f"{quantity} = {table}.{quantity} + EXCLUDED.{quantity}, "
+        f"{revenue} = {table}.{revenue} + EXCLUDED.{revenue}"
+    )
+
+
+def upsert_daily_rollup(store, daily):
+    """
+    Add an upload's per product, per day totals to the rollup. Must run in
+    the upload's transaction so the rollup never disagrees with Sales.
+    """
+    if daily.empty:
+        return 0
+
+    params = [
+        (store.pk, product_pk, day.date(), quantity, Decimal(str(round(revenue, 2))))
+        for product_pk, day, quantity, revenue in zip(
+            daily['product_pk'].tolist(),
+            daily['Date'],
+            daily['QuantitySold'].tolist(),
+            daily['Revenue'].tolist()
+        )
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(upsert_sql(), params)
+
+    return len(params)
+
+
+def rebuild_daily_rollup(store=None):
+    rollups = DailyProductSales.objects.all()
+    sales = Sales.objects.all()
+
+    if store is not None:
+        rollups = rollups.filter(store=store)
+        sales = sales.filter(store=store)
+
+    # One row per product and day, far smaller than Sales itself
+    rows = (
+        sales
+        .values('store', 'ProductID', 'Date')
+        .annotate(
+            quantity=Sum('QuantitySold'),
+            revenue=Sum(F('QuantitySold') * F('PriceAtSale'))
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        rollups.delete()
+
+        created = DailyProductSales.objects.bulk_create(
+            [
+                DailyProductSales(
+                    store_id=row['store'],
+                    ProductID_id=row['ProductID'],
+                    Date=row['Date'],
+                    QuantitySold=row['quantity'],
+                    Revenue=row['revenue']
+                )
+                for row in rows
+            ],
+            batch_size=ROLLUP_BATCH_SIZE
+        )
+
+    # Analytics cached against the old rollup must not be served any more
+    bump_data_version(store)
+
+    return len(created)
@@ -0,0 +1,194 @@
+import io
+import logging
+
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from ..models import Sales
+
+logger = logging.getLogger(__name__)
+
+SALES_BATCH_SIZE = 5000
+COPY_BLOCK_ROWS = 100000
+FINGERPRINT_LOOKUP_BATCH = 10000
+
+BACKEND_BULK_CREATE = 'bulk_create'
+BACKEND_COPY = 'copy'
+
+
+def copy_supported():
+    return connection.vendor == 'postgresql'
+
+
+def resolve_backend(backend=None):
+    backend = backend or getattr(settings, 'SALES_INGESTION_BACKEND', BACKEND_BULK_CREATE)
+
+    if backend == BACKEND_COPY and not copy_supported():
+        # COPY is PostgreSQL only, everything else keeps the ORM path
+        return BACKEND_BULK_CREATE
+
+    return backend
+
+
+def sale_fingerprints(df, store, ordinals):
+    """
+    64-bit fingerprint per cleaned row from store, product, day, quantity,
+    price in cents and the row's ordinal among identical rows of the file,
+    so repeated identical sales stay distinct while a re-exported row maps
+    to the same value. `ordinals` carries the counts across chunks.
+    """
+    key = pd.DataFrame({
+        'store': store.pk,
+        'product': df['ProductID'].astype(str),
+        # Whole days, independent of the datetime unit the reader picked
+        'day': df['Date'].to_numpy().astype('datetime64[D]').astype('int64'),
+        'quantity': df['QuantitySold'].astype('int64'),
+        'cents': (df['PriceAtSale'] * 100).round().astype('int64'),
+    }, index=df.index)
+    base = pd.util.hash_pandas_object(key, index=False)
+
+    counts = base.value_counts()
+    offsets = {value: ordinals.get(value, 0) for value in counts.index.tolist()}
+    ordinal = base.groupby(base).cumcount() + base.map(offsets).astype('int64')
+    for value, count in counts.items():
+        ordinals[value] = offsets[value] + count
+
+    fingerprints = pd.util.hash_pandas_object(
+        pd.DataFrame({'base': base, 'ordinal': ordinal}), index=False
+    )
+    # Stored in a signed BigIntegerField
+    return pd.Series(fingerprints.to_numpy().view('int64'), index=df.index)
+
+
+def existing_fingerprints(store, fingerprints):
+    # Indexed (store, Fingerprint) lookups, batched to the backend's parameter limit
+    limit = connection.features.max_query_params
+    batch = min(limit - 1, FINGERPRINT_LOOKUP_BATCH) if limit else FINGERPRINT_LOOKUP_BATCH
+    values = list(set(fingerprints.tolist()))
+
+    found = set()
+    for start in range(0, len(values), batch):
+        found.update(
+            Sales.objects.filter(store=store, Fingerprint__in=values[start:start + batch])
+            .values_list('Fingerprint', flat=True)
+        )
+    return found
+
+
+def backfill_fingerprints(store, sales_model=Sales, batch_size=SALES_BATCH_SIZE):
+    """
+    Fingerprint the store's Sales rows stored before fingerprints existed,
+    so overlapping re-exports of that history are screened too. Rows are
+    taken in insertion order and identical rows get ordinals across the
+    whole store. `sales_model` lets migrations pass their historical model.
+    """
+    ordinals = {}
+    updated = 0
+    last_pk = 0
+
+    while True:
+        rows = list(
+            sales_model.objects
+            .filter(store=store, Fingerprint__isnull=True, pk__gt=last_pk)
+            .order_by('pk')
+            .values_list('pk', 'ProductID__ProductID', 'Date', 'QuantitySold', 'PriceAtSale')[:batch_size]
+        )
+        if not rows:
+            return updated
+
+        df = pd.DataFrame(rows, columns=['pk', 'ProductID', 'Date', 'QuantitySold', 'PriceAtSale'])
+        df['Date'] = pd.to_datetime(df['Date'])
+        df['PriceAtSale'] = df['PriceAtSale'].astype(float)
+
+        sales_model.objects.bulk_update(
+            [
+                sales_model(pk=pk, Fingerprint=fingerprint)
+                for pk, fingerprint in zip(df['pk'].tolist(), sale_fingerprints(df, store, ordinals).tolist())
+            ],
+            ['Fingerprint'],
+            batch_size=batch_size
+        )
+        updated += len(rows)
+        last_pk = rows[-1][0]
+
+
+def build_sales_rows(df, product_map, store):
+    # Column-wise conversion, one Sales instance per row without iterrows
+    product_pks = df['ProductID'].map(product_map).tolist()
+    dates = df['Date'].dt.date.tolist()
+    quantities = df['QuantitySold'].tolist()
+    prices = df['PriceAtSale'].tolist()
+    fingerprints = df['Fingerprint'].tolist() if 'Fingerprint' in df else [None] * len(df)
+
+    return [
+        Sales(
+            store_id=store.pk,
+            ProductID_id=product_pk,
+            Date=sale_date,
+            QuantitySold=quantity,
+            PriceAtSale=price,
+            Fingerprint=fingerprint
+        )
+        for product_pk, sale_date, quantity, price, fingerprint in zip(
+            product_pks, dates, quantities, prices, fingerprints
+        )
+    ]
+
+
+def bulk_create_sales(df, product_map, store):
+    sales_list = build_sales_rows(df, product_map, store)
+    Sales.objects.bulk_create(sales_list, batch_size=SALES_BATCH_SIZE)
+    return len(sales_list)
+
+
+def sales_copy_blocks(df, product_map, store):
+    # Render the cleaned frame as CSV text blocks in the app_sales column order
+    frame = df.assign(
+        store_id=store.pk,
+        product_pk=df['ProductID'].map(product_map).astype('int64'),
+        sale_date=df['Date'].dt.strftime('%Y-%m-%d'),
+        quantity=df['QuantitySold'].astype('int64'),
+        fingerprint=df['Fingerprint'].astype('Int64') if 'Fingerprint' in df else pd.NA,
+    )[['store_id', 'product_pk', 'sale_date', 'quantity', 'PriceAtSale', 'fingerprint']]
+
+    for start in range(0, len(frame), COPY_BLOCK_ROWS):
+        buffer = io.StringIO()
+        frame.iloc[start:start + COPY_BLOCK_ROWS].to_csv(
+            buffer, header=False, index=False, float_format='%.2f'
+        )
+        yield buffer.getvalue()
+
+
+def copy_sales(df, product_map, store):
+    """
+    Stream the chunk into the Sales table with COPY FROM STDIN.
+    Runs on the current connection, so it shares the caller's transaction.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(Sales._meta.get_field(name).column)
+        for name in ('store', 'ProductID', 'Date', 'QuantitySold', 'PriceAtSale', 'Fingerprint')
+    )
+    sql = f"COPY {quote(Sales._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+
+        if hasattr(raw_cursor, 'copy'):
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                for block in sales_copy_blocks(df, product_map, store):
+                    copy.write(block)
+        else:
+            # psycopg2
+            for block in sales_copy_blocks(df, product_map, store):
+                raw_cursor.copy_expert(sql, io.StringIO(block))
+
+    return len(df)
+
+
+def insert_sales(df, product_map, store, backend=None):
+    if resolve_backend(backend) == BACKEND_COPY:
+        return copy_sales(df, product_map, store)
+
+    return bulk_create_sales(df, product_map, store)
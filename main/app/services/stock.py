@@ -0,0 +1,74 @@
+from django.db.models import Sum, F, Case, When, Value, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce
+from ..models import Product, DailyProductSales
+from .cache import bump_data_version
+
+STOCK_UPDATE_BATCH_SIZE = 500
+
+
+def decrement_stock(daily):
+    """
+    Subtract an upload chunk's quantities from Product.CurrentStock with one
+    CASE update per batch of products. Must run in the upload's transaction
+    so the ledger never disagrees with the rollup.
+    """
+    if daily.empty:
+        return 0
+
+    sold = daily.groupby('product_pk')['QuantitySold'].sum()
+    items = list(zip(sold.index.tolist(), sold.tolist()))
+
+    for start in range(0, len(items), STOCK_UPDATE_BATCH_SIZE):
+        batch = items[start:start + STOCK_UPDATE_BATCH_SIZE]
+        Product.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            CurrentStock=F('CurrentStock') - Case(
+                *[When(pk=pk, then=Value(quantity)) for pk, quantity in batch],
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        )
+
+    return len(items)
+
+
+def expected_stock():
+    # Opening quantity minus every unit the rollup has recorded as sold
+    sold = (
+        DailyProductSales.objects
+        .filter(ProductID=OuterRef('pk'))
+        .values('ProductID')
+        .annotate(total=Sum('QuantitySold'))
+        .values('total')
+    )
+    return F('Quantity') - Coalesce(Subquery(sold), 0)
+
+
+def find_stock_drift(store=None):
+    products = Product.objects.all()
+    if store is not None:
+        products = products.filter(store=store)
+
+    return [
+        {"product_id": product.ProductID, "current_stock": product.CurrentStock, "expected": product.expected}
+        for product in (
+            products
+            .annotate(expected=expected_stock())
+            .exclude(CurrentStock=F('expected'))
+            .only('ProductID', 'CurrentStock')
+        )
+    ]
+
+
+def reconcile_stock(store=None):
+    """
+    Recompute CurrentStock from the rollup in a single UPDATE and bump the
+    data version of the affected store, or of every store when none is given.
+    """
+    products = Product.objects.all()
+    if store is not None:
+        products = products.filter(store=store)
+
+    count = products.update(CurrentStock=expected_stock())
+    # Cached stock alerts and velocity were computed from the old ledger
+    bump_data_version(store)
+    return count
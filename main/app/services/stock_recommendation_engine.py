@@ -1,110 +1,206 @@
 # ml/stock_engine.py
-from django.db.models import Sum
+import numpy as np
 from django.db import transaction
-from django.db.models.functions import Coalesce
-from ..models import Sales, Product, StockRecommendation
+from ..models import Product, StockRecommendation, RecommendationRun
+from .forecasting_engine import generate_demand_forecast
+from .cache import get_data_version
+from .instrumentation import instrumented
 
 SAFETY_BUFFER_PERCENT = 0.2
+RECOMMENDATION_RUNS_KEPT = 5
 
+RISK_LEVELS = ("out_of_stock", "critical", "warning", "safe")
 
-def classify_risk(current_stock, forecast_7_days):
-    if current_stock <= 0:
-        return "out_of_stock"
-    elif current_stock < 0.5 * forecast_7_days:
-        return "critical"
-    elif current_stock < forecast_7_days:
-        return "warning"
-    else:
-        return "safe"
-
-
-def generate_reason(risk_level):
-    if risk_level == "out_of_stock":
-        return "Product already out of stock"
-    elif risk_level == "critical":
-        return "Immediate restocking required due to high demand"
-    elif risk_level == "warning":
-        return "Stock may run out soon based on forecast"
-    else:
-        return "Stock level is sufficient"
-
+REASONS = {
+    "out_of_stock": "Product already out of stock",
+    "critical": "Immediate restocking required due to high demand",
+    "warning": "Stock may run out soon based on forecast",
+    "safe": "Stock level is sufficient",
+}
 
-def generate_stock_recommendations(forecast_dict, store):
 
-    if not forecast_dict:
-        return []
+def classify_risk(current_stock, forecast_7_days):
+    """Risk level per product; works on scalars and on numpy arrays."""
+    current_stock = np.asarray(current_stock, dtype=float)
+    forecast_7_days = np.asarray(forecast_7_days, dtype=float)
+
+    risk = np.select(
+        [
+            current_stock <= 0,
+            current_stock < 0.5 * forecast_7_days,
+            current_stock < forecast_7_days,
+        ],
+        RISK_LEVELS[:3],
+        default="safe"
+    )
+    return risk.item() if risk.ndim == 0 else risk
 
-    recommendations = []
-    product_ids = list(forecast_dict.keys())
 
-    # Filter products by store
-    products = Product.objects.filter(
-        store=store,
-        ProductID__in=product_ids
-    )
+def generate_reason(risk_level):
+    return REASONS[risk_level]
 
-    products_map = {p.ProductID: p for p in products}
 
-    # Aggregate total sales per product
-    sales_data = (
-        Sales.objects
-        .filter(store=store, ProductID__ProductID__in=product_ids)
-        .values('ProductID__ProductID')
-        .annotate(total_sold=Coalesce(Sum('QuantitySold'), 0))
+def prune_recommendation_runs(store, keep=RECOMMENDATION_RUNS_KEPT):
+    kept = list(
+        RecommendationRun.objects
+        .filter(store=store)
+        .order_by('-GeneratedAt', '-pk')
+        .values_list('pk', flat=True)[:keep]
     )
 
-    sales_map = {
-        item['ProductID__ProductID']: item['total_sold']
-        for item in sales_data
-    }
+    # Rows first as a plain delete, so the runs' cascade has nothing to collect
+    StockRecommendation.objects.filter(store=store).exclude(Run__in=kept).delete()
+    RecommendationRun.objects.filter(store=store).exclude(pk__in=kept).delete()
+
+
+@instrumented()
+def generate_stock_recommendations(forecast_dict, store, data_version=None):
+    """
+    Compute recommendations for every forecast product and store them as a
+    new RecommendationRun tagged with `data_version` (by default the store's
+    current one). Only the latest RECOMMENDATION_RUNS_KEPT runs are kept.
+    Returns the new run and its serialized recommendations.
+    """
+    if data_version is None:
+        data_version = get_data_version(store)
+
+    # Every store product in one query; the forecast normally covers most of them
+    products = [
+        product for product in
+        Product.objects
+        .filter(store=store)
+        .values_list('pk', 'ProductID', 'ProductName', 'CurrentStock')
+        if product[1] in forecast_dict
+    ]
+
+    pks, product_ids, names, stock = zip(*products) if products else ((), (), (), ())
+    forecasts = [forecast_dict[product_id] for product_id in product_ids]
+
+    current_stock = np.array(stock, dtype=float)
+    forecast_7_days = np.array([f.get("forecast_7_days", 0) for f in forecasts], dtype=float)
+    confidence = [f.get("confidence") for f in forecasts]
+
+    required_stock = forecast_7_days * (1 + SAFETY_BUFFER_PERCENT)
+    recommended_order = np.maximum(required_stock - current_stock, 0)
+    risk_levels = classify_risk(current_stock, forecast_7_days).tolist()
 
     with transaction.atomic():
 
-        # Delete old recommendations for this store only
-        StockRecommendation.objects.filter(
+        run = RecommendationRun.objects.create(
             store=store,
-            ProductID__ProductID__in=product_ids
-        ).delete()
-
-        for product_id, forecast_data in forecast_dict.items():
+            DataVersion=data_version,
+            TotalProducts=len(pks)
+        )
 
-            product = products_map.get(product_id)
-            if not product:
-                continue
-
-            total_sold = sales_map.get(product_id, 0)
-
-            current_stock = product.Quantity - total_sold
-            forecast_7_days = forecast_data.get("forecast_7_days", 0)
+        StockRecommendation.objects.bulk_create([
+            StockRecommendation(
+                store=store,
+                Run=run,
+                ProductID_id=pk,
+                CurrentStock=int(stock_level),
+                ForecastSevendays=float(forecast),
+                RecommendedOrder=float(order),
+                RiskLevel=risk,
+                Confidence=conf
+            )
+            for pk, stock_level, forecast, order, risk, conf in zip(
+                pks, stock, forecast_7_days, recommended_order, risk_levels, confidence
+            )
+        ])
+
+        prune_recommendation_runs(store)
+
+    return run, [
+        {
+            "product_id": product_id,
+            "product_name": name,
+            "current_stock": stock_level,
+            "forecast_7_days": round(float(forecast), 2),
+            "recommended_order": round(float(order), 2),
+            "risk_level": risk,
+            "confidence": conf,
+            "reason": REASONS[risk]
+        }
+        for product_id, name, stock_level, forecast, order, risk, conf in zip(
+            product_ids, names, stock, forecast_7_days, recommended_order, risk_levels, confidence
+        )
+    ]
+
+
+def get_latest_run(store):
+    return (
+        RecommendationRun.objects
+        .filter(store=store)
+        .order_by('-GeneratedAt', '-pk')
+        .first()
+    )
 
-            safety_buffer = forecast_7_days * SAFETY_BUFFER_PERCENT
-            required_stock = forecast_7_days + safety_buffer
 
-            recommended_order = max(required_stock - current_stock, 0)
+def serialize_run(run):
+    rows = (
+        StockRecommendation.objects
+        .filter(Run=run)
+        .order_by('pk')
+        .values_list(
+            'ProductID__ProductID', 'ProductID__ProductName', 'CurrentStock',
+            'ForecastSevendays', 'RecommendedOrder', 'RiskLevel', 'Confidence'
+        )
+    )
 
-            risk_level = classify_risk(current_stock, forecast_7_days)
-            reason = generate_reason(risk_level)
+    return {
+        "run_id": run.pk,
+        "data_version": run.DataVersion,
+        "total_products": run.TotalProducts,
+        "generated_at": str(run.GeneratedAt),
+        "recommendations": [
+            {
+                "product_id": product_id,
+                "product_name": name,
+                "current_stock": stock,
+                "forecast_7_days": round(forecast, 2),
+                "recommended_order": round(order, 2),
+                "risk_level": risk,
+                "confidence": confidence,
+                "reason": REASONS.get(risk, "")
+            }
+            for product_id, name, stock, forecast, order, risk, confidence in rows
+        ]
+    }
 
-            # ✅ FIXED FIELD NAME HERE
-            StockRecommendation.objects.create(
-                store=store,
-                ProductID=product,
-                CurrentStock=current_stock,
-                ForecastSevendays=forecast_7_days,  # ✅ corrected
-                RecommendedOrder=recommended_order,
-                RiskLevel=risk_level,
-                Confidence=forecast_data.get("confidence")
-            )
 
-            recommendations.append({
-                "product_id": product.ProductID,
-                "product_name": product.ProductName,
-                "current_stock": round(current_stock, 2),
-                "forecast_7_days": round(forecast_7_days, 2),
-                "recommended_order": round(recommended_order, 2),
-                "risk_level": risk_level,
-                "confidence": forecast_data.get("confidence"),
-                "reason": reason
-            })
-
-    return recommendations
\ No newline at end of file
+def get_fresh_run(store):
+    # Latest run, if nothing has been uploaded or deleted since it was computed
+    run = get_latest_run(store)
+    if run is not None and run.DataVersion == get_data_version(store):
+        return run
+    return None
+
+
+@instrumented()
+def run_inventory_engine(store, progress=None, force=False):
+    """
+    Serve the latest recommendation run when the store's data has not changed
+    since it was computed; otherwise (or when forced) forecast and store a new one.
+    """
+    if not force:
+        run = get_fresh_run(store)
+        if run is not None:
+            return serialize_run(run)
+
+    # Tag the run with the version the forecast reads, not one bumped mid-run
+    data_version = get_data_version(store)
+    forecast_data = generate_demand_forecast(store)
+
+    if progress:
+        progress(0.5, f"Forecast ready for {len(forecast_data)} products")
+
+    # The run this call created, a concurrent run may already be newer
+    run, stock_recommendations = generate_stock_recommendations(forecast_data, store, data_version)
+
+    return {
+        "run_id": run.pk,
+        "data_version": run.DataVersion,
+        "total_products": len(stock_recommendations),
+        "generated_at": str(run.GeneratedAt),
+        "recommendations": stock_recommendations
+    }
@@ -0,0 +1,16 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Store ids are reused once a test rolls back, so cached results must not leak
+    for cache in caches.all():
+        cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def services_on_test_connection(settings):
+    # Pool threads have their own connections and cannot see a test's transaction
+    settings.ASYNC_SERVICE_THREADS = 0
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..models import StoreOwneres, Product, Sales
+from ..services.rollup import rebuild_daily_rollup
+from ..services.stock import reconcile_stock
+
+
+HEADER = "ProductID,ProductName,Category,Date,Quantity,QuantitySold,UnitPrice,PriceAtSale\n"
+
+
+def make_store(username="owner"):
+    user = User.objects.create_user(username=username, password="secret")
+    return StoreOwneres.objects.create(
+        user=user, storename="Store", ownername="Owner", city="Indore"
+    )
+
+
+def make_csv(rows, name="sales.csv"):
+    return SimpleUploadedFile(name, (HEADER + "\n".join(rows) + "\n").encode())
+
+
+def seed_store(username, products=5, days=20):
+    store = make_store(username)
+    for index in range(products):
+        product = Product.objects.create(
+            store=store, ProductID=f"P{index}", ProductName=f"Item {index}",
+            Category="Food", Quantity=500, UnitPrice=10
+        )
+        Sales.objects.bulk_create([
+            Sales(store=store, ProductID=product, Date=date(2025, 1, 1) + timedelta(days=day),
+                  QuantitySold=day % 7 + 1, PriceAtSale=10)
+            for day in range(days)
+        ])
+    rebuild_daily_rollup(store)
+    reconcile_stock(store)
+    return store
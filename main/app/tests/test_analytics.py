@@ -2,11 +2,16 @@ import pytest
 from datetime import date
 from ..models import Product, Sales
 from ..services.analytics import get_sales_insights
+from ..services.ingestion import process_sales_upload
+from ..services.rollup import rebuild_daily_rollup
+from .helpers import make_store, make_csv
 
 
 @pytest.mark.django_db
 def test_total_revenue_calculation():
+    store = make_store()
     product = Product.objects.create(
+        store=store,
         ProductID="P1",
         ProductName="Soap",
         Category="Hygiene",
@@ -15,6 +20,7 @@ def test_total_revenue_calculation():
     )
 
     Sales.objects.create(
+        store=store,
         ProductID=product,
         Date=date(2025, 1, 1),
         QuantitySold=2,
@@ -22,12 +28,72 @@ def test_total_revenue_calculation():
     )
 
     Sales.objects.create(
+        store=store,
         ProductID=product,
         Date=date(2025, 1, 1),
         QuantitySold=3,
         PriceAtSale=50
     )
 
-    data = get_sales_insights()
+    rebuild_daily_rollup(store)
+    data = get_sales_insights(store)
 
     assert data["total_revenue"] == 250
+
+
+@pytest.mark.django_db
+def test_insights_use_single_query_and_configurable_n(django_assert_num_queries):
+    store = make_store()
+    for index, sold in enumerate([7, 3, 9, 1, 5, 4]):
+        product = Product.objects.create(
+            store=store, ProductID=f"P{index}", ProductName=f"Item {index}",
+            Category="Food", Quantity=100, UnitPrice=10
+        )
+        Sales.objects.create(
+            store=store, ProductID=product, Date=date(2025, 1, 1),
+            QuantitySold=sold, PriceAtSale=10
+        )
+    rebuild_daily_rollup(store)
+
+    with django_assert_num_queries(1):
+        data = get_sales_insights.__wrapped__(store, n=2)
+
+    assert [row["total_sold"] for row in data["top_products"]] == [9, 7]
+    assert [row["total_sold"] for row in data["least_products"]] == [1, 3]
+    assert data["total_sold_products"] == 29
+    assert data["total_revenue"] == 290
+
+
+def check_dashboard_data(client, store):
+    client.force_login(store.user)
+
+    data = client.get("/dashboard_data/").json()
+
+    assert data["insights"] == client.get("/get_insights/").json()
+    assert data["revenue"] == client.get("/forecast_demand/").json()
+    assert data["stockAlert"] == client.get("/low_stock_alert/").json()["stockAlert"]
+    assert data["insights"]["total_sold_products"] == 8
+
+
+@pytest.mark.django_db
+def test_dashboard_data_combines_the_dashboard_endpoints(client):
+    store = make_store()
+    process_sales_upload(make_csv([
+        "P1,Rice,Food,2025-01-01,100,5,50,50",
+        "P2,Sugar,Food,2025-01-02,4,3,40,40",
+    ]), store)
+
+    check_dashboard_data(client, store)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dashboard_data_on_the_service_pool(client, settings):
+    # Committed data, so the pool threads' own connections can read it
+    settings.ASYNC_SERVICE_THREADS = 3
+    store = make_store()
+    process_sales_upload(make_csv([
+        "P1,Rice,Food,2025-01-01,100,5,50,50",
+        "P2,Sugar,Food,2025-01-02,4,3,40,40",
+    ]), store)
+
+    check_dashboard_data(client, store)
@@ -0,0 +1,53 @@
+import pytest
+from ..models import Sales
+from ..services.analytics import get_sales_insights
+from ..services.cache import get_cache_stats, get_data_version, reset_cache_stats
+from ..services.forecast_state import rebuild_forecast_state
+from ..services.ingestion import process_sales_upload, delete_uploaded_data
+from ..services.rollup import rebuild_daily_rollup
+from .helpers import make_store, make_csv
+
+
+@pytest.mark.django_db
+def test_insights_are_cached_until_the_next_upload(django_assert_num_queries):
+    reset_cache_stats()
+    store = make_store()
+    process_sales_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store)
+
+    first = get_sales_insights(store)
+
+    # Only the data version lookup, no aggregation
+    with django_assert_num_queries(1):
+        assert get_sales_insights(store) == first
+
+    process_sales_upload(make_csv(["P1,Rice,Food,2025-01-02,100,3,50,50"], name="next.csv"), store)
+    assert get_sales_insights(store)["total_sold_products"] == 8
+
+    stats = get_cache_stats()["functions"]["sales_insights"]
+    assert stats == {"hits": 1, "misses": 2}
+
+
+@pytest.mark.django_db
+def test_delete_invalidates_cached_results():
+    store = make_store()
+    process_sales_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store)
+    assert get_sales_insights(store)["total_sold_products"] == 5
+
+    delete_uploaded_data(store)
+
+    assert get_sales_insights(store)["total_sold_products"] == 0
+
+
+@pytest.mark.django_db
+def test_rebuilds_invalidate_cached_results():
+    store = make_store()
+    process_sales_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store)
+    assert get_sales_insights(store)["total_sold_products"] == 5
+
+    Sales.objects.filter(store=store).update(QuantitySold=7)
+    rebuild_daily_rollup(store)
+    assert get_sales_insights(store)["total_sold_products"] == 7
+
+    version = get_data_version(store)
+    rebuild_forecast_state(store)
+    assert get_data_version(store) == version + 1
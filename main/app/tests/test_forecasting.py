@@ -0,0 +1,343 @@
+import pytest
+import numpy as np
+from datetime import date, timedelta
+from sklearn.linear_model import LinearRegression
+from ..models import Product, Sales, ForecastState
+from ..services.forecasting_engine import generate_demand_forecast
+from ..services.rollup import rebuild_daily_rollup
+from .helpers import make_store, make_csv, seed_store
+
+
+def reference_forecast(daily):
+    # The original per-product sklearn implementation
+    y = np.array(daily, dtype=float)
+    X = np.arange(len(y)).reshape(-1, 1)
+    split = int(len(y) * 0.8)
+
+    model = LinearRegression().fit(X[:split], y[:split])
+    pred = model.predict(X[split:])
+    mae = np.mean(np.abs(y[split:] - pred))
+    rmse = np.sqrt(np.mean((y[split:] - pred) ** 2))
+    future = np.maximum(model.predict(np.arange(len(y), len(y) + 7).reshape(-1, 1)), 0)
+
+    return {
+        "forecast_7_days": round(float(future.sum()), 2),
+        "confidence": round(float(max(0, 1 - rmse / (y.mean() + 1))), 2),
+        "mae": round(float(mae), 2),
+        "rmse": round(float(rmse), 2),
+    }
+
+
+@pytest.mark.django_db
+def test_batched_forecast_matches_per_product_regression():
+    store = make_store()
+    rng = np.random.default_rng(7)
+    expected = {}
+
+    for index, days in enumerate([12, 30, 45]):
+        product = Product.objects.create(
+            store=store, ProductID=f"P{index}", ProductName=f"Item {index}",
+            Category="Food", Quantity=1000, UnitPrice=10
+        )
+        start = date(2025, 1, 1) + timedelta(days=index)
+        daily = []
+        for day in range(days):
+            # Leave gaps so the zero filling is exercised
+            sold = 0 if day % 5 == 3 else int(rng.integers(1, 20)) + day // 3
+            daily.append(sold)
+            if sold:
+                Sales.objects.create(
+                    store=store, ProductID=product, Date=start + timedelta(days=day),
+                    QuantitySold=sold, PriceAtSale=10
+                )
+        expected[f"P{index}"] = reference_forecast(daily)
+
+    # Too few sale days to be forecast
+    sparse = Product.objects.create(
+        store=store, ProductID="P9", ProductName="Sparse",
+        Category="Food", Quantity=10, UnitPrice=10
+    )
+    Sales.objects.create(store=store, ProductID=sparse, Date=date(2025, 1, 1), QuantitySold=1, PriceAtSale=10)
+
+    rebuild_daily_rollup(store)
+    result = generate_demand_forecast(store)
+
+    assert set(result) == set(expected)
+    for product_id, metrics in expected.items():
+        for key, value in metrics.items():
+            assert result[product_id][key] == pytest.approx(value, abs=0.011)
+
+
+@pytest.mark.django_db
+def test_incremental_state_matches_rebuild(django_capture_on_commit_callbacks):
+    from ..services.ingestion import process_sales_upload
+    from ..services.forecast_state import check_forecast_state
+
+    store = make_store()
+
+    def rows(days, sold):
+        return [f"P1,Rice,Food,{(date(2025, 1, 10) + timedelta(days=d)).isoformat()},500,{sold + abs(d)},50,50"
+                for d in days]
+
+    uploads = [
+        rows(range(0, 12), 3),           # initial history
+        rows(range(14, 20), 5),          # appended with a gap
+        rows([2, 5, 16], 1),             # backfill inside the range
+        rows(range(-4, -1), 2),          # sales before the first date
+    ]
+
+    for index, upload in enumerate(uploads):
+        with django_capture_on_commit_callbacks(execute=True):
+            data, status = process_sales_upload(make_csv(upload, name=f"u{index}.csv"), store)
+        assert status == 200, data
+
+    assert check_forecast_state(store) == []
+
+    incremental = generate_demand_forecast(store, mode="incremental")
+    assert incremental["P1"]["product_name"] == "Rice"
+    assert incremental["P1"]["forecast_7_days"] > 0
+
+    ForecastState.objects.filter(store=store).update(SumXY=0)
+    assert {m["field"] for m in check_forecast_state(store)} >= {"SumXY", "forecast_7_days"}
+
+
+@pytest.mark.django_db
+def test_incremental_state_seeds_products_from_their_history(django_capture_on_commit_callbacks):
+    from ..services.ingestion import process_sales_upload
+    from ..services.forecast_state import check_forecast_state
+
+    store = make_store()
+    history = [f"P1,Rice,Food,{(date(2025, 1, 1) + timedelta(days=d)).isoformat()},500,{d + 1},50,50"
+               for d in range(10)]
+    with django_capture_on_commit_callbacks(execute=True):
+        process_sales_upload(make_csv(history, name="history.csv"), store)
+
+    # A store whose history predates the forecast state
+    ForecastState.objects.filter(store=store).delete()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        process_sales_upload(make_csv(["P1,Rice,Food,2025-01-12,500,4,50,50"], name="next.csv"), store)
+
+    assert check_forecast_state(store) == []
+
+    incremental = generate_demand_forecast(store, mode="incremental")
+    batch = generate_demand_forecast(store, mode="batch")
+    assert incremental["P1"].keys() == batch["P1"].keys()
+
+
+@pytest.mark.django_db
+def test_failed_state_update_applies_nothing(django_capture_on_commit_callbacks, monkeypatch):
+    from ..services.ingestion import process_sales_upload
+
+    store = make_store()
+    with django_capture_on_commit_callbacks(execute=True):
+        process_sales_upload(make_csv(["P1,Rice,Food,2025-01-01,500,3,50,50"], name="first.csv"), store)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("lost connection")
+
+    # P2 is new and created before the existing P1 state is updated
+    monkeypatch.setattr(ForecastState.objects, "bulk_update", fail)
+    with django_capture_on_commit_callbacks(execute=True):
+        process_sales_upload(make_csv([
+            "P1,Rice,Food,2025-01-02,500,4,50,50",
+            "P2,Sugar,Food,2025-01-02,80,2,40,40",
+        ], name="second.csv"), store)
+
+    assert not ForecastState.objects.filter(store=store, ProductID__ProductID="P2").exists()
+    assert ForecastState.objects.get(store=store, ProductID__ProductID="P1").SumY == 3
+
+
+@pytest.mark.django_db
+def test_revenue_metrics_are_store_scoped(django_assert_num_queries):
+    from ..services.forecasting import get_revenue_forecast_metrics
+
+    seed_store("other", products=8)
+    store = seed_store("owner", products=3, days=14)
+
+    with django_assert_num_queries(2):
+        data = get_revenue_forecast_metrics.__wrapped__(store, top_n=2)
+
+    assert len(data["daily_revenue"]) == 14
+    assert len(data["revenue_contribution"]) == 2
+    assert {row["ProductID__ProductName"] for row in data["revenue_contribution"]} <= {"Item 0", "Item 1", "Item 2"}
+    assert sum(row["weekly_revenue"] for row in data["weekly_revenue"]) == data["total_revenue"]
+
+    # 2025-01-01 is a Wednesday, so the first week is partial
+    assert data["weekly_revenue"][0]["week"] == date(2024, 12, 30)
+    first, second = data["daily_revenue"][:2]
+    assert first["daily_growth_percent"] is None and first["daily_growth_trend"] == "neutral"
+    assert second["daily_growth_trend"] == "upwards"
+    assert second["daily_growth_percent"] == 100.0
+
+
+@pytest.mark.django_db
+def test_revenue_metrics_range_granularity_and_downsampling():
+    from ..services.forecasting import get_revenue_forecast_metrics
+
+    store = seed_store("owner", products=2, days=90)
+    metrics = get_revenue_forecast_metrics.__wrapped__
+
+    ranged = metrics(store, start=date(2025, 1, 10), end=date(2025, 1, 19))
+    assert [row["Date"] for row in ranged["daily_revenue"]] == [date(2025, 1, 10) + timedelta(days=d) for d in range(10)]
+    assert ranged["total_revenue"] == sum(row["daily_revenue"] for row in ranged["daily_revenue"])
+
+    monthly = metrics(store, granularity="month")
+    assert "daily_revenue" not in monthly
+    assert [row["month"] for row in monthly["monthly_revenue"]] == [date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)]
+    assert sum(row["monthly_revenue"] for row in monthly["monthly_revenue"]) == monthly["total_revenue"]
+
+    full = metrics(store)
+    sampled = metrics(store, max_points=20)
+    assert len(sampled["daily_revenue"]) == 20
+    assert sampled["daily_revenue"][0] == full["daily_revenue"][0]
+    assert sampled["daily_revenue"][-1]["Date"] == full["daily_revenue"][-1]["Date"]
+
+    # Growth compares each kept point with the previous kept point
+    for previous, row in zip(sampled["daily_revenue"], sampled["daily_revenue"][1:]):
+        expected = round(float((row["daily_revenue"] - previous["daily_revenue"]) / previous["daily_revenue"] * 100), 2)
+        assert row["daily_growth_percent"] == expected
+
+    # Best/worst week and totals are computed before downsampling
+    assert sampled["best_week"] == full["best_week"]
+    assert sampled["total_revenue"] == full["total_revenue"]
+
+
+@pytest.mark.django_db
+def test_revenue_metrics_are_capped_by_default(settings):
+    from ..services.forecasting import get_revenue_forecast_metrics
+
+    settings.REVENUE_MAX_POINTS = 30
+    store = seed_store("owner", products=1, days=90)
+    metrics = get_revenue_forecast_metrics.__wrapped__
+
+    assert len(metrics(store)["daily_revenue"]) == 30
+    assert len(metrics(store, max_points=10)["daily_revenue"]) == 10
+
+
+def test_downsampling_keeps_extremes():
+    from ..services.downsampling import lttb_indices, minmax_indices
+
+    values = np.sin(np.linspace(0, 20, 1000))
+    values[437] = 5
+
+    for pick in (lttb_indices, minmax_indices):
+        indices = pick(values, 50)
+        assert len(indices) <= 50
+        assert list(indices) == sorted(set(indices))
+        assert 437 in indices
+
+
+def reference_holt_winters(y, steps, alpha=0.3, beta=0.05, gamma=0.2):
+    # Textbook additive Holt-Winters, one product at a time
+    level = np.mean(y[:7])
+    season = list(np.array(y[:7]) - level)
+    trend = (np.mean(y[7:14]) - level) / 7 if len(y) >= 14 else 0.0
+
+    for day in range(7, len(y)):
+        previous = level
+        level = alpha * (y[day] - season[day % 7]) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+        season[day % 7] = gamma * (y[day] - level) + (1 - gamma) * season[day % 7]
+
+    return [level + h * trend + season[(len(y) + h - 1) % 7] for h in range(1, steps + 1)]
+
+
+def test_forecast_models_batched_over_ragged_rows():
+    from ..services.forecast_models import FORECAST_MODELS, holt_winters_weekly, moving_average
+
+    rng = np.random.default_rng(3)
+    lengths = np.array([9, 20, 63])
+    values = np.zeros((3, 63))
+    for row, length in enumerate(lengths):
+        values[row, :length] = rng.integers(0, 30, size=length)
+
+    for model in FORECAST_MODELS.values():
+        assert model(values, lengths, 5).shape == (3, 5)
+
+    batched = holt_winters_weekly(values, lengths, 5)
+    for row, length in enumerate(lengths):
+        assert batched[row] == pytest.approx(reference_holt_winters(values[row, :length], 5))
+
+    assert moving_average(values, lengths, 2)[1] == pytest.approx([values[1, 13:20].mean()] * 2)
+
+
+def test_holt_winters_fits_weekly_seasonality_better_than_linear():
+    from ..services.forecasting_engine import forecast_matrix
+    from ..services.forecast_models import holt_winters_weekly, linear_trend
+
+    rng = np.random.default_rng(5)
+    days = np.arange(120)
+    weekly = np.array([5, 5, 6, 8, 12, 25, 30])
+    matrix = np.vstack([weekly[days % 7] * scale + rng.normal(0, 1, len(days)) for scale in (1, 2, 4)])
+    lengths = np.full(3, len(days))
+
+    linear = forecast_matrix(matrix, lengths, model=linear_trend)
+    seasonal = forecast_matrix(matrix, lengths, model=holt_winters_weekly)
+    assert (seasonal["mae"] < linear["mae"] / 2).all()
+
+
+@pytest.mark.django_db
+def test_forecast_model_selection_per_store_and_product():
+
+    store = seed_store("owner", products=3, days=40)
+    store.ForecastModel = "holt_winters"
+    store.save()
+    Product.objects.filter(store=store, ProductID="P1").update(ForecastModel="moving_average")
+    Product.objects.filter(store=store, ProductID="P2").update(ForecastModel="no_such_model")
+
+    result = generate_demand_forecast(store)
+    assert {product_id: row["model"] for product_id, row in result.items()} == {
+        "P0": "holt_winters", "P1": "moving_average", "P2": "holt_winters",
+    }
+
+
+def test_backtest_errors_match_manual_origins():
+    from ..services.backtesting import backtest_errors, summarize_errors
+    from ..services.forecast_models import moving_average
+
+    rng = np.random.default_rng(11)
+    lengths = np.array([30, 12])
+    matrix = np.zeros((2, 30))
+    for row, length in enumerate(lengths):
+        matrix[row, :length] = rng.integers(1, 20, size=length)
+
+    metrics = summarize_errors(backtest_errors("moving_average", matrix, lengths, horizon=3, origins=3, step=5), matrix, lengths)
+
+    # Row 0 has origins at days 27, 22 and 17; row 1 only at day 9
+    errors = []
+    for cut in (27, 22, 17):
+        forecast = moving_average(matrix[:1, :cut], np.array([cut]), 3)[0]
+        errors.extend(forecast - matrix[0, cut:cut + 3])
+
+    assert list(metrics["origins"]) == [3, 1]
+    assert metrics["mae"][0] == pytest.approx(np.abs(errors).mean())
+    assert metrics["rmse"][0] == pytest.approx(np.sqrt(np.mean(np.square(errors))))
+
+
+@pytest.mark.django_db
+def test_backtest_command_stores_accuracy_served_as_confidence():
+    from io import StringIO
+    from django.core.management import call_command
+    from ..models import ForecastAccuracy
+    from ..services.ingestion import process_sales_upload
+
+    store = seed_store("owner", products=2, days=60)
+    assert {row["accuracy_source"] for row in generate_demand_forecast(store).values()} == {"holdout"}
+
+    call_command("backtest_forecasts", store=store.pk, models=["linear", "holt_winters"], stdout=StringIO())
+    assert ForecastAccuracy.objects.filter(store=store).count() == 4
+
+    ForecastAccuracy.objects.filter(store=store, ModelName="linear").update(Confidence=0.42)
+    result = generate_demand_forecast(store)
+    assert {row["accuracy_source"] for row in result.values()} == {"backtest"}
+    assert {row["confidence"] for row in result.values()} == {0.42}
+
+    # Re-running updates the stored rows in place
+    call_command("backtest_forecasts", store=store.pk, models=["linear"], stdout=StringIO())
+    assert ForecastAccuracy.objects.filter(store=store).count() == 4
+    assert ForecastAccuracy.objects.get(store=store, ProductID__ProductID="P0", ModelName="linear").Confidence != 0.42
+
+    # Once the store's data changes the stored backtest no longer applies
+    process_sales_upload(make_csv(["P0,Item 0,Food,2025-03-02,500,3,10,10"]), store)
+    assert {row["accuracy_source"] for row in generate_demand_forecast(store).values()} == {"holdout"}
@@ -0,0 +1,354 @@
+import hashlib
+import pytest
+from decimal import Decimal
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..models import Product, Sales, UploadedFileLog
+from ..services import ingestion
+from ..services.ingestion import process_sales_upload
+from .helpers import HEADER, make_store, make_csv, seed_store
+
+
+@pytest.mark.django_db
+def test_upload_creates_products_and_sales():
+    store = make_store()
+
+    data, status = process_sales_upload(make_csv([
+        "P1,Rice,Food,2025-01-01,100,5,50,50",
+        "P1,Rice,Food,2025-01-02,100,3,50,50",
+        "P2,Sugar,Food,2025-01-01,80,2,40,40",
+        "P3,Oil,Food,2025-01-01,60,0,120,120",
+    ]), store)
+
+    assert status == 200
+    assert data["records_inserted"] == 3
+    assert data["valid_rows"] == 3
+    assert Product.objects.filter(store=store).count() == 2
+    assert Sales.objects.filter(store=store).count() == 3
+    assert UploadedFileLog.objects.filter(store=store).count() == 1
+
+
+@pytest.mark.django_db
+def test_upload_reuses_existing_products_and_rejects_mismatch():
+    store = make_store()
+    process_sales_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store)
+
+    data, status = process_sales_upload(
+        make_csv(["P1,Rice,Food,2025-01-02,100,4,50,50"], name="second.csv"), store
+    )
+    assert status == 200
+    assert Product.objects.filter(store=store).count() == 1
+
+    data, status = process_sales_upload(
+        make_csv(["P1,Basmati,Food,2025-01-03,100,4,50,50"], name="third.csv"), store
+    )
+    assert status == 400
+    assert data["error"] == "Product metadata mismatch for P1"
+    assert Sales.objects.filter(store=store).count() == 2
+
+
+@pytest.mark.django_db
+def test_numeric_product_ids_keep_their_parsed_form():
+    store = make_store()
+    process_sales_upload(make_csv(["001,Rice,Food,2025-01-01,100,5,50,50"]), store)
+
+    # Existing products were created from ids as pandas parsed them
+    data, status = process_sales_upload(
+        make_csv(["1,Rice,Food,2025-01-02,100,4,50,50"], name="second.csv"), store
+    )
+    assert status == 200
+    assert list(Product.objects.filter(store=store).values_list('ProductID', flat=True)) == ["1"]
+
+
+@pytest.mark.django_db
+def test_product_id_form_does_not_depend_on_chunk_boundaries():
+    rows = [
+        "001,Rice,Food,2025-01-01,100,5,50,50",
+        "002,Sugar,Food,2025-01-01,80,2,40,40",
+        "A1,Oil,Food,2025-01-01,60,1,120,120",
+        "001,Rice,Food,2025-01-02,100,3,50,50",
+    ]
+    whole, chunked = make_store("whole"), make_store("chunked")
+
+    process_sales_upload(make_csv(rows), whole, chunksize=0)
+    # The first chunk is numeric only, the second mixes in a text id
+    data, status = process_sales_upload(make_csv(rows), chunked, chunksize=2)
+
+    assert status == 200
+    expected = ["1", "2", "A1"]
+    for store in (whole, chunked):
+        ids = Product.objects.filter(store=store).values_list('ProductID', flat=True)
+        assert sorted(ids) == expected
+    assert Sales.objects.filter(store=chunked, ProductID__ProductID="1").count() == 2
+
+
+@pytest.mark.django_db
+def test_numeric_product_ids_are_normalized_across_chunks():
+    store = make_store()
+    rows = [f"{i % 3:03d},Item{i % 3},Food,2025-01-{i + 1:02d},100,1,10,10" for i in range(6)]
+
+    data, status = process_sales_upload(make_csv(rows), store, chunksize=2)
+
+    assert status == 200
+    assert sorted(Product.objects.filter(store=store).values_list('ProductID', flat=True)) == ["0", "1", "2"]
+
+
+@pytest.mark.django_db
+def test_duplicate_file_is_rejected():
+    store = make_store()
+    rows = ["P1,Rice,Food,2025-01-01,100,5,50,50"]
+
+    process_sales_upload(make_csv(rows), store)
+    data, status = process_sales_upload(make_csv(rows), store)
+
+    assert status == 400
+    assert data["error"] == "This file was already uploaded"
+
+
+@pytest.mark.django_db
+def test_streamed_hash_matches_file_and_screens_legacy_duplicates(monkeypatch):
+    store = make_store()
+    rows = [f"P{i % 5},Item{i % 5},Food,2025-01-{i % 28 + 1:02d},100,{i % 4 + 1},10,10" for i in range(5000)]
+    content = make_csv(rows).read()
+
+    data, status = process_sales_upload(make_csv(rows), store, chunksize=300)
+    log = UploadedFileLog.objects.get(store=store)
+    assert status == 200
+    assert log.FileHash == hashlib.sha256(content).hexdigest()
+    assert log.Fingerprint
+
+    # Logs from before fingerprints have none; the file is then hashed up
+    # front and rejected without being parsed
+    UploadedFileLog.objects.filter(pk=log.pk).update(Fingerprint="")
+    monkeypatch.setattr(ingestion, "iter_upload_chunks", None)
+    data, status = process_sales_upload(make_csv(rows), store, chunksize=300)
+
+    assert status == 400
+    assert data["error"] == "This file was already uploaded"
+    assert Sales.objects.filter(store=store).count() == 5000
+
+
+@pytest.mark.django_db
+def test_row_dedup_inserts_only_new_rows_of_overlapping_exports():
+    store = make_store()
+    week = [f"P1,Rice,Food,2025-01-0{day},100,2,50,50" for day in range(1, 8)]
+    # Two identical sales on the same day are both kept
+    repeated = ["P2,Sugar,Food,2025-01-03,80,1,40,40"] * 2
+
+    data, status = process_sales_upload(make_csv(week[:5] + repeated), store, chunksize=2, dedupe=True)
+    assert status == 200
+    assert data["records_inserted"] == 7
+
+    data, status = process_sales_upload(
+        make_csv(week[2:] + repeated + ["P2,Sugar,Food,2025-01-03,80,1,40,40"], name="overlap.csv"),
+        store, chunksize=3, dedupe=True
+    )
+
+    assert status == 200
+    assert data["records_inserted"] == 3
+    assert data["records_skipped"] == 5
+    assert Sales.objects.filter(store=store, ProductID__ProductID="P1").count() == 7
+    assert Sales.objects.filter(store=store, ProductID__ProductID="P2").count() == 3
+
+    data, status = process_sales_upload(make_csv(week[:2], name="old.csv"), store, dedupe=True)
+    assert status == 200
+    assert data["records_inserted"] == 0
+    assert data["records_skipped"] == 2
+
+
+@pytest.mark.django_db
+def test_row_dedup_screens_backfilled_history():
+    from ..services.sales_loader import backfill_fingerprints
+
+    # Rows stored before fingerprints existed
+    store = seed_store("owner", products=2, days=5)
+    assert backfill_fingerprints(store, batch_size=3) == 10
+    assert not Sales.objects.filter(store=store, Fingerprint__isnull=True).exists()
+
+    rows = [f"P0,Item 0,Food,2025-01-0{day + 1},500,{day % 7 + 1},10,10" for day in range(7)]
+    data, status = process_sales_upload(make_csv(rows), store, chunksize=2, dedupe=True)
+
+    assert status == 200
+    assert data["records_skipped"] == 5
+    assert data["records_inserted"] == 2
+    assert Sales.objects.filter(store=store, ProductID__ProductID="P0").count() == 7
+
+
+@pytest.mark.django_db
+def test_chunked_csv_upload_matches_single_read():
+    store = make_store()
+    rows = [f"P{i % 3},Item{i % 3},Food,2025-01-{i % 28 + 1:02d},100,{i % 4},10,10" for i in range(40)]
+
+    data, status = process_sales_upload(make_csv(rows), store, chunksize=7)
+
+    assert status == 200
+    assert data["records_inserted"] == sum(1 for i in range(40) if i % 4)
+    assert Product.objects.filter(store=store).count() == 3
+
+
+@pytest.mark.django_db
+def test_failing_chunk_rolls_back_whole_upload():
+    store = make_store()
+    rows = [
+        "P1,Rice,Food,2025-01-01,100,5,50,50",
+        "P2,Sugar,Food,2025-01-01,80,2,40,40",
+        "P1,Rice,Food,2025-01-02,100,5,50,50",
+        "P3,Oil,Food,2025-01-01,60,1,120,120",
+    ]
+    Product.objects.create(
+        store=store, ProductID="P3", ProductName="Ghee",
+        Category="Food", Quantity=10, UnitPrice=120
+    )
+
+    data, status = process_sales_upload(make_csv(rows), store, chunksize=2)
+
+    assert status == 400
+    assert data["error"] == "Product metadata mismatch for P3"
+    assert not Sales.objects.filter(store=store).exists()
+    assert Product.objects.filter(store=store).count() == 1
+
+
+@pytest.mark.django_db
+def test_streamed_xlsx_upload():
+    import io
+    from openpyxl import Workbook
+
+    store = make_store()
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER.strip().split(","))
+    for day in range(1, 6):
+        sheet.append(["P1", "Rice", "Food", f"2025-01-0{day}", 100, day, 50, 50])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    upload = SimpleUploadedFile("sales.xlsx", buffer.getvalue())
+    data, status = process_sales_upload(upload, store, chunksize=2)
+
+    assert status == 200
+    assert data["records_inserted"] == 5
+
+
+@pytest.mark.django_db
+def test_copy_backend_falls_back_outside_postgres():
+    store = make_store()
+
+    data, status = process_sales_upload(
+        make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store, backend="copy"
+    )
+
+    assert status == 200
+    assert Sales.objects.filter(store=store).count() == 1
+
+
+@pytest.mark.django_db
+def test_daily_rollup_matches_rebuild():
+    from ..models import DailyProductSales
+    from ..services.rollup import rebuild_daily_rollup
+
+    store = make_store()
+    process_sales_upload(make_csv([
+        "P1,Rice,Food,2025-01-01,100,5,50,49.99",
+        "P1,Rice,Food,2025-01-01,100,2,50,50",
+        "P2,Sugar,Food,2025-01-02,80,1,40,40",
+    ]), store)
+    process_sales_upload(make_csv([
+        "P1,Rice,Food,2025-01-01,100,1,50,50",
+        "P1,Rice,Food,2025-01-03,100,4,50,50",
+    ], name="second.csv"), store)
+
+    def snapshot():
+        return sorted(
+            DailyProductSales.objects.filter(store=store)
+            .values_list('ProductID__ProductID', 'Date', 'QuantitySold', 'Revenue')
+        )
+
+    maintained = snapshot()
+    rebuild_daily_rollup(store)
+
+    assert maintained == snapshot()
+    assert maintained[0][2:] == (8, Decimal("399.95"))
+
+
+@pytest.mark.django_db
+def test_uploads_keep_stock_ledger_in_sync():
+    from ..services.stock import find_stock_drift, reconcile_stock
+
+    store = make_store()
+    process_sales_upload(make_csv([
+        "P1,Rice,Food,2025-01-01,100,5,50,50",
+        "P1,Rice,Food,2025-01-02,100,3,50,50",
+        "P2,Sugar,Food,2025-01-01,80,2,40,40",
+    ]), store, chunksize=2)
+    process_sales_upload(make_csv([
+        "P1,Rice,Food,2025-01-03,100,7,50,50",
+    ], name="more.csv"), store)
+
+    stock = dict(Product.objects.filter(store=store).values_list('ProductID', 'CurrentStock'))
+    assert stock == {"P1": 85, "P2": 78}
+    assert find_stock_drift(store) == []
+
+    Product.objects.filter(store=store, ProductID="P1").update(CurrentStock=0)
+    assert [row["product_id"] for row in find_stock_drift(store)] == ["P1"]
+    reconcile_stock(store)
+    assert find_stock_drift(store) == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("extension", ["parquet", "feather"])
+@pytest.mark.parametrize("on_disk", [True, False])
+def test_columnar_uploads_keep_types_and_cleaning(tmp_path, extension, on_disk):
+    import pandas as pd
+    pytest.importorskip("pyarrow")
+    from datetime import date
+    from django.core.files import File
+
+    frame = pd.DataFrame({
+        "ProductID": [1, 1, 2, 3],
+        "ProductName": ["Rice", "Rice", "Sugar", "Oil"],
+        "Category": ["Food"] * 4,
+        "Date": [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 1), date(2025, 1, 1)],
+        "Quantity": [100, 100, 80, 60],
+        "QuantitySold": [5, 3, 2, 0],
+        "UnitPrice": [50.0, 50.0, 40.0, 120.0],
+        "PriceAtSale": [50.0, 50.0, 40.0, 120.0],
+        "Extra": ["x"] * 4,
+    })
+    path = tmp_path / f"sales.{extension}"
+    getattr(frame, f"to_{extension}")(path)
+
+    store = make_store()
+    if on_disk:
+        with open(path, "rb") as fh:
+            data, status = process_sales_upload(File(fh, name=path.name), store, chunksize=2)
+    else:
+        data, status = process_sales_upload(SimpleUploadedFile(path.name, path.read_bytes()), store)
+
+    assert status == 200
+    assert data["records_inserted"] == 3
+    assert set(Product.objects.filter(store=store).values_list("ProductID", flat=True)) == {"1", "2"}
+    assert Sales.objects.get(store=store, ProductID__ProductID="1", Date=date(2025, 1, 2)).QuantitySold == 3
+
+    missing = tmp_path / f"missing.{extension}"
+    getattr(frame.drop(columns=["PriceAtSale"]), f"to_{extension}")(missing)
+    data, status = process_sales_upload(SimpleUploadedFile(missing.name, missing.read_bytes()), store)
+    assert (status, data["error"]) == (400, "Missing required columns")
+
+
+@pytest.mark.parametrize("compression", ["lz4", "uncompressed"])
+def test_arrow_uploads_are_read_batch_by_batch(tmp_path, compression):
+    pa = pytest.importorskip("pyarrow")
+    from pyarrow import feather
+    from django.core.files import File
+    from ..benchmarks.synthetic import generate_sales_frame
+
+    path = tmp_path / "sales.feather"
+    feather.write_feather(
+        pa.Table.from_pandas(generate_sales_frame(25), preserve_index=False),
+        path, compression=compression, chunksize=10
+    )
+
+    with open(path, "rb") as fh:
+        sizes = [len(chunk) for chunk in ingestion.iter_upload_chunks(File(fh, name=path.name), 4)]
+
+    # Batches of 10, 10 and 5 rows, each cut into chunks of at most 4
+    assert sizes == [4, 4, 2, 4, 4, 2, 4, 1]
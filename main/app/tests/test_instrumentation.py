@@ -0,0 +1,123 @@
+import logging
+import tracemalloc
+
+import pytest
+from ..models import Product
+from ..services.instrumentation import (
+    measure, instrumented, get_metrics, reset_metrics, render_prometheus
+)
+from .helpers import make_store
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+@pytest.mark.django_db
+def test_nested_measurements_count_queries_in_both_scopes():
+    @instrumented("inner")
+    def inner():
+        return list(Product.objects.all())
+
+    with measure("request", "outer") as outer:
+        make_store()
+        inner()
+        inner()
+
+    metrics = get_metrics()
+    assert metrics[("service", "inner")]["calls"] == 2
+    assert metrics[("service", "inner")]["queries"] == 2
+    assert outer.queries == metrics[("request", "outer")]["queries"] >= 4
+
+
+@pytest.mark.django_db
+def test_untracked_scopes_leave_sql_to_services():
+    @instrumented("inner")
+    def inner():
+        return list(Product.objects.all())
+
+    with measure("request", "async_view", track_sql=False) as outer:
+        Product.objects.count()
+        inner()
+
+    assert outer.queries == 0
+    assert get_metrics()[("service", "inner")]["queries"] == 1
+
+    body = render_prometheus()
+    assert 'app_duration_seconds_count{kind="request",name="async_view"} 1' in body
+    assert 'app_sql_queries_total{kind="request",name="async_view"}' not in body
+    assert 'app_sql_queries_total{kind="service",name="inner"} 1' in body
+
+
+def test_peak_memory_tracks_nested_scopes():
+    tracemalloc.start()
+    try:
+        with measure("request", "outer") as outer:
+            with measure("service", "inner") as inner:
+                block = bytearray(2_000_000)
+                del block
+    finally:
+        tracemalloc.stop()
+
+    assert inner.peak_memory >= 2_000_000
+    assert outer.peak_memory >= inner.peak_memory
+
+
+@pytest.mark.django_db
+def test_slow_queries_are_logged_once(settings, caplog):
+    settings.SLOW_QUERY_MS = 0
+
+    with caplog.at_level(logging.WARNING, logger="app.services.instrumentation"):
+        with measure("request", "outer"):
+            with measure("service", "inner"):
+                Product.objects.count()
+
+    assert len([r for r in caplog.records if "Slow query in inner" in r.getMessage()]) == 1
+    assert get_metrics()[("request", "outer")]["slow_queries"] == 1
+
+
+@pytest.mark.django_db
+def test_requests_are_recorded_by_view_and_exposed(client, settings):
+    settings.METRICS_ALLOWED_IPS = ["127.0.0.1"]
+    store = make_store()
+    client.force_login(store.user)
+
+    assert client.get("/get_insights/").status_code == 200
+
+    body = client.get("/metrics/").content.decode()
+    assert 'app_duration_seconds_count{kind="request",name="get_insights"} 1' in body
+    assert 'app_duration_seconds_count{kind="service",name="analytics.get_sales_insights"} 1' in body
+    assert '# TYPE app_sql_queries_total counter' in body
+    assert 'le="+Inf"' in body
+
+    assert client.get("/metrics/", REMOTE_ADDR="10.0.0.5").status_code == 403
+
+
+def test_disabled_instrumentation_records_nothing(settings):
+    settings.INSTRUMENTATION_ENABLED = False
+
+    with measure("request", "off") as measurement:
+        pass
+
+    assert measurement is None
+    assert get_metrics() == {}
+    assert "name=" not in render_prometheus()
+
+
+@pytest.mark.django_db
+def test_metrics_need_staff_or_token_by_default(client, settings):
+    settings.METRICS_TOKEN = "scrape-secret"
+
+    # Loopback is no longer trusted unless allowlisted, it may be a proxy
+    assert client.get("/metrics/").status_code == 403
+    assert client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+    assert client.get("/metrics/", HTTP_AUTHORIZATION="Bearer scrape-secret").status_code == 200
+
+    staff = make_store().user
+    staff.is_staff = True
+    staff.save()
+    client.force_login(staff)
+    assert client.get("/metrics/").status_code == 200
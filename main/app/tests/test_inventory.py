@@ -1,12 +1,17 @@
 import pytest
 from ..services.inventory import get_low_stock_alerts
+from ..services.rollup import rebuild_daily_rollup
+from ..services.stock import reconcile_stock
 from ..models import Product, Sales
+from .helpers import make_store
 from django.utils.timezone import now
 
 
 @pytest.mark.django_db
 def test_low_stock_alert_returns_only_low_items():
+    store = make_store()
     product1 = Product.objects.create(
+        store=store,
         ProductID="P1",
         ProductName="Rice",
         Category="Food",
@@ -15,6 +20,7 @@ def test_low_stock_alert_returns_only_low_items():
     )
 
     product2 = Product.objects.create(
+        store=store,
         ProductID="P2",
         ProductName="Sugar",
         Category="Food",
@@ -22,10 +28,12 @@ def test_low_stock_alert_returns_only_low_items():
         UnitPrice=40
     )
 
-    Sales.objects.create(ProductID=product1, QuantitySold=20, PriceAtSale=50, Date=now())
-    Sales.objects.create(ProductID=product2, QuantitySold=20, PriceAtSale=50, Date=now())
+    Sales.objects.create(store=store, ProductID=product1, QuantitySold=20, PriceAtSale=50, Date=now())
+    Sales.objects.create(store=store, ProductID=product2, QuantitySold=20, PriceAtSale=50, Date=now())
+    rebuild_daily_rollup(store)
+    reconcile_stock(store)
 
-    alerts = get_low_stock_alerts(threshold=50)
+    alerts = get_low_stock_alerts(store, threshold=50)
 
     assert len(alerts) == 1
     assert alerts[0]["product"] == "Sugar"
@@ -34,7 +42,9 @@ def test_low_stock_alert_returns_only_low_items():
 
 @pytest.mark.django_db
 def test_low_stock_severity_levels():
+    store = make_store()
     product = Product.objects.create(
+        store=store,
         ProductID="P3",
         ProductName="Oil",
         Category="Food",
@@ -42,8 +52,31 @@ def test_low_stock_severity_levels():
         UnitPrice=120
     )
 
-    Sales.objects.create(ProductID=product, QuantitySold=90, PriceAtSale=50, Date=now())
+    Sales.objects.create(store=store, ProductID=product, QuantitySold=90, PriceAtSale=50, Date=now())
+    rebuild_daily_rollup(store)
+    reconcile_stock(store)
 
-    alerts = get_low_stock_alerts(threshold=50, critical_threshold=20)
+    alerts = get_low_stock_alerts(store, threshold=50, critical_threshold=20)
 
     assert alerts[0]["severity"] == "critical"
+
+
+@pytest.mark.django_db
+def test_reconcile_invalidates_cached_stock_alerts():
+    store = make_store()
+    product = Product.objects.create(
+        store=store,
+        ProductID="P4",
+        ProductName="Salt",
+        Category="Food",
+        Quantity=100,
+        UnitPrice=20
+    )
+
+    Sales.objects.create(store=store, ProductID=product, QuantitySold=90, PriceAtSale=20, Date=now())
+    rebuild_daily_rollup(store)
+    assert get_low_stock_alerts(store, threshold=50) == []
+
+    reconcile_stock(store)
+
+    assert get_low_stock_alerts(store, threshold=50)[0]["remaining"] == 10
@@ -0,0 +1,234 @@
+import time
+
+import pytest
+from datetime import timedelta
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from ..models import BackgroundJob, Sales, Product, DailyProductSales, UploadedFileLog
+from ..services.ingestion import process_sales_upload
+from ..services.jobs import (
+    enqueue_job, enqueue_upload, claim_next_job, run_job, JobFailed,
+    JOB_HANDLERS, JOB_INVENTORY_ENGINE, JOB_PURGE_STORE_DATA,
+)
+from ..services.purge import purge_store_data
+from .helpers import make_store, make_csv
+
+
+@pytest.mark.django_db
+def test_upload_job_runs_in_worker(settings, tmp_path):
+    settings.JOB_UPLOAD_DIR = str(tmp_path)
+    store = make_store()
+
+    job = enqueue_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store)
+    assert job.Status == BackgroundJob.STATUS_QUEUED
+    assert not Sales.objects.exists()
+
+    claimed = claim_next_job("test-worker")
+    assert claimed.pk == job.pk
+    assert claim_next_job("other-worker") is None
+
+    run_job(claimed)
+    job.refresh_from_db()
+
+    assert job.Status == BackgroundJob.STATUS_DONE
+    assert job.Result["records_inserted"] == 1
+    assert Sales.objects.filter(store=store).count() == 1
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.django_db
+def test_chunked_upload_job_reads_the_stored_file(settings, tmp_path):
+    # The worker parses the upload from disk, in several chunks
+    settings.JOB_UPLOAD_DIR = str(tmp_path)
+    settings.SALES_UPLOAD_CHUNK_SIZE = 2
+    store = make_store()
+
+    enqueue_upload(make_csv([
+        "001,Rice,Food,2025-01-01,100,5,50,50",
+        "002,Sugar,Food,2025-01-01,80,2,40,40",
+        "A1,Oil,Food,2025-01-01,60,1,120,120",
+        "001,Rice,Food,2025-01-02,100,3,50,50",
+    ]), store)
+    job = run_job(claim_next_job("test-worker"))
+
+    assert job.Status == BackgroundJob.STATUS_DONE, job.Message
+    assert job.Result["records_inserted"] == 4
+    assert sorted(Product.objects.filter(store=store).values_list('ProductID', flat=True)) == ["1", "2", "A1"]
+
+
+@pytest.mark.django_db
+def test_failed_upload_job_records_error(settings, tmp_path):
+    settings.JOB_UPLOAD_DIR = str(tmp_path)
+    store = make_store()
+
+    enqueue_upload(SimpleUploadedFile("sales.txt", b"not a sales file"), store)
+    job = run_job(claim_next_job("test-worker"))
+
+    assert job.Status == BackgroundJob.STATUS_FAILED
+    assert job.Message == "Unsupported file type"
+
+
+@pytest.mark.django_db
+def test_upload_page_polls_the_queued_upload(client, settings, tmp_path):
+    settings.BACKGROUND_JOBS = True
+    settings.JOB_UPLOAD_DIR = str(tmp_path)
+    store = make_store()
+    client.force_login(store.user)
+
+    response = client.post("/upload_sales/", {"uploaded_file": make_csv(["P1,Rice,Food,bad-date,100,5,50,50"])})
+    job = BackgroundJob.objects.get(store=store)
+    assert response.url == f"/upload_sales/?job={job.pk}"
+
+    page = client.get(response.url).content.decode()
+    assert f"pollUploadJob({job.pk})" in page
+
+    run_job(claim_next_job("test-worker"))
+
+    data = client.get(f"/jobs/{job.pk}/").json()
+    assert data["status"] == "failed"
+    assert data["message"]
+
+
+@pytest.mark.django_db
+def test_inventory_job_status_endpoint(client, settings):
+    settings.BACKGROUND_JOBS = True
+    store = make_store()
+    client.force_login(store.user)
+
+    response = client.get("/run_full_inventory_ai_engine/")
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    run_job(claim_next_job("test-worker"))
+
+    data = client.get(f"/jobs/{job_id}/").json()
+    assert data["status"] == "done"
+    assert data["result"]["total_products"] == 0
+
+
+@pytest.mark.django_db
+def test_signout_purges_only_the_signed_out_store(client, settings):
+    settings.BACKGROUND_JOBS = True
+    store, other = make_store(), make_store("other")
+    rows = [f"P{i % 3},Item{i % 3},Food,2025-01-{i % 28 + 1:02d},100,1,10,10" for i in range(20)]
+    process_sales_upload(make_csv(rows), store)
+    process_sales_upload(make_csv(rows), other)
+
+    client.force_login(store.user)
+    client.get("/signout/")
+    # Logout does not wait for the purge
+    assert Sales.objects.filter(store=store).count() == 20
+
+    job = run_job(claim_next_job("test-worker"))
+
+    assert job.JobType == JOB_PURGE_STORE_DATA
+    assert job.Status == BackgroundJob.STATUS_DONE
+    assert job.Result["deleted"]["sales"] == 20
+    for model in (Product, Sales, DailyProductSales, UploadedFileLog):
+        assert not model.objects.filter(store=store).exists()
+        assert model.objects.filter(store=other).exists()
+
+
+@pytest.mark.django_db
+def test_purge_deletes_in_bounded_batches():
+    store = make_store()
+    process_sales_upload(make_csv([f"P1,Rice,Food,2025-01-{day:02d},100,1,50,50" for day in range(1, 8)]), store)
+    updates = []
+
+    result = purge_store_data(store, batch_size=3, progress=lambda fraction, message: updates.append(fraction))
+
+    assert result["deleted"]["sales"] == 7
+    assert not Sales.objects.filter(store=store).exists()
+    # Sales, rollup, file log and product batches
+    assert len(updates) == 3 + 3 + 1 + 1
+    assert updates == sorted(updates)
+
+
+@pytest.mark.django_db
+def test_store_jobs_run_one_at_a_time_in_queue_order(settings, tmp_path):
+    settings.JOB_UPLOAD_DIR = str(tmp_path)
+    store, other = make_store(), make_store("other")
+
+    purge = enqueue_job(store, JOB_PURGE_STORE_DATA)
+    upload = enqueue_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store)
+    other_upload = enqueue_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), other)
+
+    assert claim_next_job("first").pk == purge.pk
+    # The upload waits for the running purge, other stores are not held up
+    assert claim_next_job("second").pk == other_upload.pk
+    assert claim_next_job("third") is None
+
+    run_job(BackgroundJob.objects.get(pk=purge.pk))
+    assert claim_next_job("third").pk == upload.pk
+
+
+@pytest.mark.django_db
+def test_stale_running_jobs_are_requeued_then_failed(settings):
+    settings.JOB_MAX_ATTEMPTS = 2
+    store = make_store()
+    job = enqueue_job(store, JOB_INVENTORY_ENGINE)
+    lost = timezone.now() - timedelta(seconds=settings.JOB_STALE_SECONDS + 1)
+
+    for attempt in (1, 2):
+        claimed = claim_next_job("crashed-worker")
+        assert claimed.pk == job.pk and claimed.Attempts == attempt
+        # The worker dies without reporting anything
+        BackgroundJob.objects.filter(pk=job.pk).update(HeartbeatAt=lost)
+
+    assert claim_next_job("new-worker") is None
+    job.refresh_from_db()
+    assert job.Status == BackgroundJob.STATUS_FAILED
+    assert job.Message == "Worker stopped responding"
+
+
+@pytest.mark.django_db
+def test_requeued_upload_keeps_its_file_until_it_fails(settings, tmp_path):
+    settings.JOB_UPLOAD_DIR = str(tmp_path)
+    settings.JOB_MAX_ATTEMPTS = 2
+    store = make_store()
+    job = enqueue_upload(make_csv(["P1,Rice,Food,2025-01-01,100,5,50,50"]), store)
+    lost = timezone.now() - timedelta(seconds=settings.JOB_STALE_SECONDS + 1)
+
+    claim_next_job("crashed-worker")
+    BackgroundJob.objects.filter(pk=job.pk).update(HeartbeatAt=lost)
+    claim_next_job("crashed-worker")
+    assert len(list(tmp_path.iterdir())) == 1
+
+    BackgroundJob.objects.filter(pk=job.pk).update(HeartbeatAt=lost)
+    assert claim_next_job("new-worker") is None
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_long_running_job_keeps_sending_heartbeats(settings, monkeypatch):
+    settings.JOB_HEARTBEAT_SECONDS = 0.05
+    store = make_store()
+    enqueue_job(store, JOB_INVENTORY_ENGINE)
+
+    def slow_step(job, progress):
+        time.sleep(0.5)
+        return {}
+
+    monkeypatch.setitem(JOB_HANDLERS, JOB_INVENTORY_ENGINE, slow_step)
+    job = run_job(claim_next_job("test-worker"))
+    job.refresh_from_db()
+
+    assert job.Status == BackgroundJob.STATUS_DONE
+    assert job.HeartbeatAt - job.StartedAt >= timedelta(seconds=0.25)
+
+
+@pytest.mark.django_db
+def test_failed_job_keeps_reported_progress(monkeypatch):
+    store = make_store()
+    enqueue_job(store, JOB_INVENTORY_ENGINE)
+
+    def fail_halfway(job, progress):
+        progress(0.4, "Forecasting")
+        raise JobFailed("Forecast failed")
+
+    monkeypatch.setitem(JOB_HANDLERS, JOB_INVENTORY_ENGINE, fail_halfway)
+    job = run_job(claim_next_job("test-worker"))
+    job.refresh_from_db()
+
+    assert job.Status == BackgroundJob.STATUS_FAILED
+    assert job.Progress == 0.4
@@ -0,0 +1,67 @@
+import re
+import pytest
+from datetime import date
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from ..services.analytics import get_sales_insights
+from ..services.forecasting import get_revenue_forecast_metrics, get_product_velocity
+from ..services.inventory import get_low_stock_alerts
+from ..services.forecasting_engine import generate_demand_forecast
+from ..services.stock_recommendation_engine import generate_stock_recommendations
+from ..services.rollup import rebuild_daily_rollup
+from .helpers import seed_store
+
+
+def full_table_scans(queries):
+    # Tables read in full, per the database's own query plan. On SQLite a
+    # store-scoped lookup must be a SEARCH: "SCAN ... USING (COVERING) INDEX"
+    # still walks the whole index
+    scans = []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SET enable_seqscan = off")
+
+        for query in queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+
+            if connection.vendor == 'sqlite':
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                details = [row[-1] for row in cursor.fetchall()]
+                pattern = r'^SCAN (app_\w+)'
+            else:
+                cursor.execute("EXPLAIN " + sql)
+                details = [row[0] for row in cursor.fetchall()]
+                pattern = r'Seq Scan on (app_\w+)'
+
+            for detail in details:
+                match = re.search(pattern, detail)
+                if match:
+                    scans.append((match.group(1), sql))
+
+        if connection.vendor == 'postgresql':
+            cursor.execute("RESET enable_seqscan")
+
+    return scans
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("service", [
+    lambda store: get_sales_insights(store),
+    lambda store: get_revenue_forecast_metrics(store),
+    lambda store: get_product_velocity(store, as_of=date(2025, 1, 20)),
+    lambda store: get_low_stock_alerts(store),
+    lambda store: generate_demand_forecast(store),
+    lambda store: generate_stock_recommendations(generate_demand_forecast(store), store),
+    lambda store: rebuild_daily_rollup(store),
+], ids=["insights", "revenue_metrics", "velocity", "low_stock", "demand_forecast", "stock_recommendations", "rollup_rebuild"])
+def test_service_queries_use_indexes(service):
+    seed_store("other")
+    store = seed_store("owner")
+
+    with CaptureQueriesContext(connection) as context:
+        service(store)
+
+    assert full_table_scans(context.captured_queries) == []
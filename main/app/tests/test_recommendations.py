@@ -0,0 +1,89 @@
+import pytest
+from ..models import Product, StockRecommendation
+from ..services.stock_recommendation_engine import generate_stock_recommendations, classify_risk
+from .helpers import make_store, seed_store
+
+
+def make_products(store, count):
+    return Product.objects.bulk_create([
+        Product(store=store, ProductID=f"P{i}", ProductName=f"Item {i}", Category="Food",
+                Quantity=100, CurrentStock=i * 10, UnitPrice=10)
+        for i in range(count)
+    ])
+
+
+@pytest.mark.django_db
+def test_recommendations_are_written_in_bulk(django_assert_max_num_queries):
+    store = make_store()
+    other = make_store("other")
+    make_products(store, 300)
+    make_products(other, 5)
+
+    forecast = {f"P{i}": {"forecast_7_days": 50.0, "confidence": 80.0} for i in range(300)}
+    generate_stock_recommendations({"P0": {"forecast_7_days": 1.0}}, other)
+
+    # Products, data version, the run, a few insert batches (SQLite caps the
+    # parameters per statement) and pruning; never one statement per product
+    with django_assert_max_num_queries(12):
+        run, recommendations = generate_stock_recommendations(forecast, store)
+
+    assert len(recommendations) == 300
+    assert run.TotalProducts == 300
+    assert StockRecommendation.objects.filter(store=store).count() == 300
+    assert StockRecommendation.objects.filter(store=other).count() == 1
+
+    by_id = {row["product_id"]: row for row in recommendations}
+    assert by_id["P0"]["risk_level"] == "out_of_stock"
+    assert by_id["P2"]["risk_level"] == "critical"
+    assert by_id["P4"]["risk_level"] == "warning"
+    assert by_id["P5"]["risk_level"] == "safe"
+    assert by_id["P2"]["recommended_order"] == 40.0
+    assert by_id["P10"]["recommended_order"] == 0
+
+    # Re-running adds a new snapshot next to the previous one
+    generate_stock_recommendations(forecast, store)
+    runs = StockRecommendation.objects.filter(store=store).values_list('Run', flat=True).distinct()
+    assert len(runs) == 2
+
+
+def test_classify_risk_scalar():
+    assert classify_risk(0, 10) == "out_of_stock"
+    assert classify_risk(30, 10) == "safe"
+
+
+@pytest.mark.django_db
+def test_engine_reuses_snapshot_until_data_changes(client, settings):
+    from ..models import RecommendationRun
+    from ..services.cache import bump_data_version
+    from ..services.stock_recommendation_engine import run_inventory_engine, RECOMMENDATION_RUNS_KEPT
+
+    settings.BACKGROUND_JOBS = True
+    store = seed_store("owner", products=3, days=20)
+    client.force_login(store.user)
+    assert client.get("/recommendations/").status_code == 404
+
+    first = run_inventory_engine(store)
+    assert first["total_products"] == 3
+    assert run_inventory_engine(store)["run_id"] == first["run_id"]
+
+    # A fresh snapshot is served straight away, no job is queued
+    response = client.get("/run_full_inventory_ai_engine/")
+    assert response.status_code == 200
+    assert response.json()["run_id"] == first["run_id"]
+
+    latest = client.get("/recommendations/").json()
+    assert latest["stale"] is False
+    assert latest["recommendations"] == first["recommendations"]
+
+    bump_data_version(store)
+    assert client.get("/recommendations/").json()["stale"] is True
+    assert client.get("/run_full_inventory_ai_engine/").status_code == 202
+
+    second = run_inventory_engine(store)
+    assert second["run_id"] != first["run_id"]
+    assert run_inventory_engine(store, force=True)["run_id"] != second["run_id"]
+
+    for _ in range(RECOMMENDATION_RUNS_KEPT + 2):
+        run_inventory_engine(store, force=True)
+    assert RecommendationRun.objects.filter(store=store).count() == RECOMMENDATION_RUNS_KEPT
+    assert StockRecommendation.objects.filter(store=store).count() == 3 * RECOMMENDATION_RUNS_KEPT
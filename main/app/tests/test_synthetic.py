@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+from ..benchmarks.synthetic import generate_sales_frame, generate_store_frames, write_sales_file
+from ..benchmarks.utils import compare_results
+from ..services.ingestion import REQUIRED_COLUMNS, process_sales_upload
+from .helpers import make_store
+
+
+def test_generator_is_deterministic_and_seasonal():
+    frame = generate_sales_frame(20_000, products=50, days=70, seed=1, seasonality=1.0)
+
+    assert list(frame.columns) == REQUIRED_COLUMNS
+    pd.testing.assert_frame_equal(frame, generate_sales_frame(20_000, products=50, days=70, seed=1, seasonality=1.0))
+
+    weekday = pd.to_datetime(frame['Date']).dt.weekday
+    units = frame.groupby(weekday)['QuantitySold'].sum()
+    assert units[6] > 2 * units[0]
+
+    flat = generate_sales_frame(20_000, products=50, days=70, seed=1, seasonality=0, noise=0)
+    flat_rows = pd.to_datetime(flat['Date']).dt.weekday.value_counts()
+    assert flat_rows.max() < 1.1 * flat_rows.min()
+
+    stores = dict(generate_store_frames(2, 100, products=5))
+    assert not stores[0].equals(stores[1])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("extension", ["csv", "xlsx"])
+def test_generated_files_upload_cleanly(tmp_path, extension):
+    from django.core.files import File
+
+    path = write_sales_file(str(tmp_path / f"sales.{extension}"), 300, products=10, days=30)
+    with open(path, 'rb') as fh:
+        data, status = process_sales_upload(File(fh, name=f"sales.{extension}"), make_store())
+
+    assert status == 200
+    assert data["records_inserted"] == 300
+
+
+def test_upload_formats_benchmark_runs_on_a_small_file():
+    from ..benchmarks.formats import benchmark_upload_formats
+
+    results = benchmark_upload_formats(rows=200, products=5, chunksize=50)
+
+    assert [r["format"] for r in results] == ["csv", "xlsx", "parquet", "feather"]
+    assert all(r["parsed_rows"] == 200 for r in results)
+
+
+@pytest.mark.django_db
+def test_benchmark_suite_runs_on_a_small_dataset():
+    from ..benchmarks.suite import benchmark_suite, ENDPOINTS, SERVICES
+
+    results = benchmark_suite(sizes=(300,), products=10, days=30)
+
+    assert len(results) == 1 + len(SERVICES) + 2 * len(ENDPOINTS)
+    assert all(r["status"] == 200 for r in results if r["stage"] == "endpoint")
+
+
+@pytest.mark.django_db
+def test_ingestion_benchmark_raises_on_a_failed_upload(monkeypatch):
+    from ..benchmarks import ingestion
+
+    results = ingestion.benchmark_ingestion_backends(rows=200, products=5)
+    assert [r["records_inserted"] for r in results] == [200, 200]
+
+    monkeypatch.setattr(ingestion, "process_sales_upload", lambda *args, **kwargs: ({"error": "File reading failed"}, 400))
+    with pytest.raises(RuntimeError, match="File reading failed"):
+        ingestion.benchmark_ingestion_backends(rows=200, products=5)
+
+
+def test_compare_results_matches_cases():
+    baseline = [{"benchmark": "suite", "rows": 10, "name": "a", "seconds": 2.0, "queries": 3}]
+    current = [
+        {"benchmark": "suite", "rows": 10, "name": "a", "seconds": 3.0, "queries": 4},
+        {"benchmark": "suite", "rows": 10, "name": "b", "seconds": 1.0},
+    ]
+
+    assert compare_results(current, baseline) == [
+        {"benchmark": "suite", "rows": 10, "name": "a", "field": "seconds",
+         "baseline": 2.0, "current": 3.0, "ratio": 1.5}
+    ]
@@ -2,11 +2,16 @@ import pytest
 from datetime import date
 from ..models import Product, Sales
 from ..services.forecasting import get_product_velocity
+from ..services.rollup import rebuild_daily_rollup
+from ..services.stock import reconcile_stock
+from .helpers import make_store, seed_store
 
 
 @pytest.mark.django_db
 def test_velocity_calculation():
+    store = make_store("owner")
     product = Product.objects.create(
+        store=store,
         ProductID="P10",
         ProductName="Milk",
         Category="Dairy",
@@ -14,11 +19,58 @@ def test_velocity_calculation():
         UnitPrice=60
     )
 
-    Sales.objects.create(ProductID=product, QuantitySold=10, PriceAtSale=50, Date=date(2026, 1, 1))
-    Sales.objects.create(ProductID=product, QuantitySold=20, PriceAtSale=50, Date=date(2026, 1, 2))
+    Sales.objects.create(store=store, ProductID=product, QuantitySold=10, PriceAtSale=50, Date=date(2026, 1, 1))
+    Sales.objects.create(store=store, ProductID=product, QuantitySold=20, PriceAtSale=50, Date=date(2026, 1, 2))
+    rebuild_daily_rollup(store)
+    reconcile_stock(store)
 
-    result = get_product_velocity()
+    result = get_product_velocity(store)
     velocity_data = list(result["velocity"])
     assert velocity_data[0]['avg_daily_sales'] == 15
 
-  
+
+@pytest.mark.django_db
+def test_velocity_is_windowed_scoped_and_paginated():
+    seed_store("other", products=4)
+    store = seed_store("owner", products=5, days=60)
+
+    week = get_product_velocity.__wrapped__(store, window=7)
+    assert week["as_of"] == date(2025, 3, 1)
+    assert week["total_products"] == 5
+    # The seeded pattern sells 1..7 per day on a weekly cycle, 28 per full week
+    assert {row["window_sold"] for row in week["velocity"]} == {28}
+    assert {row["avg_daily_sales"] for row in week["velocity"]} == {4.0}
+
+    days = [row["estimated_stock_out_days"] for row in week["velocity"]]
+    assert days == sorted(days)
+
+    first = get_product_velocity.__wrapped__(store, window=7, page=1, page_size=2)
+    last = get_product_velocity.__wrapped__(store, window=7, page=3, page_size=2)
+    assert len(first["velocity"]) == 2 and len(last["velocity"]) == 1
+
+    with pytest.raises(ValueError):
+        get_product_velocity(store, window=14)
+
+
+@pytest.mark.django_db
+def test_velocity_averages_sparse_sales_over_the_window():
+    store = make_store("owner")
+    steady = Product.objects.create(store=store, ProductID="P1", ProductName="Rice",
+                                    Category="Food", Quantity=1000, UnitPrice=10)
+    new = Product.objects.create(store=store, ProductID="P2", ProductName="Tea",
+                                 Category="Food", Quantity=1000, UnitPrice=10)
+
+    # Sold long before the window, then once on its last day
+    Sales.objects.create(store=store, ProductID=steady, QuantitySold=5, PriceAtSale=10, Date=date(2025, 1, 1))
+    Sales.objects.create(store=store, ProductID=steady, QuantitySold=30, PriceAtSale=10, Date=date(2025, 6, 30))
+    # First ever sale ten days before the end of the window
+    Sales.objects.create(store=store, ProductID=new, QuantitySold=20, PriceAtSale=10, Date=date(2025, 6, 21))
+    rebuild_daily_rollup(store)
+    reconcile_stock(store)
+
+    result = get_product_velocity.__wrapped__(store, window=30)
+    rows = {row["ProductID"]: row for row in result["velocity"]}
+
+    assert rows["P1"]["avg_daily_sales"] == 1.0
+    assert rows["P1"]["estimated_stock_out_days"] == 965.0
+    assert rows["P2"]["avg_daily_sales"] == 2.0
@@ -10,8 +10,15 @@ urlpatterns = [
     path('upload_sales/', views.upload_sales, name='upload_sales'),
     path('get_insights/', views.get_insights, name='get_insights'),
     path('forecast_demand/', views.forecast_demand, name='forcast_demand'),
+    path('product_velocity/', views.product_velocity, name='product_velocity'),
     path('low_stock_alert/', views.low_stock_alert, name='lowStock_alert'),
-    path('demand_forecast/', views.generate_demand_forecast, name ='demand_forecast' ),
-    path('run_full_inventory_ai_engine/', views.run_full_inventory_ai_engine, name='run_full_inventory_ai_engine')
+    path('dashboard_data/', views.dashboard_data, name='dashboard_data'),
+    path('demand_forecast/', views.demand_forecast, name ='demand_forecast' ),
+    path('run_full_inventory_ai_engine/', views.run_full_inventory_ai_engine, name='run_full_inventory_ai_engine'),
+    path('recommendations/', views.latest_recommendations, name='latest_recommendations'),
+    path('cache_stats/', views.cache_stats, name='cache_stats'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('jobs/', views.job_list, name='job_list'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
     
 ]
\ No newline at end of file
@@ -1,19 +1,31 @@
+import asyncio
+
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.db import IntegrityError
-from .models import StoreOwneres
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date
+from .models import StoreOwneres, BackgroundJob
 from .services.ingestion import process_sales_upload,delete_uploaded_data
 from .services.analytics import get_sales_insights
-from .services.forecasting import get_revenue_forecast_metrics
+from .services.forecasting import (
+    get_revenue_forecast_metrics, get_product_velocity, GRANULARITIES, VELOCITY_WINDOWS, VELOCITY_PAGE_SIZE
+)
+from .services.downsampling import DOWNSAMPLE_METHODS
 from .services.inventory import get_low_stock_alerts
 from .services.forecasting_engine import generate_demand_forecast
-from .services.stock_recommendation_engine import generate_stock_recommendations
-from django.utils import timezone
+from .services.stock_recommendation_engine import run_inventory_engine, get_latest_run, get_fresh_run, serialize_run
+from .services.cache import get_cache_stats, get_data_version
+from .services.instrumentation import render_prometheus
+from .services.jobs import enqueue_job, enqueue_upload, serialize_job, JOB_INVENTORY_ENGINE, JOB_PURGE_STORE_DATA
+from .services.concurrency import run_service
 
 
 
@@ -92,7 +104,15 @@ def signin(request):
 
 
 def signout(request):
-    delete_uploaded_data()
+    store = getattr(request.user, 'storeowneres', None)
+
+    if store is not None:
+        # Large stores take a while to purge, keep logout instant when a worker is available
+        if settings.BACKGROUND_JOBS:
+            enqueue_job(store, JOB_PURGE_STORE_DATA)
+        else:
+            delete_uploaded_data(store)
+
     logout(request)
     messages.success(request, "Logged out successfully.")
     return redirect('landing')
@@ -119,14 +139,19 @@ def upload_sales(request):
             messages.error(request, "Please select a file to upload.")
             return redirect('upload_sales')
 
+        if settings.BACKGROUND_JOBS:
+            job = enqueue_upload(file, store)
+            # The upload page polls the job and shows its outcome
+            return redirect(f"{reverse('upload_sales')}?job={job.pk}")
+
         try:
             data, status = process_sales_upload(file, store)
 
             if status == 200:
-                messages.success(
-                    request,
-                    f"Upload successful. {data.get('records_inserted', 0)} records added."
-                )
+                message = f"Upload successful. {data.get('records_inserted', 0)} records added."
+                if data.get('records_skipped'):
+                    message += f" {data['records_skipped']} previously uploaded records skipped."
+                messages.success(request, message)
             else:
                 messages.error(request, data.get('error', "Something went wrong."))
 
@@ -135,7 +160,10 @@ def upload_sales(request):
 
         return redirect('upload_sales')
 
-    return render(request, 'uploadsales.html')
+    job_id = request.GET.get('job', '')
+    return render(request, 'uploadsales.html', {
+        "job_id": int(job_id) if job_id.isdigit() else None
+    })
 
 @login_required(login_url='signin')
 def dashboard(request):
@@ -149,46 +177,199 @@ def get_insights(request):
         data = get_sales_insights()
         return JsonResponse(data)'''
 
+async def get_request_store(request):
+    user = await request.auser()
+    return await StoreOwneres.objects.aget(user=user)
+
+
 @login_required
-def get_insights(request):
-    store = request.user.storeowneres
-    data = get_sales_insights(store)
+async def get_insights(request):
+    store = await get_request_store(request)
+
+    try:
+        n = int(request.GET.get('n', 5))
+    except ValueError:
+        return JsonResponse({"error": "n must be an integer"}, status=400)
+
+    if not 1 <= n <= 100:
+        return JsonResponse({"error": "n must be between 1 and 100"}, status=400)
+
+    data = await run_service(get_sales_insights, store, n=n)
     return JsonResponse(data)
 
 
 @login_required(login_url='signin')
-def forecast_demand(request):
+async def forecast_demand(request):
     if request.method == 'GET':
-        store = request.user.storeowneres
-        data = get_revenue_forecast_metrics(store)
+        store = await get_request_store(request)
+
+        try:
+            start = parse_date(request.GET['start']) if request.GET.get('start') else None
+            end = parse_date(request.GET['end']) if request.GET.get('end') else None
+        except ValueError:
+            start = end = None
+        if (request.GET.get('start') and start is None) or (request.GET.get('end') and end is None):
+            return JsonResponse({"error": "start and end must be dates (YYYY-MM-DD)"}, status=400)
+        if start and end and start > end:
+            return JsonResponse({"error": "start must not be after end"}, status=400)
+
+        granularity = request.GET.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return JsonResponse({"error": f"granularity must be one of {', '.join(GRANULARITIES)}"}, status=400)
+
+        downsample = request.GET.get('downsample', 'lttb')
+        if downsample not in DOWNSAMPLE_METHODS:
+            return JsonResponse({"error": f"downsample must be one of {', '.join(DOWNSAMPLE_METHODS)}"}, status=400)
+
+        max_points = None
+        if request.GET.get('max_points'):
+            try:
+                max_points = int(request.GET['max_points'])
+            except ValueError:
+                return JsonResponse({"error": "max_points must be an integer"}, status=400)
+            # Callers may ask for fewer points than the default cap, never more
+            if not 3 <= max_points <= settings.REVENUE_MAX_POINTS:
+                return JsonResponse(
+                    {"error": f"max_points must be between 3 and {settings.REVENUE_MAX_POINTS}"}, status=400
+                )
+
+        data = await run_service(
+            get_revenue_forecast_metrics,
+            store, start=start, end=end, granularity=granularity,
+            max_points=max_points, downsample=downsample,
+        )
         return JsonResponse(data)
 
 
 @login_required(login_url='signin')
-def low_stock_alert(request):
+async def product_velocity(request):
+    store = await get_request_store(request)
+
+    try:
+        window = int(request.GET.get('window', 30))
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', VELOCITY_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({"error": "window, page and page_size must be integers"}, status=400)
+
+    if window not in VELOCITY_WINDOWS:
+        return JsonResponse({"error": f"window must be one of {', '.join(map(str, VELOCITY_WINDOWS))}"}, status=400)
+    if page < 1 or not 1 <= page_size <= 1000:
+        return JsonResponse({"error": "page must be positive and page_size between 1 and 1000"}, status=400)
+
+    data = await run_service(get_product_velocity, store, window=window, page=page, page_size=page_size)
+    return JsonResponse(data)
+
+
+@login_required(login_url='signin')
+async def low_stock_alert(request):
     if request.method == 'GET':
-        store = request.user.storeowneres
-        alerts = get_low_stock_alerts(store)
+        store = await get_request_store(request)
+        alerts = await run_service(get_low_stock_alerts, store)
         return JsonResponse({"stockAlert": alerts})
 
 
 @login_required(login_url='signin')
-def demand_forecast(request):
+async def demand_forecast(request):
     if request.method == 'GET':
-        demand = generate_demand_forecast()
+        store = await get_request_store(request)
+        demand = await run_service(generate_demand_forecast, store)
         return JsonResponse(demand)
 
 
+@login_required(login_url='signin')
+async def dashboard_data(request):
+    # Everything the dashboard shows on load, with the services running side by side
+    store = await get_request_store(request)
+
+    insights, revenue, alerts = await asyncio.gather(
+        run_service(get_sales_insights, store),
+        run_service(get_revenue_forecast_metrics, store),
+        run_service(get_low_stock_alerts, store),
+    )
+
+    return JsonResponse({"insights": insights, "revenue": revenue, "stockAlert": alerts})
+
+
 @login_required(login_url='signin')
 def run_full_inventory_ai_engine(request):
     store = request.user.storeowneres
-    forecast_data = generate_demand_forecast(store)
-    stock_recommendations = generate_stock_recommendations(forecast_data,store)
-
-    return JsonResponse({
-        "total_products": len(stock_recommendations),
-        "recommendations": stock_recommendations,
-        "generated_at": str(timezone.now())
-    }
-)
+    force = request.GET.get('force', '').lower() in ('1', 'true', 'yes')
+
+    if settings.BACKGROUND_JOBS:
+        # Nothing changed since the last run: answer from it without queueing
+        run = None if force else get_fresh_run(store)
+        if run is not None:
+            return JsonResponse(serialize_run(run))
+
+        job = enqueue_job(store, JOB_INVENTORY_ENGINE, payload={"force": force})
+        return JsonResponse(serialize_job(job), status=202)
+
+    return JsonResponse(run_inventory_engine(store, force=force))
+
+
+def load_latest_recommendations(store):
+    run = get_latest_run(store)
+    if run is None:
+        return None
+
+    data = serialize_run(run)
+    data["stale"] = run.DataVersion != get_data_version(store)
+    return data
+
+
+@login_required(login_url='signin')
+async def latest_recommendations(request):
+    store = await get_request_store(request)
+    data = await run_service(load_latest_recommendations, store)
+
+    if data is None:
+        return JsonResponse({"error": "No recommendations generated yet"}, status=404)
+
+    return JsonResponse(data)
+
+
+@login_required(login_url='signin')
+def cache_stats(request):
+    return JsonResponse(get_cache_stats())
+
+
+def metrics_allowed(request):
+    if request.user.is_staff:
+        return True
+
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return True
+
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+
+
+def metrics(request):
+    # Prometheus scrape target, for staff, token-bearing scrapers and opted-in IPs
+    if not metrics_allowed(request):
+        return HttpResponse(status=403)
+
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@login_required(login_url='signin')
+async def job_status(request, job_id):
+    store = await get_request_store(request)
+    job = await BackgroundJob.objects.filter(pk=job_id, store=store).afirst()
+
+    if job is None:
+        raise Http404("No BackgroundJob matches the given query.")
+
+    return JsonResponse(serialize_job(job))
+
+
+@login_required(login_url='signin')
+async def job_list(request):
+    store = await get_request_store(request)
+    jobs = [
+        job async for job in
+        BackgroundJob.objects.filter(store=store).order_by('-CreatedAt')[:20]
+    ]
+    return JsonResponse({"jobs": [serialize_job(job) for job in jobs]})
 
@@ -20,6 +20,85 @@ DATABASES = {
     )
 }
 
+# Job progress is written on its own connection so pollers can see it while
+# an upload transaction is still open (SQLite allows a single writer, so it keeps one)
+if DATABASES["default"].get("ENGINE", "").endswith("postgresql"):
+    DATABASES["jobs"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Run uploads and the inventory engine through the job queue (python manage.py run_worker)
+BACKGROUND_JOBS = os.environ.get("BACKGROUND_JOBS", "True") == "True"
+JOB_UPLOAD_DIR = os.environ.get("JOB_UPLOAD_DIR", os.path.join(BASE_DIR, 'job_uploads'))
+# Running jobs without a heartbeat for this long are assumed lost with their worker
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", 3600))
+# A running job's worker records a heartbeat this often, well inside JOB_STALE_SECONDS
+JOB_HEARTBEAT_SECONDS = int(os.environ.get("JOB_HEARTBEAT_SECONDS", 60))
+# Lost jobs are requeued until they have been started this many times, then marked failed
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+# "batch" refits from the sales history, "incremental" reads the running ForecastState sums
+FORECAST_MODE = os.environ.get("FORECAST_MODE", "batch")
+
+# Default model from app.services.forecast_models; stores and products can override it.
+# Incremental mode always uses the linear trend.
+FORECAST_MODEL = os.environ.get("FORECAST_MODEL", "linear")
+
+# Worker processes for forecasting models that are not vectorized across products
+FORECAST_WORKERS = int(os.environ.get("FORECAST_WORKERS", 1))
+
+# Per-store analytics cache: "locmem" (per process, LRU), "file" or "db"
+# (shared between workers, run `python manage.py createcachetable` for "db")
+ANALYTICS_CACHE_BACKEND = os.environ.get("ANALYTICS_CACHE_BACKEND", "locmem")
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get("ANALYTICS_CACHE_TIMEOUT", 3600))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "analytics": {
+        "locmem": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "analytics",
+            "OPTIONS": {"MAX_ENTRIES": 1000},
+        },
+        "file": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(BASE_DIR, 'analytics_cache'),
+        },
+        "db": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "analytics_cache",
+        },
+    }[ANALYTICS_CACHE_BACKEND],
+}
+
+# Rows parsed and inserted per batch when ingesting uploads (0 reads the whole file)
+SALES_UPLOAD_CHUNK_SIZE = int(os.environ.get("SALES_UPLOAD_CHUNK_SIZE", 50000))
+
+# "copy" streams Sales rows with COPY FROM STDIN on PostgreSQL, falls back to bulk_create elsewhere
+SALES_INGESTION_BACKEND = os.environ.get("SALES_INGESTION_BACKEND", "bulk_create")
+
+# Skip uploaded rows whose fingerprint is already stored, for POS exports with overlapping dates
+SALES_ROW_DEDUP = os.environ.get("SALES_ROW_DEDUP", "False") == "True"
+
+# Upper bound on the points per revenue series returned by forecast_demand and dashboard_data,
+# longer histories are downsampled to it. Requests can ask for fewer with ?max_points=
+REVENUE_MAX_POINTS = int(os.environ.get("REVENUE_MAX_POINTS", 1000))
+
+# Threads the async JSON views run their synchronous services on, shared by all requests
+ASYNC_SERVICE_THREADS = int(os.environ.get("ASYNC_SERVICE_THREADS", 8))
+
+# Per-request and per-service timing, SQL counts and memory, served at /metrics/ (Prometheus text)
+INSTRUMENTATION_ENABLED = os.environ.get("INSTRUMENTATION_ENABLED", "True") == "True"
+# tracemalloc slows Python code down noticeably, so peak memory is opt-in
+INSTRUMENTATION_TRACE_MEMORY = os.environ.get("INSTRUMENTATION_TRACE_MEMORY", "False") == "True"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 200))
+# /metrics/ is served to staff and to scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+# The IP allowlist is opt-in: behind a reverse proxy every request comes from the proxy's address
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip]
+
 
 
 # Application definition
@@ -36,6 +115,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',